@@ -1,11 +1,33 @@
 import random
 import os
+import sys
 import json
+import hashlib
+import struct
+import heapq
+import bisect
+import itertools
+import math
+import threading
+import atexit
+import sqlite3
+import asyncio
+import time
 from enum import Enum
+from collections import namedtuple, Counter, OrderedDict
+from types import MappingProxyType, ModuleType, FunctionType, MethodType, BuiltinFunctionType
 
 # Colorama removido: no dependemos de él (evita errores si no está instalado)
 HAS_COLORAMA = False
 
+# NumPy es opcional: solo lo usa el motor vectorizado de simulación
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
 # --- CONSTANTES DE JUEGO ---
 XP_POR_NIVEL_BASE = 100
 VIDA_INICIAL_JUGADOR = 100
@@ -23,18 +45,745 @@ CRIT_MULT = 1.75
 HERO_MISS_CHANCE = 0.10   # 10% probabilidad de fallar para el héroe
 ENEMY_MISS_CHANCE = 0.50  # 50% probabilidad de fallar para los enemigos
 
+# Contenido por defecto: arquetipos de enemigo, costes y niveles de las
+# habilidades y botín. Los paquetes de contenido (JSON) se combinan sobre él;
+# ver PAQUETES DE CONTENIDO. Los multiplicadores se aplican con int().
+CONTENIDO_BASE = {
+    'enemigos': {
+        'tipos': [
+            {'nombre': 'Guerrero', 'peso': 40, 'ataque': 1.5},
+            {'nombre': 'Mago', 'peso': 30, 'mana': 30, 'mana_por_nivel': 5},
+            {'nombre': 'Sanador', 'peso': 20, 'vida': 0.8, 'defensa': 1.2},
+            {'nombre': 'Clon', 'peso': 10, 'velocidad': 2, 'copia_elemento': True},
+            {'nombre': 'Asesino', 'peso': 15, 'ataque': 1.2, 'velocidad': 1.5},
+            {'nombre': 'Tanque', 'peso': 25, 'vida': 1.5, 'defensa': 1.5},
+        ],
+        'prob_jefe': 0.08,    # probabilidad de que un enemigo sea un jefe con fases
+        'jefe': {'vida': 2.5, 'ataque': 1.8, 'defensa': 1.5, 'velocidad': 1.2},
+    },
+    # 'nivel': nivel en que se aprende (sin él, solo la tiene quien empieza con ella)
+    'habilidades': {
+        'Explosión de Energía': {'costo': 25},
+        'Distorsión Temporal': {'costo': 15, 'nivel': 2},
+        'Bastión Temporal': {'costo': 12, 'nivel': 3},
+        'Plegado Espacial': {'costo': 20, 'nivel': 4},
+        'Singularidad Cuántica': {'costo': 30, 'nivel': 6},
+        'Rayo de Energía Pura': {'costo': 22, 'nivel': 8},
+        'Transmutación de Materia': {'costo': 5, 'nivel': 10},
+    },
+    # Botín tras cada batalla: una entrada elegida según su peso
+    'dropeos': [
+        {'peso': 1, 'tipo': 'pocion', 'opciones': ['Poción de Vida', 'Poción de Mana']},
+        {'peso': 1, 'tipo': 'arma', 'objeto': {'nombre': 'Daga Serrada', 'ataque': 3}},
+        {'peso': 1, 'tipo': 'armadura', 'objeto': {'nombre': 'Grebas Oxidadas', 'defensa': 2}},
+        {'peso': 1, 'tipo': 'nada'},
+    ],
+    # Tablas de botín con nombre y reglas que las eligen; ver BOTÍN.
+    # Sin reglas, cada batalla tira una vez en 'dropeos'.
+    'botin': {'tablas': {}, 'reglas': []},
+}
+
+# Generación de enemigos (activar_contenido los sustituye por los del paquete activo)
+TIPOS_ENEMIGO = [t['nombre'] for t in CONTENIDO_BASE['enemigos']['tipos']]
+PESOS_ENEMIGO = [t['peso'] for t in CONTENIDO_BASE['enemigos']['tipos']]
+PROB_JEFE = CONTENIDO_BASE['enemigos']['prob_jefe']
+
+def derivar_semilla(semilla, *claves):
+    """
+    Semilla hija estable para (semilla, claves...). Permite dar a cada batalla
+    o proceso su propio flujo sin depender del orden de ejecución.
+    """
+    datos = ":".join(str(c) for c in (semilla,) + claves).encode()
+    return int.from_bytes(hashlib.blake2b(datos, digest_size=8).digest(), 'big')
+
+class FlujoAleatorio(random.Random):
+    """
+    Flujo de números aleatorios reproducible e independiente del estado global
+    de `random`. Tiene la misma API que random.Random (random, randint, choice,
+    choices...), así que puede inyectarse donde antes se usaba el módulo.
+    """
+    def __init__(self, semilla=None):
+        if semilla is None:
+            semilla = int.from_bytes(os.urandom(8), 'big')
+        self.semilla = semilla
+        super().__init__(semilla)
+
+    def __reduce__(self):
+        # random.Random no serializa atributos propios: conservar la semilla
+        return (FlujoAleatorio, (self.semilla,), self.getstate())
+
+    def derivar(self, *claves):
+        """Flujo hijo independiente identificado por `claves` (p. ej. 'batalla', 3)."""
+        return FlujoAleatorio(derivar_semilla(self.semilla, *claves))
+
+    def dividir(self, n):
+        """`n` flujos hijos, p. ej. uno por proceso de un pool."""
+        return [self.derivar(i) for i in range(n)]
+
 class Elemento(Enum):
     TIEMPO = "Tiempo"
     ESPACIO = "Espacio"
     ENERGIA = "Energía"
     MATERIA = "Materia"
 
+ELEMENTOS = tuple(Elemento)
+# Elementos distintos del de cada héroe, en el orden de Elemento
+ELEMENTOS_OPUESTOS = {e: tuple(x for x in ELEMENTOS if x != e) for e in ELEMENTOS}
+
+# Plantillas compartidas e inmutables (no se copian por instancia)
+MENSAJES_ATAQUE = (
+    "¡Un golpe certero!",
+    "¡Impacto devastador!",
+    "¡Golpe rápido y preciso!"
+)
+PASIVAS = MappingProxyType({
+    "Furia": MappingProxyType({"desc": "+2 ataque", "costo": 1}),
+    "Coraza": MappingProxyType({"desc": "+2 defensa", "costo": 1}),
+})
+
+# --- EVENTOS DE JUEGO ---
+# Las reglas retornan eventos (tuplas con los datos del resultado) en lugar de
+# texto, y Juego los emite a un bus. El texto solo se construye al convertir
+# el evento a str (por ejemplo en RenderizadorConsola): sin suscriptores no se
+# formatea nada.
+class TipoEvento(Enum):
+    BATALLA = "batalla"      # cabeceras, victoria y derrota
+    TURNO = "turno"          # cabeceras de turno y estado de los combatientes
+    ATAQUE = "ataque"
+    CRITICO = "critico"
+    FALLO = "fallo"
+    CURACION = "curacion"
+    HABILIDAD = "habilidad"
+    ESTADO = "estado"        # aplicación, daño por turno y fin de estados
+    BUFF = "buff"
+    OBJETO = "objeto"
+    NIVEL = "nivel"          # subidas de nivel, habilidades aprendidas y logros
+    DROP = "drop"
+    EVENTO = "evento"        # eventos aleatorios entre niveles
+    AVISO = "aviso"          # acciones inválidas o sin efecto
+
+class Evento(namedtuple('Evento', 'tipo clave actor objetivo valor extra', defaults=(None, None, None, None))):
+    """
+    Evento de juego. `clave` elige la plantilla de texto en PLANTILLAS;
+    `actor` y `objetivo` son nombres, `valor` el número principal (daño,
+    curación, XP...) y `extra` los demás datos de la plantilla.
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        return PLANTILLAS[self.clave](self)
+
+    def to_dict(self):
+        return {
+            'tipo': self.tipo.value,
+            'clave': self.clave,
+            'actor': self.actor,
+            'objetivo': self.objetivo,
+            'valor': self.valor,
+            'extra': self.extra,
+            'texto': str(self),
+        }
+
+def _texto_derrotados(derrotados):
+    return f" Derrotaste a {derrotados} enemigo(s)." if derrotados > 0 else ""
+
+# Plantilla de texto de cada clave de evento (reproducen los mensajes de consola)
+PLANTILLAS = {
+    'texto': lambda e: e.extra,
+    # Batalla y turnos
+    'inicio_batalla': lambda e: (
+        f"\n=== NIVEL {e.valor} ===\n"
+        f"\n=== {e.actor.upper()} ===\n"
+        f"Nivel: {e.extra[0]} | Vida: {e.extra[1]}/{e.extra[2]} | Mana: {e.extra[3]}/{e.extra[4]}"
+    ),
+    'turno_jugador': lambda e: "\n" + "-"*10 + " TU TURNO " + "-"*10 + f"\nJugador: {e.valor} HP | {e.extra} MP",
+    'enemigo_vivo': lambda e: f"Enemigo {e.valor}: {e.actor} - {e.extra} HP",
+    'jugador_aturdido': lambda e: "Estás aturdido y pierdes este turno.",
+    'defensa': lambda e: "Te preparas para defenderte. Tu defensa se duplicará para el siguiente ataque.",
+    'turno_enemigo': lambda e: "\n" + "-"*10 + " TURNO ENEMIGO " + "-"*10,
+    'enemigo_aturdido': lambda e: f"{e.actor} está aturdido y pierde su turno.",
+    'derrota': lambda e: "\n¡Has sido derrotado!",
+    'victoria': lambda e: f"\n¡VICTORIA! Ganas {e.valor} XP.",
+    # Ataques del jugador
+    'fallo_ataque': lambda e: "¡Fallaste tu ataque!",
+    'ataque_jugador': lambda e: (
+        ("¡Golpe crítico!\n" if e.tipo is TipoEvento.CRITICO else "")
+        + f"¡Atacaste a {e.objetivo} por {e.valor} de daño!"
+        + (f"\n¡{e.objetivo} ha sido derrotado!" if e.extra else "")
+    ),
+    # Acciones enemigas
+    'fallo_enemigo': lambda e: f"{e.actor} falla su ataque.",
+    'ataque_enemigo': lambda e: f"{e.actor} ataca por {e.valor} de daño!",
+    'curacion_enemigo': lambda e: f"{e.actor} se cura {e.valor} puntos de vida!",
+    'fallo_hechizo': lambda e: f"{e.actor} falla su hechizo.",
+    'hechizo_enemigo': lambda e: f"{e.actor} lanza un hechizo de {e.extra} por {e.valor} de daño!",
+    'jefe_quemadura': lambda e: f"{e.actor} lanza un hechizo ígneo y aplica quemadura!",
+    'jefe_rabia': lambda e: f"{e.actor} entra en rabia y ataca por {e.valor} de daño!",
+    'jefe_regenera': lambda e: f"{e.actor} se regenera {e.valor} de vida y entra en furia!",
+    'jefe_final': lambda e: f"{e.actor} desata su fase final y golpea por {e.valor} de daño!",
+    # Habilidades
+    'habilidad_desconocida': lambda e: "Habilidad no reconocida.",
+    'sin_mana': lambda e: f"No tienes suficiente maná para usar {e.extra} (requiere {e.valor} MP).",
+    'fallo_habilidad': lambda e: f"Fallaste al usar {e.extra}. (-{e.valor} MP)",
+    'distorsion': lambda e: f"¡Has ralentizado a los enemigos vivos! (-2 velocidad, -{e.extra} MP)",
+    'plegado': lambda e: f"¡Has restaurado {e.valor} puntos de vida! (-{e.extra} MP)",
+    'singularidad': lambda e: (
+        f"¡Has infligido {e.valor} puntos de daño a todos los enemigos vivos! (-{e.extra[0]} MP)"
+        + _texto_derrotados(e.extra[1])
+    ),
+    'explosion': lambda e: (
+        f"¡Has infligido {e.valor} puntos de daño y reducido la defensa de los enemigos vivos! (-{e.extra[0]} MP)"
+        + _texto_derrotados(e.extra[1])
+    ),
+    'sin_objetivos': lambda e: "No hay enemigos vivos para apuntar.",
+    'necesita_objetivo': lambda e: "need_target",
+    'seleccion_invalida': lambda e: "Selección inválida.",
+    'rayo': lambda e: (
+        f"¡Lanzas un Rayo de Energía Pura sobre {e.objetivo} por {e.valor} de daño"
+        + (" (¡Crítico!)" if e.tipo is TipoEvento.CRITICO else "")
+        + f"! (-{e.extra[0]} MP)"
+        + (f"\n¡{e.objetivo} ha sido desintegrado!" if e.extra[1] else "")
+    ),
+    'sin_vida_transmutacion': lambda e: "No tienes suficiente vida para usar Transmutación de Materia.",
+    'transmutacion': lambda e: f"Sacrificas {e.extra[0]} HP para ganar {e.valor} MP. (-{e.extra[1]} MP)",
+    # Objetos y equipo
+    'vida_al_maximo': lambda e: "Ya tienes la vida al máximo.",
+    'pocion_vida': lambda e: f"Usaste una Poción de Vida y recuperaste {e.valor} puntos de vida.",
+    'sin_pocion_vida': lambda e: "No tienes Pociones de Vida.",
+    'mana_al_maximo': lambda e: "Ya tienes el maná al máximo.",
+    'pocion_mana': lambda e: f"Usaste una Poción de Mana y recuperaste {e.valor} puntos de maná.",
+    'sin_pocion_mana': lambda e: "No tienes Pociones de Mana.",
+    'sin_objeto': lambda e: "No tienes ese objeto disponible.",
+    'item_invalido': lambda e: "Ítem inválido.",
+    'equipar': lambda e: f"Has equipado {e.extra.get('nombre', 'objeto')} ({e.extra['tipo']}).",
+    # Estados y buffs
+    'estado_aplicado': lambda e: f"Estado {e.extra[0]} aplicado ({e.extra[1]}).",
+    'estado_nuevo': lambda e: f"{e.objetivo} sufre ahora {e.extra}.",
+    'estado_turno': lambda e: e.extra[0].format(objetivo=e.objetivo, dmg=e.valor, nombre=e.extra[1], turnos=e.extra[2]),
+    'estado_fin': lambda e: f"{e.objetivo} ya no sufre {e.extra}.",
+    'buff': lambda e: f"Tu defensa aumentó en {e.valor} ({e.extra[0]}%) durante {e.extra[1]} turnos.",
+    'buff_invalido': lambda e: "Buff inválido.",
+    'buff_fin': lambda e: f"El buff {e.extra[0]} de {e.extra[1]}% ha terminado.",
+    # Progresión
+    'subida_nivel': lambda e: f"\n¡{e.actor} ha subido al nivel {e.valor}!",
+    'mejora_estadistica': lambda e: f"¡{e.extra[0].capitalize()} aumentó en {e.valor} a {e.extra[1]}!",
+    'habilidad_inicial': lambda e: f"¡Habilidad adquirida al iniciar/cargar: {e.extra}!",
+    'habilidad_aprendida': lambda e: f"¡Has aprendido una nueva habilidad: {e.extra}!",
+    'habilidad_al_cargar': lambda e: f"¡Habilidad añadida al cargar: {e.extra}!",
+    'logro': lambda e: f"¡Logro desbloqueado: {e.extra}!",
+    # Botín y eventos aleatorios
+    'drop_pocion': lambda e: f"Has encontrado una {e.extra} en los restos del combate.",
+    'drop_arma': lambda e: f"Has encontrado un arma: {e.extra['nombre']} (+{e.extra['ataque']} ataque).",
+    'drop_armadura': lambda e: f"Has encontrado una armadura: {e.extra['nombre']} (+{e.extra['defensa']} defensa).",
+    'sin_drop': lambda e: "No encontraste nada valioso en el combate.",
+    'manantial': lambda e: f"¡Encuentras un manantial y recuperas {e.valor} puntos de vida!",
+    'trampa': lambda e: f"¡Caes en una trampa y pierdes {e.valor} puntos de vida!",
+    'trampa_mortal': lambda e: "La trampa ha sido mortal...",
+    'mercader': lambda e: "Te encuentras con un mercader ambulante.",
+    'compra_pocion': lambda e: f"Compras una Poción de Vida. Tienes {e.valor}.",
+    'sin_xp': lambda e: "No tienes suficiente XP.",
+    'camino_tranquilo': lambda e: "El camino está tranquilo. Continúas tu viaje.",
+}
+
+class BusEventos:
+    """
+    Reparte eventos a los suscriptores (callables que reciben el Evento).
+    Un bus sin suscriptores es falso: quien emite puede comprobar `if bus:`
+    antes de construir eventos que solo sirven para mostrarse.
+    """
+    __slots__ = ('suscriptores',)
+
+    def __init__(self):
+        self.suscriptores = []
+
+    def __bool__(self):
+        return bool(self.suscriptores)
+
+    def suscribir(self, suscriptor):
+        self.suscriptores.append(suscriptor)
+        return suscriptor
+
+    def desuscribir(self, suscriptor):
+        self.suscriptores.remove(suscriptor)
+
+    def emitir(self, evento):
+        for suscriptor in self.suscriptores:
+            suscriptor(evento)
+
+class RenderizadorConsola:
+    """Muestra cada evento por consola con su plantilla de texto."""
+    def __init__(self, salida=print):
+        self.salida = salida
+
+    def __call__(self, evento):
+        self.salida(str(evento))
+
+class SumideroJSONL:
+    """Escribe cada evento como una línea JSON en `archivo` (ruta o archivo abierto)."""
+    def __init__(self, archivo):
+        self._propio = isinstance(archivo, (str, os.PathLike))
+        self.archivo = open(archivo, "a", encoding='utf-8') if self._propio else archivo
+
+    def __call__(self, evento):
+        self.archivo.write(json.dumps(evento.to_dict(), ensure_ascii=False, default=str) + "\n")
+
+    def cerrar(self):
+        if self._propio:
+            self.archivo.close()
+
+class ContadorEventos:
+    """Cuenta eventos por tipo y por clave y acumula su valor por tipo (daño, curación, XP...)."""
+    def __init__(self):
+        self.por_tipo = Counter()
+        self.por_clave = Counter()
+        self.totales = Counter()
+
+    def __call__(self, evento):
+        self.por_tipo[evento.tipo] += 1
+        self.por_clave[evento.clave] += 1
+        if isinstance(evento.valor, (int, float)):
+            self.totales[evento.tipo] += evento.valor
+
+class HuellaEventos:
+    """
+    Huella (BLAKE2b) del flujo de eventos, sin formatear textos: dos partidas
+    con la misma huella emitieron los mismos eventos en el mismo orden.
+    """
+    def __init__(self):
+        self._hash = hashlib.blake2b(digest_size=16)
+        self.eventos = 0
+
+    def __call__(self, evento):
+        self.eventos += 1
+        self._hash.update(repr((evento.tipo.value, evento.clave, evento.actor,
+                                evento.objetivo, evento.valor, evento.extra)).encode())
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+# --- ESTADOS (poison, burn, stun...) ---
+class MotorEstados:
+    """
+    Estados temporales de un combatiente, compartido por Personaje y Enemigo.
+    Cada estado guarda el tick en que expira y un heap ordena las
+    expiraciones: por turno solo se recorren los estados que hacen daño y los
+    que expiran, y los mensajes solo se construyen si alguien los pide.
+    """
+    __slots__ = ('tick', 'expira', 'datos', 'danio', '_heap')
+
+    def __init__(self):
+        self.tick = 0
+        self.expira = {}   # nombre -> tick de expiración (en orden de aplicación)
+        self.datos = {}    # nombre -> campos del efecto salvo 'turnos'
+        self.danio = {}    # nombre -> daño por turno (todo estado salvo 'stun')
+        self._heap = []    # (tick, nombre); las entradas obsoletas se descartan al salir
+
+    def __contains__(self, nombre):
+        return nombre in self.expira
+
+    def __len__(self):
+        return len(self.expira)
+
+    def turnos_restantes(self, nombre):
+        return self.expira[nombre] - self.tick
+
+    def get(self, nombre, defecto=None):
+        if nombre not in self.expira:
+            return defecto
+        return dict(self.datos[nombre], turnos=self.turnos_restantes(nombre))
+
+    def aplicar(self, nombre, efecto):
+        """Si el estado ya existe se queda con la mayor duración (y su daño original)."""
+        expira = self.tick + efecto.get('turnos', 0)
+        actual = self.expira.get(nombre)
+        if actual is not None:
+            if expira <= actual:
+                return
+        else:
+            self.datos[nombre] = {k: v for k, v in efecto.items() if k != 'turnos'}
+            if nombre != 'stun':
+                self.danio[nombre] = efecto.get('dmg', 0)
+        self.expira[nombre] = expira
+        heapq.heappush(self._heap, (expira, nombre))
+
+    def procesar(self, objetivo, formato_stun, formato_danio, eventos=None):
+        """
+        Avanza un turno: aplica el daño de los estados a `objetivo.vida` y
+        elimina los expirados. Si `eventos` es una lista, añade un Evento por
+        estado con el formato de texto del combatiente.
+        """
+        self.tick += 1
+        tick = self.tick
+        if eventos is None:
+            for dmg in self.danio.values():
+                objetivo.vida -= dmg
+        else:
+            for nombre, expira in self.expira.items():
+                if nombre == 'stun':
+                    eventos.append(Evento(TipoEvento.ESTADO, 'estado_turno', None, objetivo.nombre, 0, (formato_stun, nombre, expira - tick)))
+                else:
+                    dmg = self.danio[nombre]
+                    objetivo.vida -= dmg
+                    eventos.append(Evento(TipoEvento.ESTADO, 'estado_turno', None, objetivo.nombre, dmg, (formato_danio, nombre, expira - tick)))
+
+        heap = self._heap
+        vencidos = []
+        while heap and heap[0][0] <= tick:
+            expira, nombre = heapq.heappop(heap)
+            if self.expira.get(nombre) == expira:
+                vencidos.append(nombre)
+        if vencidos:
+            if eventos is not None and len(vencidos) > 1:
+                vencidos.sort(key=list(self.expira).index)
+            for nombre in vencidos:
+                del self.expira[nombre]
+                del self.datos[nombre]
+                self.danio.pop(nombre, None)
+                if eventos is not None:
+                    eventos.append(Evento(TipoEvento.ESTADO, 'estado_fin', None, objetivo.nombre, None, nombre))
+        return eventos
+
+    def compactar(self):
+        """Rehace el heap sin las entradas obsoletas que dejan los estados reaplicados."""
+        if len(self._heap) > len(self.expira):
+            self._heap = [(expira, nombre) for nombre, expira in self.expira.items()]
+            heapq.heapify(self._heap)
+
+    def to_dict(self):
+        return {nombre: self.get(nombre) for nombre in self.expira}
+
+    @staticmethod
+    def from_dict(d):
+        motor = MotorEstados()
+        for nombre, efecto in d.items():
+            motor.aplicar(nombre, efecto)
+        return motor
+
+    # Instantánea inmutable para EstadoCombate (los dicts de `datos` nunca se
+    # modifican tras crearse, así que se comparten)
+    def instantanea(self):
+        return (self.tick, tuple(self.expira.items()), tuple(self.datos.items()),
+                tuple(self.danio.items()), tuple(self._heap))
+
+    @staticmethod
+    def desde_instantanea(t):
+        motor = MotorEstados.__new__(MotorEstados)
+        motor.tick, expira, datos, danio, heap = t
+        motor.expira = dict(expira)
+        motor.datos = dict(datos)
+        motor.danio = dict(danio)
+        motor._heap = list(heap)
+        return motor
+
+# --- BUFFS (modificadores temporales de estadísticas) ---
+class PilaModificadores:
+    """
+    Buffs temporales apilables. Mantiene un total acumulado por estadística
+    (lectura O(1)) y expira los buffs desde un heap ordenado por el tick en
+    que vencen, así que cada turno solo toca los buffs que terminan.
+    Admite cualquier estadística ('defensa', 'ataque', 'velocidad'...).
+    """
+    __slots__ = ('tick', 'totales', 'activos', '_heap', '_siguiente')
+
+    def __init__(self):
+        self.tick = 0
+        self.totales = {}   # tipo -> suma de incrementos activos
+        self.activos = {}   # id -> (tipo, incremento, porcentaje, tick de expiración)
+        self._heap = []     # (tick de expiración, id)
+        self._siguiente = 0
+
+    def __len__(self):
+        return len(self.activos)
+
+    def total(self, tipo):
+        return self.totales.get(tipo, 0)
+
+    def agregar(self, tipo, incremento, turnos, porcentaje=''):
+        ident = self._siguiente
+        self._siguiente += 1
+        expira = self.tick + turnos
+        self.activos[ident] = (tipo, incremento, porcentaje, expira)
+        self.totales[tipo] = self.totales.get(tipo, 0) + incremento
+        heapq.heappush(self._heap, (expira, ident))
+        return ident
+
+    def avanzar(self):
+        """Avanza un turno y retorna los buffs expirados (del más reciente al más antiguo)."""
+        self.tick += 1
+        heap = self._heap
+        if not heap or heap[0][0] > self.tick:
+            return ()
+        vencidos = []
+        while heap and heap[0][0] <= self.tick:
+            vencidos.append(heapq.heappop(heap)[1])
+        vencidos.sort(reverse=True)
+        expirados = []
+        for ident in vencidos:
+            tipo, incremento, porcentaje, _ = buff = self.activos.pop(ident)
+            self.totales[tipo] -= incremento
+            expirados.append(buff)
+        return expirados
+
+    def to_list(self):
+        return [
+            {'tipo': tipo, 'incremento': incremento, 'turnos': expira - self.tick, 'porcentaje': porcentaje}
+            for tipo, incremento, porcentaje, expira in self.activos.values()
+        ]
+
+    @staticmethod
+    def from_list(buffs):
+        pila = PilaModificadores()
+        for b in buffs:
+            pila.agregar(b.get('tipo'), b.get('incremento', 0), b.get('turnos', 0), b.get('porcentaje', ''))
+        return pila
+
+    def instantanea(self):
+        return (self.tick, tuple(self.totales.items()), tuple(self.activos.items()),
+                tuple(self._heap), self._siguiente)
+
+    @staticmethod
+    def desde_instantanea(t):
+        pila = PilaModificadores.__new__(PilaModificadores)
+        pila.tick, totales, activos, heap, pila._siguiente = t
+        pila.totales = dict(totales)
+        pila.activos = dict(activos)
+        pila._heap = list(heap)
+        return pila
+
+# Estados vacíos compartidos (nunca se modifican): el motor propio se crea al
+# aplicar el primer estado
+SIN_ESTADOS = MotorEstados()
+
+# --- REGISTRO DE HABILIDADES ---
+# Cada habilidad se define una sola vez (coste, objetivo, si puede fallar y
+# efecto); usar_habilidad la resuelve con una única búsqueda en HABILIDADES.
+OBJETIVO_PROPIO = "propio"      # solo afecta al jugador
+OBJETIVO_TODOS = "todos"        # todos los enemigos vivos
+OBJETIVO_UNO = "uno"            # un enemigo vivo elegido (requiere target_index)
+
+class Habilidad:
+    __slots__ = ('nombre', 'costo', 'objetivo', 'puede_fallar', 'cobra_mana', 'efecto')
+
+    def __init__(self, nombre, costo, objetivo, efecto, puede_fallar=False, cobra_mana=True):
+        self.nombre = nombre
+        self.costo = costo
+        self.objetivo = objetivo
+        self.puede_fallar = puede_fallar
+        self.cobra_mana = cobra_mana
+        # efecto(jugador, costo, enemigos_vivos, target_index) -> Evento
+        self.efecto = efecto
+
+HABILIDADES = {}
+
+def registrar_habilidad(nombre, objetivo, puede_fallar=False, cobra_mana=True):
+    """Decorador que registra `efecto` como la habilidad `nombre` (su coste viene del contenido)."""
+    def decorador(efecto):
+        costo = CONTENIDO_BASE['habilidades'][nombre]['costo']
+        HABILIDADES[nombre] = Habilidad(nombre, costo, objetivo, efecto, puede_fallar, cobra_mana)
+        return efecto
+    return decorador
+
+@registrar_habilidad("Distorsión Temporal", OBJETIVO_TODOS)
+def _distorsion_temporal(jugador, costo, enemigos_vivos, target_index):
+    for enemigo in enemigos_vivos:
+        enemigo.velocidad = max(1, enemigo.velocidad - 2)
+    return Evento(TipoEvento.HABILIDAD, 'distorsion', jugador.nombre, None, 2, costo)
+
+@registrar_habilidad("Plegado Espacial", OBJETIVO_PROPIO)
+def _plegado_espacial(jugador, costo, enemigos_vivos, target_index):
+    curado = min(jugador.max_vida - jugador.vida, 50)
+    jugador.restaurar_vida(curado)
+    return Evento(TipoEvento.CURACION, 'plegado', jugador.nombre, jugador.nombre, curado, costo)
+
+@registrar_habilidad("Singularidad Cuántica", OBJETIVO_TODOS, puede_fallar=True)
+def _singularidad_cuantica(jugador, costo, enemigos_vivos, target_index):
+    derrotados = 0
+    for enemigo in enemigos_vivos:
+        enemigo.vida -= 30
+        if enemigo.vida <= 0:
+            derrotados += 1
+    return Evento(TipoEvento.HABILIDAD, 'singularidad', jugador.nombre, None, 30, (costo, derrotados))
+
+@registrar_habilidad("Explosión de Energía", OBJETIVO_TODOS, puede_fallar=True)
+def _explosion_de_energia(jugador, costo, enemigos_vivos, target_index):
+    derrotados = 0
+    for enemigo in enemigos_vivos:
+        enemigo.vida -= 20
+        enemigo.defensa = max(1, enemigo.defensa - 2)
+        if enemigo.vida <= 0:
+            derrotados += 1
+    return Evento(TipoEvento.HABILIDAD, 'explosion', jugador.nombre, None, 20, (costo, derrotados))
+
+@registrar_habilidad("Rayo de Energía Pura", OBJETIVO_UNO, puede_fallar=True)
+def _rayo_de_energia_pura(jugador, costo, enemigos_vivos, target_index):
+    if not enemigos_vivos:
+        return Evento(TipoEvento.AVISO, 'sin_objetivos', jugador.nombre)
+    if target_index is None:
+        return Evento(TipoEvento.AVISO, 'necesita_objetivo', jugador.nombre)
+    if not (0 <= target_index < len(enemigos_vivos)):
+        return Evento(TipoEvento.AVISO, 'seleccion_invalida', jugador.nombre)
+    enemigo = enemigos_vivos[target_index]
+    danio = jugador.ataque + 25
+    arma = jugador.equipo.get("arma")
+    if arma and isinstance(arma, dict):
+        danio += arma.get("ataque", 0)
+    tipo = TipoEvento.HABILIDAD
+    if jugador.rng.random() < CRIT_CHANCE:
+        danio = int(danio * CRIT_MULT)
+        tipo = TipoEvento.CRITICO
+    enemigo.vida -= danio
+    return Evento(tipo, 'rayo', jugador.nombre, enemigo.nombre, danio, (costo, enemigo.vida <= 0))
+
+@registrar_habilidad("Transmutación de Materia", OBJETIVO_PROPIO, cobra_mana=False)
+def _transmutacion_de_materia(jugador, costo, enemigos_vivos, target_index):
+    # Consume vida para recuperar maná
+    costo_vida = 20
+    if jugador.vida <= costo_vida:
+        return Evento(TipoEvento.AVISO, 'sin_vida_transmutacion', jugador.nombre)
+    jugador.vida -= costo_vida
+    jugador.mana = max(0, jugador.mana - costo)
+    mana_recuperado = min(40, jugador.max_mana - jugador.mana)
+    jugador.mana += mana_recuperado
+    return Evento(TipoEvento.HABILIDAD, 'transmutacion', jugador.nombre, jugador.nombre, mana_recuperado, (costo_vida, costo))
+
+@registrar_habilidad("Bastión Temporal", OBJETIVO_PROPIO)
+def _bastion_temporal(jugador, costo, enemigos_vivos, target_index):
+    # buff de defensa del 10% durante 3 turnos
+    return jugador.aplicar_buff_defensa(10, turnos=3)
+
+# --- INVENTARIO ---
+# Consumibles apilables (nombre -> cantidad, en orden de llegada) y equipo
+# guardado: los objetos iguales se guardan una sola vez con su cantidad y cada
+# ranura ('arma', 'armadura') mantiene sus objetos ordenados por su
+# estadística principal, así que el mejor de cada una se lee sin recorrer nada.
+ESTADISTICA_RANURA = {'arma': 'ataque', 'armadura': 'defensa'}
+
+class Inventario:
+    """
+    Inventario de un Personaje. Cantidad de un consumible, si queda alguno,
+    objetos por ranura y mejor objeto de una ranura son O(1); guardar o
+    retirar equipo es O(log n) en objetos distintos.
+    """
+    __slots__ = ('consumibles', 'total_consumibles', 'objetos', 'por_ranura', 'orden')
+
+    def __init__(self, consumibles=None):
+        # Los agotados se quedan con 0: conservan su posición en el menú
+        self.consumibles = dict(consumibles or {})
+        self.total_consumibles = sum(self.consumibles.values())
+        self.objetos = {}       # clave (JSON canónico) -> [objeto, cantidad]
+        self.por_ranura = {}    # ranura -> cantidad de objetos guardados
+        self.orden = {}         # ranura -> [(estadística, clave)] ascendente
+
+    # --- Consumibles ---
+    def cantidad(self, nombre):
+        return self.consumibles.get(nombre, 0)
+
+    def agregar(self, nombre, cantidad=1):
+        """Suma `cantidad` al consumible `nombre`. Retorna cuántos hay ahora."""
+        total = self.consumibles[nombre] = self.consumibles.get(nombre, 0) + cantidad
+        self.total_consumibles += cantidad
+        return total
+
+    def consumir(self, nombre):
+        """Gasta uno de `nombre`. Retorna False si no queda ninguno."""
+        if self.consumibles.get(nombre, 0) <= 0:
+            return False
+        self.consumibles[nombre] -= 1
+        self.total_consumibles -= 1
+        return True
+
+    def hay_consumibles(self):
+        return self.total_consumibles > 0
+
+    def disponibles(self):
+        """[(nombre, cantidad)] de los consumibles que quedan, en orden de llegada."""
+        return [(nombre, cantidad) for nombre, cantidad in self.consumibles.items() if cantidad > 0]
+
+    # --- Equipo guardado ---
+    def guardar(self, objeto, cantidad=1):
+        """Guarda `cantidad` copias de `objeto` (dict con 'tipo' = ranura)."""
+        clave = json.dumps(objeto, sort_keys=True, ensure_ascii=False)
+        ranura = objeto.get('tipo')
+        entrada = self.objetos.get(clave)
+        if entrada is None:
+            self.objetos[clave] = [objeto, cantidad]
+            valor = objeto.get(ESTADISTICA_RANURA.get(ranura), 0)
+            bisect.insort(self.orden.setdefault(ranura, []), (valor, clave))
+        else:
+            entrada[1] += cantidad
+        self.por_ranura[ranura] = self.por_ranura.get(ranura, 0) + cantidad
+
+    def retirar(self, objeto):
+        """Saca una copia de `objeto`. Retorna False si no estaba guardado."""
+        clave = json.dumps(objeto, sort_keys=True, ensure_ascii=False)
+        entrada = self.objetos.get(clave)
+        if entrada is None:
+            return False
+        ranura = objeto.get('tipo')
+        self.por_ranura[ranura] -= 1
+        entrada[1] -= 1
+        if entrada[1] == 0:
+            del self.objetos[clave]
+            orden = self.orden[ranura]
+            del orden[bisect.bisect_left(orden, (objeto.get(ESTADISTICA_RANURA.get(ranura), 0), clave))]
+        return True
+
+    def mejor(self, ranura):
+        """El objeto guardado de `ranura` con más ataque/defensa, o None."""
+        orden = self.orden.get(ranura)
+        return self.objetos[orden[-1][1]][0] if orden else None
+
+    def cuenta(self, ranura):
+        return self.por_ranura.get(ranura, 0)
+
+    def guardados(self, ranura=None):
+        """[(objeto, cantidad)] del equipo guardado (de `ranura`, de peor a mejor)."""
+        if ranura is None:
+            return [tuple(entrada) for entrada in self.objetos.values()]
+        return [tuple(self.objetos[clave]) for _, clave in self.orden.get(ranura, ())]
+
+    # --- Serialización ---
+    # Misma forma que el antiguo dict de inventario: consumibles y 'Objetos';
+    # los objetos repetidos llevan 'cantidad' en lugar de ir repetidos.
+    def to_dict(self):
+        datos = dict(self.consumibles)
+        if self.objetos:
+            datos['Objetos'] = [dict(objeto, cantidad=n) if n > 1 else dict(objeto) for objeto, n in self.objetos.values()]
+        return datos
+
+    @staticmethod
+    def from_dict(d):
+        inventario = Inventario({k: v for k, v in d.items() if k != 'Objetos'})
+        for entrada in d.get('Objetos', ()):
+            objeto = dict(entrada)
+            inventario.guardar(objeto, objeto.pop('cantidad', 1))
+        return inventario
+
+    # En combate solo cambian los consumibles
+    def instantanea(self):
+        return tuple(self.consumibles.items())
+
+    def restaurar(self, t):
+        self.consumibles = dict(t)
+        self.total_consumibles = sum(self.consumibles.values())
+
 class Personaje:
     """
     Representa al personaje principal del jugador.
     """
-    def __init__(self, nombre):
+    __slots__ = (
+        'nombre', 'nivel', 'xp', 'vida_base', 'mana_base', 'ataque', 'defensa_base',
+        'buffs', 'vida', 'mana', 'velocidad', 'elemento', 'habilidades',
+        'inventario', 'estados', 'equipo', 'puntos_talento', 'pasivas_aplicadas', 'rng',
+    )
+
+    # Mensajes variables (plantilla compartida)
+    mensajes_ataque = MENSAJES_ATAQUE
+
+    def __init__(self, nombre, rng=random):
         self.nombre = nombre
+        # Flujo aleatorio (Juego inyecta el suyo; por defecto el módulo global)
+        self.rng = rng
         self.nivel = 1
         self.xp = 0
         # Estadísticas base (sin buffs temporales)
@@ -43,37 +792,26 @@ class Personaje:
         self.ataque = 10
         self.defensa_base = 8
 
-        # Buffs temporales (lista para permitir apilamiento y expiración individual)
-        self.buffs = []  # cada buff: {'tipo':'defensa', 'incremento':int, 'turnos':int, 'porcentaje':int}
+        # Buffs temporales (apilables, con expiración individual)
+        self.buffs = PilaModificadores()
 
         # Estadísticas actuales
         self.vida = self.max_vida
         self.mana = self.max_mana
-        self.defensa = self.defensa_base
 
         self.velocidad = 5
         self.elemento = Elemento.TIEMPO
         self.habilidades = ["Explosión de Energía"]  # Habilidad inicial
-        self.inventario = {"Poción de Vida": 3, "Poción de Mana": 2}
+        self.inventario = Inventario({"Poción de Vida": 3, "Poción de Mana": 2})
         # Estados (poison, burn, stun, etc.)
-        self.estados = {}
+        self.estados = SIN_ESTADOS
 
         # Equipo sencillo: arma y armadura
         self.equipo = {"arma": None, "armadura": None}
 
-        # Puntos de talento y árbol simple
+        # Puntos de talento y árbol simple (PASIVAS); solo se guardan las aplicadas
         self.puntos_talento = 0
-        self.habilidades_pasivas = {
-            "Furia": {"desc": "+2 ataque", "costo": 1, "aplicado": False},
-            "Coraza": {"desc": "+2 defensa", "costo": 1, "aplicado": False}
-        }
-
-        # Mensajes variables
-        self.mensajes_ataque = [
-            "¡Un golpe certero!",
-            "¡Impacto devastador!",
-            "¡Golpe rápido y preciso!"
-        ]
+        self.pasivas_aplicadas = ()
 
     @property
     def max_vida(self):
@@ -83,10 +821,40 @@ class Personaje:
     def max_mana(self):
         return int(self.mana_base + (self.nivel - 1) * MANA_GANADO_POR_NIVEL)
 
-    def subir_nivel(self):
+    @property
+    def defensa(self):
+        """Defensa actual: base más los buffs de defensa activos."""
+        return self.defensa_base + self.buffs.total('defensa')
+
+    @property
+    def habilidades_pasivas(self):
+        """Vista del árbol de pasivas con el estado 'aplicado' de este personaje."""
+        return {
+            nombre: {"desc": info["desc"], "costo": info["costo"], "aplicado": nombre in self.pasivas_aplicadas}
+            for nombre, info in PASIVAS.items()
+        }
+
+    def aplicar_pasiva(self, clave):
+        """Gasta puntos de talento en la pasiva `clave`. Retorna un mensaje."""
+        info = PASIVAS[clave]
+        if clave in self.pasivas_aplicadas:
+            return "Ya has aplicado esta pasiva."
+        if self.puntos_talento < info['costo']:
+            return "No tienes suficientes puntos."
+        self.puntos_talento -= info['costo']
+        self.pasivas_aplicadas += (clave,)
+        # aplicar efecto simple
+        if clave == 'Furia':
+            self.ataque += 2
+        elif clave == 'Coraza':
+            self.defensa_base += 2
+        return f"Has desbloqueado {clave}."
+
+    def subir_nivel(self, eventos=None):
         """
         Procesa subida de nivel mientras haya XP suficiente.
         Actualiza vida/mana/estadísticas base y respeta los buffs actuales.
+        Los avisos de nivel se emiten a `eventos` (un BusEventos), si se da.
         """
         subio = False
         while self.xp >= self.nivel * XP_POR_NIVEL_BASE:
@@ -105,26 +873,21 @@ class Personaje:
             self.vida = self.max_vida
             self.mana = self.max_mana
 
-            # Recalcular defensa actual respetando buff acumulado
-            total_inc = sum(b.get('incremento', 0) for b in self.buffs if b.get('tipo') == 'defensa')
-            self.defensa = self.defensa_base + total_inc
-
-            print(f"\n¡{self.nombre} ha subido al nivel {self.nivel}!")
+            if eventos:
+                eventos.emitir(Evento(TipoEvento.NIVEL, 'subida_nivel', self.nombre, None, self.nivel))
             # Mejora aleatoria leve
-            stat = random.choice(['ataque', 'defensa_base', 'velocidad'])
-            aumento = random.randint(2, 5)
+            stat = self.rng.choice(['ataque', 'defensa_base', 'velocidad'])
+            aumento = self.rng.randint(2, 5)
             if stat == 'defensa_base':
                 self.defensa_base += aumento
-                # actualizar defensa actual
-                total_inc = sum(b.get('incremento', 0) for b in self.buffs if b.get('tipo') == 'defensa')
-                self.defensa = self.defensa_base + total_inc
                 actual_val = self.defensa_base
                 stat_name = "defensa"
             else:
                 setattr(self, stat, getattr(self, stat) + aumento)
                 actual_val = getattr(self, stat)
                 stat_name = stat
-            print(f"¡{stat_name.capitalize()} aumentó en {aumento} a {actual_val}!")
+            if eventos:
+                eventos.emitir(Evento(TipoEvento.NIVEL, 'mejora_estadistica', self.nombre, None, aumento, (stat_name, actual_val)))
             subio = True
             # Otorgar punto de talento por nivel
             self.puntos_talento += 1
@@ -132,167 +895,79 @@ class Personaje:
 
     def usar_habilidad(self, habilidad, enemigos, target_index=None):
         """
-        Ejecuta la habilidad elegida. Retorna un mensaje con el resultado.
+        Ejecuta la habilidad elegida. Retorna un Evento con el resultado.
         `target_index` es opcional y se usa para habilidades dirigidas.
+        La definición de cada habilidad está en el registro HABILIDADES.
         """
-        costos = {
-            "Distorsión Temporal": 15,
-            "Plegado Espacial": 20,
-            "Singularidad Cuántica": 30,
-            "Explosión de Energía": 25,
-            "Rayo de Energía Pura": 22,
-            "Transmutación de Materia": 5,
-            "Bastión Temporal": 12
-        }
-        costo = costos.get(habilidad, 0)
+        hab = HABILIDADES.get(habilidad)
+        if hab is None:
+            return Evento(TipoEvento.AVISO, 'habilidad_desconocida', self.nombre)
+        costo = hab.costo
         if self.mana < costo:
-            return f"No tienes suficiente maná para usar {habilidad} (requiere {costo} MP)."
+            return Evento(TipoEvento.AVISO, 'sin_mana', self.nombre, None, costo, habilidad)
 
-        enemigos_vivos = [e for e in enemigos if e.vida > 0]
-        mensaje = ""
+        enemigos_vivos = [e for e in enemigos if e.vida > 0] if hab.objetivo != OBJETIVO_PROPIO else None
 
-        # Habilidad especial: Transmutación consume vida para recuperar maná
-        if habilidad == "Transmutación de Materia":
-            costo_vida = 20
-            if self.vida <= costo_vida:
-                return "No tienes suficiente vida para usar Transmutación de Materia."
-            self.vida -= costo_vida
-            self.mana = max(0, self.mana - costo)
-            mana_recuperado = min(40, self.max_mana - self.mana)
-            self.mana += mana_recuperado
-            return f"Sacrificas {costo_vida} HP para ganar {mana_recuperado} MP. (-{costo} MP)"
-
-        # Consumo normal de maná
-        self.mana -= costo
+        # Consumo normal de maná (Transmutación gestiona su propio coste)
+        if hab.cobra_mana:
+            self.mana -= costo
 
         # Para habilidades de daño dirigidas/combativas aplicamos probabilidad de fallo del héroe
-        habilidades_de_daño = {"Singularidad Cuántica", "Explosión de Energía", "Rayo de Energía Pura"}
-        if habilidad in habilidades_de_daño:
-            if random.random() < HERO_MISS_CHANCE:
-                return f"Fallaste al usar {habilidad}. (-{costo} MP)"
-
-        if habilidad == "Distorsión Temporal":
-            for enemigo in enemigos_vivos:
-                enemigo.velocidad = max(1, enemigo.velocidad - 2)
-            mensaje = f"¡Has ralentizado a los enemigos vivos! (-2 velocidad, -{costo} MP)"
-        elif habilidad == "Plegado Espacial":
-            curado = min(self.max_vida - self.vida, 50)
-            self.restaurar_vida(curado)
-            mensaje = f"¡Has restaurado {curado} puntos de vida! (-{costo} MP)"
-        elif habilidad == "Singularidad Cuántica":
-            derrotados = 0
-            for enemigo in enemigos_vivos:
-                enemigo.vida -= 30
-                if enemigo.vida <= 0:
-                    derrotados += 1
-            mensaje = f"¡Has infligido 30 puntos de daño a todos los enemigos vivos! (-{costo} MP)"
-            if derrotados > 0:
-                mensaje += f" Derrotaste a {derrotados} enemigo(s)."
-        elif habilidad == "Explosión de Energía":
-            derrotados = 0
-            for enemigo in enemigos_vivos:
-                enemigo.vida -= 20
-                enemigo.defensa = max(1, enemigo.defensa - 2)
-                if enemigo.vida <= 0:
-                    derrotados += 1
-            mensaje = f"¡Has infligido 20 puntos de daño y reducido la defensa de los enemigos vivos! (-{costo} MP)"
-            if derrotados > 0:
-                mensaje += f" Derrotaste a {derrotados} enemigo(s)."
-        elif habilidad == "Rayo de Energía Pura":
-            if not enemigos_vivos:
-                return "No hay enemigos vivos para apuntar."
-            if target_index is None:
-                return "need_target"
-            if not (0 <= target_index < len(enemigos_vivos)):
-                return "Selección inválida."
-            enemigo = enemigos_vivos[target_index]
-            danio = self.ataque + 25
-            arma = self.equipo.get("arma")
-            if arma and isinstance(arma, dict):
-                danio += arma.get("ataque", 0)
-            if random.random() < CRIT_CHANCE:
-                danio = int(danio * CRIT_MULT)
-                crit_msg = " (¡Crítico!)"
-            else:
-                crit_msg = ""
-            enemigo.vida -= danio
-            mensaje = f"¡Lanzas un Rayo de Energía Pura sobre {enemigo.nombre} por {danio} de daño{crit_msg}! (-{costo} MP)"
-            if enemigo.vida <= 0:
-                mensaje += f"\n¡{enemigo.nombre} ha sido desintegrado!"
-        elif habilidad == "Bastión Temporal":
-            # buff de defensa del 10% durante 3 turnos
-            mensaje = self.aplicar_buff_defensa(10, turnos=3)
-        else:
-            # habilidad desconocida -> ya se descontó maná, devolvemos maná y mensaje
-            self.mana += costo
-            mensaje = "Habilidad no reconocida."
-        return mensaje
+        if hab.puede_fallar and self.rng.random() < HERO_MISS_CHANCE:
+            return Evento(TipoEvento.FALLO, 'fallo_habilidad', self.nombre, None, costo, habilidad)
+
+        return hab.efecto(self, costo, enemigos_vivos, target_index)
 
     def usar_objeto(self, objeto):
         if objeto == "Poción de Vida":
-            if self.inventario.get(objeto, 0) > 0:
+            if self.inventario.cantidad(objeto) > 0:
                 if self.vida >= self.max_vida:
-                    return "Ya tienes la vida al máximo."
+                    return Evento(TipoEvento.AVISO, 'vida_al_maximo', self.nombre)
                 cantidad = min(CANTIDAD_CURACION_POCION_VIDA, self.max_vida - self.vida)
                 self.restaurar_vida(cantidad)
-                self.inventario[objeto] -= 1
-                return f"Usaste una Poción de Vida y recuperaste {cantidad} puntos de vida."
+                self.inventario.consumir(objeto)
+                return Evento(TipoEvento.CURACION, 'pocion_vida', self.nombre, self.nombre, cantidad)
             else:
-                return "No tienes Pociones de Vida."
+                return Evento(TipoEvento.AVISO, 'sin_pocion_vida', self.nombre)
         elif objeto == "Poción de Mana":
-            if self.inventario.get(objeto, 0) > 0:
+            if self.inventario.cantidad(objeto) > 0:
                 if self.mana >= self.max_mana:
-                    return "Ya tienes el maná al máximo."
+                    return Evento(TipoEvento.AVISO, 'mana_al_maximo', self.nombre)
                 cantidad = min(CANTIDAD_CURACION_POCION_MANA, self.max_mana - self.mana)
                 self.mana = min(self.max_mana, self.mana + cantidad)
-                self.inventario[objeto] -= 1
-                return f"Usaste una Poción de Mana y recuperaste {cantidad} puntos de maná."
+                self.inventario.consumir(objeto)
+                return Evento(TipoEvento.OBJETO, 'pocion_mana', self.nombre, self.nombre, cantidad)
             else:
-                return "No tienes Pociones de Mana."
+                return Evento(TipoEvento.AVISO, 'sin_pocion_mana', self.nombre)
         else:
-            return "No tienes ese objeto disponible."
+            return Evento(TipoEvento.AVISO, 'sin_objeto', self.nombre)
 
     def restaurar_vida(self, cantidad):
         self.vida = min(self.max_vida, int(self.vida + cantidad))
 
     # --- Estados (poison, burn, stun) ---
+    FORMATO_STUN = "{objetivo} está aturdido y no puede actuar ({turnos} turnos restantes)."
+    FORMATO_DANIO_ESTADO = "{objetivo} sufre {dmg} de {nombre} ({turnos} turnos restantes)."
+
     def aplicar_estado(self, nombre, efecto):
         """efecto: dict con keys 'dmg' y 'turnos' o 'stun':True"""
-        existing = self.estados.get(nombre)
-        if existing:
-            existing['turnos'] = max(existing.get('turnos', 0), efecto.get('turnos', 0))
-        else:
-            self.estados[nombre] = efecto.copy()
-        return f"Estado {nombre} aplicado ({efecto})."
-
-    def procesar_estados(self):
-        mensajes = []
-        to_remove = []
-        for nombre, data in list(self.estados.items()):
-            if nombre == 'stun':
-                data['turnos'] -= 1
-                mensajes.append(f"{self.nombre} está aturdido y no puede actuar ({data['turnos']} turnos restantes).")
-                if data['turnos'] <= 0:
-                    to_remove.append(nombre)
-            else:
-                dmg = data.get('dmg', 0)
-                self.vida -= dmg
-                data['turnos'] -= 1
-                mensajes.append(f"{self.nombre} sufre {dmg} de {nombre} ({data['turnos']} turnos restantes).")
-                if data['turnos'] <= 0:
-                    to_remove.append(nombre)
-        for r in to_remove:
-            del self.estados[r]
-            mensajes.append(f"{self.nombre} ya no sufre {r}.")
-        return mensajes
+        if self.estados is SIN_ESTADOS:
+            self.estados = MotorEstados()
+        self.estados.aplicar(nombre, efecto)
+        return Evento(TipoEvento.ESTADO, 'estado_aplicado', None, self.nombre, None, (nombre, efecto))
+
+    def procesar_estados(self, silencioso=False):
+        """Avanza los estados un turno. Retorna los Eventos (ninguno si `silencioso`)."""
+        if not self.estados:
+            return ()
+        return self.estados.procesar(self, self.FORMATO_STUN, self.FORMATO_DANIO_ESTADO, None if silencioso else []) or ()
 
     def equipar(self, item):
         # item: dict con 'tipo' 'arma'/'armadura', 'nombre', y stats
         if not isinstance(item, dict) or 'tipo' not in item:
-            return "Ítem inválido."
-        tipo = item['tipo']
-        self.equipo[tipo] = item
-        return f"Has equipado {item.get('nombre', 'objeto')} ({tipo})."
+            return Evento(TipoEvento.AVISO, 'item_invalido', self.nombre)
+        self.equipo[item['tipo']] = item
+        return Evento(TipoEvento.OBJETO, 'equipar', self.nombre, None, None, item)
 
     # --- Serialización ---
     def to_dict(self):
@@ -309,13 +984,14 @@ class Personaje:
             'defensa': self.defensa,
             'velocidad': self.velocidad,
             'elemento': self.elemento.name,
-            'habilidades': self.habilidades,
-            'inventario': self.inventario,
-            'estados': self.estados,
-            'equipo': self.equipo,
+            # Copias: el resultado es una instantánea que puede serializarse en otro hilo
+            'habilidades': list(self.habilidades),
+            'inventario': self.inventario.to_dict(),
+            'estados': self.estados.to_dict(),
+            'equipo': dict(self.equipo),
             'puntos_talento': self.puntos_talento,
             'habilidades_pasivas': self.habilidades_pasivas,
-            'buffs': self.buffs,
+            'buffs': self.buffs.to_list(),
         }
 
     @staticmethod
@@ -329,7 +1005,7 @@ class Personaje:
         p.defensa_base = d.get('defensa_base', p.defensa_base)
         p.vida = d.get('vida', p.max_vida)
         p.mana = d.get('mana', p.max_mana)
-        p.defensa = d.get('defensa', p.defensa_base)
+        # 'defensa' se deriva de defensa_base y los buffs
         p.velocidad = d.get('velocidad', p.velocidad)
         elemento_name = d.get('elemento')
         if elemento_name:
@@ -337,376 +1013,2311 @@ class Personaje:
                 p.elemento = Elemento[elemento_name]
             except Exception:
                 p.elemento = Elemento.TIEMPO
-        p.habilidades = d.get('habilidades', p.habilidades)
-        p.inventario = d.get('inventario', p.inventario)
-        p.estados = d.get('estados', {})
-        p.equipo = d.get('equipo', p.equipo)
+        # Copias propias de los contenedores: el dict de origen puede reutilizarse
+        p.habilidades = list(d.get('habilidades', p.habilidades))
+        if 'inventario' in d:
+            p.inventario = Inventario.from_dict(d['inventario'])
+        p.estados = MotorEstados.from_dict(d['estados']) if d.get('estados') else SIN_ESTADOS
+        p.equipo = dict(d.get('equipo', p.equipo))
         p.puntos_talento = d.get('puntos_talento', 0)
-        p.habilidades_pasivas = d.get('habilidades_pasivas', p.habilidades_pasivas)
-        p.buffs = d.get('buffs', [])
+        pasivas = d.get('habilidades_pasivas', {})
+        p.pasivas_aplicadas = tuple(k for k in PASIVAS if pasivas.get(k, {}).get('aplicado'))
+        p.buffs = PilaModificadores.from_list(d.get('buffs', []))
         return p
 
     # --- Buffs de defensa ---
     def aplicar_buff_defensa(self, porcentaje, turnos=3):
         """
         Aplica un buff temporal sobre la defensa base.
-        Retorna mensaje descriptivo.
+        Retorna un Evento descriptivo.
         """
         if porcentaje <= 0 or turnos <= 0:
-            return "Buff inválido."
+            return Evento(TipoEvento.AVISO, 'buff_invalido', self.nombre)
         incremento = int(self.defensa_base * (porcentaje / 100.0))
         if incremento <= 0:
             incremento = 1
-        buff = {'tipo': 'defensa', 'incremento': incremento, 'turnos': turnos, 'porcentaje': porcentaje}
-        self.buffs.append(buff)
-        # recalcular defensa actual sumando todos los buffs de defensa
-        total_inc = sum(b.get('incremento', 0) for b in self.buffs if b.get('tipo') == 'defensa')
-        self.defensa = self.defensa_base + total_inc
-        return f"Tu defensa aumentó en {incremento} ({porcentaje}%) durante {turnos} turnos."
-
-    def actualizar_buffs(self):
-        """
-        Decrementa duración de buffs y los remueve cuando expiran.
-        Debe llamarse al final del turno enemigo.
-        """
-        mensajes = []
-        to_remove = []
-        for i, b in enumerate(self.buffs):
-            b['turnos'] -= 1
-            if b['turnos'] <= 0:
-                to_remove.append(i)
-        # eliminar buffs expirados
-        for idx in reversed(to_remove):
-            buff = self.buffs.pop(idx)
-            mensajes.append(f"El buff {buff.get('tipo')} de {buff.get('porcentaje', '')}% ha terminado.")
-        # recalcular defensa
-        total_inc = sum(b.get('incremento', 0) for b in self.buffs if b.get('tipo') == 'defensa')
-        self.defensa = self.defensa_base + total_inc
-        return "\n".join(mensajes) if mensajes else None
+        self.buffs.agregar('defensa', incremento, turnos, porcentaje)
+        return Evento(TipoEvento.BUFF, 'buff', self.nombre, self.nombre, incremento, (porcentaje, turnos))
+
+    def actualizar_buffs(self, silencioso=False):
+        """
+        Avanza un turno la duración de los buffs y retira los expirados.
+        Debe llamarse al final del turno enemigo. Retorna los Eventos de los
+        buffs terminados (ninguno si `silencioso`).
+        """
+        expirados = self.buffs.avanzar()
+        if not expirados or silencioso:
+            return ()
+        return [Evento(TipoEvento.BUFF, 'buff_fin', None, self.nombre, None, (tipo, porcentaje)) for tipo, _, porcentaje, _ in expirados]
+
+    # --- Instantánea de combate (solo lo que cambia durante una batalla) ---
+    # Estados y buffs vacíos se guardan como None: solo cuentan las duraciones
+    # relativas, así que equivalen a unos nuevos.
+    def instantanea_combate(self):
+        return (self.vida, self.mana,
+                self.estados.instantanea() if self.estados else None,
+                self.buffs.instantanea() if self.buffs else None,
+                self.inventario.instantanea())
+
+    def restaurar_combate(self, t):
+        self.vida, self.mana, estados, buffs, inventario = t
+        self.estados = MotorEstados.desde_instantanea(estados) if estados is not None else SIN_ESTADOS
+        if buffs is not None:
+            self.buffs = PilaModificadores.desde_instantanea(buffs)
+        elif self.buffs:
+            self.buffs = PilaModificadores()
+        self.inventario.restaurar(inventario)
 
 class Enemigo:
-    def __init__(self, nivel_jugador, elemento_jugador):
-        elementos = list(Elemento)
-        opciones = [e for e in elementos if e != elemento_jugador]
-        self.elemento = random.choice(opciones) if opciones else random.choice(elementos)
-        self.nivel = max(1, nivel_jugador + random.randint(-1, 2))
+    __slots__ = (
+        'elemento', 'nivel', 'vida_max', 'vida', 'ataque', 'defensa', 'velocidad',
+        'mana', 'tipo', 'fase', 'nombre', 'estados', 'rng',
+    )
+
+    def __init__(self, nivel_jugador, elemento_jugador, rng=random):
+        self._inicializar(nivel_jugador, elemento_jugador, rng)
+
+    def _inicializar(self, nivel_jugador, elemento_jugador, rng=random):
+        """Asigna todas las estadísticas; también se usa al reciclar un enemigo."""
+        self.rng = rng
+        self.elemento = rng.choice(ELEMENTOS_OPUESTOS.get(elemento_jugador, ELEMENTOS))
+        self.nivel = max(1, nivel_jugador + rng.randint(-1, 2))
         self.vida_max = 50 + (self.nivel * 10)
         self.vida = self.vida_max
         self.ataque = 8 + (self.nivel * 2)
         self.defensa = 5 + (self.nivel * 1)
         self.velocidad = 3 + (self.nivel * 1)
-        self.mana = 0
-
-        tipos_enemigo = ['Guerrero', 'Mago', 'Sanador', 'Clon', 'Asesino', 'Tanque']
-        pesos = [40, 30, 20, 10, 15, 25]
-        tipo = random.choices(tipos_enemigo, weights=pesos, k=1)[0]
-
-        if tipo == 'Guerrero':
-            self.ataque = int(self.ataque * 1.5)
-        elif tipo == 'Mago':
-            self.mana = 30 + (self.nivel * 5)
-        elif tipo == 'Sanador':
-            self.vida_max = int(self.vida_max * 0.8)
-            self.vida = self.vida_max
-            self.defensa = int(self.defensa * 1.2)
-        elif tipo == 'Clon':
+
+        tipo = rng.choices(TIPOS_ENEMIGO, weights=PESOS_ENEMIGO, k=1)[0]
+
+        # Multiplicadores del arquetipo (ARQUETIPOS_ENEMIGO, del contenido activo)
+        arquetipo = ARQUETIPOS_ENEMIGO[tipo]
+        self.vida_max = int(self.vida_max * arquetipo.vida)
+        self.vida = self.vida_max
+        self.ataque = int(self.ataque * arquetipo.ataque)
+        self.defensa = int(self.defensa * arquetipo.defensa)
+        self.velocidad = int(self.velocidad * arquetipo.velocidad)
+        self.mana = arquetipo.mana + self.nivel * arquetipo.mana_por_nivel
+        if arquetipo.copia_elemento:
             self.elemento = elemento_jugador
-            self.velocidad = int(self.velocidad * 2)
-        elif tipo == 'Asesino':
-            self.ataque = int(self.ataque * 1.2)
-            self.velocidad = int(self.velocidad * 1.5)
-        elif tipo == 'Tanque':
-            self.vida_max = int(self.vida_max * 1.5)
-            self.vida = self.vida_max
-            self.defensa = int(self.defensa * 1.5)
 
         self.tipo = tipo
+        self.fase = 0
         # Pequeña probabilidad de que el enemigo sea un jefe con fases
-        if random.random() < 0.08:
+        if rng.random() < PROB_JEFE:
+            jefe = ARQUETIPO_JEFE
             self.tipo = 'Jefe'
-            self.vida_max = int(self.vida_max * 2.5)
+            self.vida_max = int(self.vida_max * jefe.vida)
             self.vida = self.vida_max
-            self.ataque = int(self.ataque * 1.8)
-            self.defensa = int(self.defensa * 1.5)
-            self.velocidad = max(1, int(self.velocidad * 1.2))
+            self.ataque = int(self.ataque * jefe.ataque)
+            self.defensa = int(self.defensa * jefe.defensa)
+            self.velocidad = max(1, int(self.velocidad * jefe.velocidad))
             self.fase = 1
         self.nombre = f"{self.tipo} de {self.elemento.value} (Nvl {self.nivel})"
         # Inicializar estados por defecto (poison, burn, stun, etc.)
-        self.estados = {}
+        self.estados = SIN_ESTADOS
 
-    def _accion_jefe(self, jugador, defensa_jugador):
+    # Acciones del jefe en cada fase (vida > 66 %, > 33 %, resto)
+    ACCIONES_JEFE = (('hechizo', 'ataque'), ('quemadura', 'rabia'), ('regenera', 'final'))
+
+    def fase_jefe(self):
         hp_ratio = self.vida / max(1, self.vida_max)
-        if hp_ratio > 0.66:
+        return 0 if hp_ratio > 0.66 else 1 if hp_ratio > 0.33 else 2
+
+    def _accion_jefe(self, jugador, defensa_jugador):
+        fase = self.fase_jefe()
+        if fase == 0:
             # fase 1: ataques fuertes y ocasional hechizo
-            if random.random() < 0.3:
-                return self.lanzar_hechizo(jugador, defensa_jugador)
-            return self.atacar(jugador, defensa_jugador)
-        elif hp_ratio > 0.33:
-            # fase 2: usa habilidades, aplica burn y reduce defensa del jugador
-            if random.random() < 0.5:
-                jugador.aplicar_estado('burn', {'dmg': 5 + self.nivel, 'turnos': 3})
-                return f"{self.nombre} lanza un hechizo ígneo y aplica quemadura!"
-            else:
-                # ataque más potente
-                danio = max(0, (self.ataque * 2) - defensa_jugador)
-                jugador.vida -= danio
-                return f"{self.nombre} entra en rabia y ataca por {danio} de daño!"
+            opcion = 'hechizo' if self.rng.random() < 0.3 else 'ataque'
+        elif fase == 1:
+            # fase 2: aplica burn o un ataque más potente
+            opcion = 'quemadura' if self.rng.random() < 0.5 else 'rabia'
         else:
             # fase 3: berserk, puede curarse un poco
-            if random.random() < 0.4:
-                cura = int(self.vida_max * 0.08)
-                self.vida = min(self.vida_max, self.vida + cura)
-                return f"{self.nombre} se regenera {cura} de vida y entra en furia!"
-            danio = max(0, (self.ataque * 3) - defensa_jugador)
+            opcion = 'regenera' if self.rng.random() < 0.4 else 'final'
+        return self.accion_jefe(opcion, jugador, defensa_jugador)
+
+    def accion_jefe(self, opcion, jugador, defensa_jugador):
+        """Ejecuta la acción de jefe `opcion` (de ACCIONES_JEFE). Retorna su Evento."""
+        if opcion == 'hechizo':
+            return self.lanzar_hechizo(jugador, defensa_jugador)
+        if opcion == 'ataque':
+            return self.atacar(jugador, defensa_jugador)
+        if opcion == 'quemadura':
+            jugador.aplicar_estado('burn', {'dmg': 5 + self.nivel, 'turnos': 3})
+            return Evento(TipoEvento.ESTADO, 'jefe_quemadura', self.nombre, jugador.nombre)
+        if opcion == 'rabia':
+            danio = max(0, (self.ataque * 2) - defensa_jugador)
             jugador.vida -= danio
-            return f"{self.nombre} desata su fase final y golpea por {danio} de daño!"
-        
+            return Evento(TipoEvento.ATAQUE, 'jefe_rabia', self.nombre, jugador.nombre, danio)
+        if opcion == 'regenera':
+            cura = int(self.vida_max * 0.08)
+            self.vida = min(self.vida_max, self.vida + cura)
+            return Evento(TipoEvento.CURACION, 'jefe_regenera', self.nombre, self.nombre, cura)
+        danio = max(0, (self.ataque * 3) - defensa_jugador)
+        jugador.vida -= danio
+        return Evento(TipoEvento.ATAQUE, 'jefe_final', self.nombre, jugador.nombre, danio)
+
+
+    FORMATO_STUN = "{objetivo} está aturdido ({turnos} turnos restantes)."
+    FORMATO_DANIO_ESTADO = "{objetivo} sufre {dmg} de {nombre}. ({turnos} turnos restantes)"
 
     def aplicar_estado(self, nombre, efecto):
-        existing = self.estados.get(nombre)
-        if existing:
-            existing['turnos'] = max(existing.get('turnos', 0), efecto.get('turnos', 0))
-        else:
-            self.estados[nombre] = efecto.copy()
-        return f"{self.nombre} sufre ahora {nombre}."
-
-    def procesar_estados(self):
-        mensajes = []
-        to_remove = []
-        for nombre, data in list(self.estados.items()):
-            if nombre == 'stun':
-                data['turnos'] -= 1
-                mensajes.append(f"{self.nombre} está aturdido ({data['turnos']} turnos restantes).")
-                if data['turnos'] <= 0:
-                    to_remove.append(nombre)
-            else:
-                dmg = data.get('dmg', 0)
-                self.vida -= dmg
-                data['turnos'] -= 1
-                mensajes.append(f"{self.nombre} sufre {dmg} de {nombre}. ({data['turnos']} turnos restantes)")
-                if data['turnos'] <= 0:
-                    to_remove.append(nombre)
-        for r in to_remove:
-            del self.estados[r]
-            mensajes.append(f"{self.nombre} ya no sufre {r}.")
-        return mensajes
+        if self.estados is SIN_ESTADOS:
+            self.estados = MotorEstados()
+        self.estados.aplicar(nombre, efecto)
+        return Evento(TipoEvento.ESTADO, 'estado_nuevo', None, self.nombre, None, nombre)
+
+    def procesar_estados(self, silencioso=False):
+        """Avanza los estados un turno. Retorna los Eventos (ninguno si `silencioso`)."""
+        if not self.estados:
+            return ()
+        return self.estados.procesar(self, self.FORMATO_STUN, self.FORMATO_DANIO_ESTADO, None if silencioso else []) or ()
 
     def accion(self, jugador, defensa_jugador):
         if getattr(self, 'tipo', None) == 'Jefe':
             return self._accion_jefe(jugador, defensa_jugador)
         if self.tipo == 'Sanador' and self.vida < self.vida_max:
             return self.curar()
-        elif self.tipo == 'Mago' and random.random() < 0.6:
+        elif self.tipo == 'Mago' and self.rng.random() < 0.6:
             return self.lanzar_hechizo(jugador, defensa_jugador)
         else:
             return self.atacar(jugador, defensa_jugador)
 
     def atacar(self, jugador, defensa_jugador):
         # probabilidad de fallo del enemigo
-        if random.random() < ENEMY_MISS_CHANCE:
-            return f"{self.nombre} falla su ataque."
+        if self.rng.random() < ENEMY_MISS_CHANCE:
+            return Evento(TipoEvento.FALLO, 'fallo_enemigo', self.nombre, jugador.nombre)
         danio = max(0, self.ataque - defensa_jugador // 2)
         jugador.vida -= danio
-        return f"{self.nombre} ataca por {danio} de daño!"
+        return Evento(TipoEvento.ATAQUE, 'ataque_enemigo', self.nombre, jugador.nombre, danio)
 
     def curar(self):
         curacion = int(self.defensa * 1.5)
         self.vida = min(self.vida_max, self.vida + curacion)
-        return f"{self.nombre} se cura {curacion} puntos de vida!"
+        return Evento(TipoEvento.CURACION, 'curacion_enemigo', self.nombre, self.nombre, curacion)
 
     def lanzar_hechizo(self, jugador, defensa_jugador):
         # probabilidad de fallo del enemigo al lanzar hechizo
-        if random.random() < ENEMY_MISS_CHANCE:
-            return f"{self.nombre} falla su hechizo."
+        if self.rng.random() < ENEMY_MISS_CHANCE:
+            return Evento(TipoEvento.FALLO, 'fallo_hechizo', self.nombre, jugador.nombre)
         danio = max(0, (self.ataque * 2) - defensa_jugador)
         jugador.vida -= danio
-        return f"{self.nombre} lanza un hechizo de {self.elemento.value} por {danio} de daño!"
+        return Evento(TipoEvento.ATAQUE, 'hechizo_enemigo', self.nombre, jugador.nombre, danio, self.elemento.value)
+
+    # --- Serialización (punto de control de una batalla en curso) ---
+    CAMPOS = ('nivel', 'vida_max', 'vida', 'ataque', 'defensa', 'velocidad', 'mana', 'tipo', 'fase', 'nombre')
+
+    def to_dict(self):
+        d = {campo: getattr(self, campo) for campo in self.CAMPOS}
+        d['elemento'] = self.elemento.name
+        d['estados'] = self.estados.to_dict()
+        return d
+
+    def instantanea_combate(self):
+        return (self.vida, self.ataque, self.defensa, self.velocidad, self.mana, self.fase,
+                self.estados.instantanea() if self.estados else None)
+
+    def restaurar_combate(self, t):
+        self.vida, self.ataque, self.defensa, self.velocidad, self.mana, self.fase, estados = t
+        self.estados = MotorEstados.desde_instantanea(estados) if estados is not None else SIN_ESTADOS
+
+    @staticmethod
+    def from_dict(d, rng=random):
+        enemigo = Enemigo.__new__(Enemigo)
+        for campo in Enemigo.CAMPOS:
+            setattr(enemigo, campo, d[campo])
+        enemigo.elemento = Elemento[d['elemento']]
+        enemigo.estados = MotorEstados.from_dict(d['estados']) if d.get('estados') else SIN_ESTADOS
+        enemigo.rng = rng
+        return enemigo
 
 class FabricaEnemigos:
+    # Enemigos derrotados listos para reutilizarse en la siguiente oleada
+    _reserva = []
+    MAX_RESERVA = 256
+
     @staticmethod
-    def crear_enemigo(nivel_jugador, elemento_jugador):
-        return Enemigo(nivel_jugador, elemento_jugador)
+    def crear_enemigo(nivel_jugador, elemento_jugador, rng=random):
+        if FabricaEnemigos._reserva:
+            enemigo = FabricaEnemigos._reserva.pop()
+            enemigo._inicializar(nivel_jugador, elemento_jugador, rng)
+            return enemigo
+        return Enemigo(nivel_jugador, elemento_jugador, rng)
 
-class Juego:
-    def __init__(self, jugador=None):
-        if jugador:
-            self.jugador = jugador
-        else:
-            nombre_heroe = input("Nombre de tu héroe: ")
-            self.jugador = Personaje(nombre_heroe)
+    @staticmethod
+    def reciclar(enemigos):
+        """Devuelve a la reserva enemigos que ya no se usan (fin de batalla)."""
+        reserva = FabricaEnemigos._reserva
+        for enemigo in enemigos:
+            if len(reserva) >= FabricaEnemigos.MAX_RESERVA:
+                break
+            reserva.append(enemigo)
 
-        self.nivel_actual = 1
-        self.habilidades_disponibles = {
-            2: "Distorsión Temporal",
-            3: "Bastión Temporal",
-            4: "Plegado Espacial",
-            6: "Singularidad Cuántica",
-            8: "Rayo de Energía Pura",
-            10: "Transmutación de Materia"
-        }
-        self.logros = []
-        self.archivo_guardado = "progreso_guardado.pkl"
+class TablaAlias:
+    """
+    Muestreo de una distribución discreta con una sola tirada por muestra
+    (método alias de Vose): `probs[i]` es la probabilidad de quedarse con i
+    y si no se toma `alias[i]`.
+    """
+    __slots__ = ('valores', 'probs', 'alias')
 
-        # Sincroniza y notifica habilidades que por nivel ya debería tener el jugador
-        nuevas = self._sincronizar_habilidades()
-        if nuevas:
-            for hab in nuevas:
-                print(f"¡Habilidad adquirida al iniciar/cargar: {hab}!")
+    def __init__(self, valores, pesos):
+        n = len(valores)
+        total = float(sum(pesos))
+        escalados = [p * n / total for p in pesos]
+        self.valores = tuple(valores)
+        self.probs = [1.0] * n
+        self.alias = list(range(n))
+        pequenos = [i for i, p in enumerate(escalados) if p < 1.0]
+        grandes = [i for i, p in enumerate(escalados) if p >= 1.0]
+        while pequenos and grandes:
+            menor, mayor = pequenos.pop(), grandes.pop()
+            self.probs[menor] = escalados[menor]
+            self.alias[menor] = mayor
+            escalados[mayor] -= 1.0 - escalados[menor]
+            (pequenos if escalados[mayor] < 1.0 else grandes).append(mayor)
+        # Lo que queda vale 1 salvo errores de redondeo
 
-    def guardar_progreso(self):
-        try:
-            data = self.to_dict()
-            with open(self.archivo_guardado, "w", encoding='utf-8') as archivo:
-                json.dump(data, archivo, ensure_ascii=False, indent=2)
-            print("Progreso guardado.")
-        except IOError as e:
-            print(f"Error al guardar el progreso: {e}")
+    def __len__(self):
+        return len(self.valores)
 
-    @staticmethod
-    def cargar_progreso(archivo):
-        if not os.path.exists(archivo):
-            return None
-        try:
-            with open(archivo, "r", encoding='utf-8') as f:
-                data = json.load(f)
-                juego_cargado = Juego.from_dict(data)
-                print("Progreso cargado exitosamente.")
-                try:
-                    nuevas = juego_cargado._sincronizar_habilidades()
-                    if nuevas:
-                        for hab in nuevas:
-                            print(f"¡Habilidad añadida al cargar: {hab}!")
-                except Exception:
-                    pass
-                return juego_cargado
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"No se pudo cargar el progreso guardado. Error: {e}")
-            return None
+    def indice(self, rng):
+        u = rng.random() * len(self.probs)
+        i = int(u)
+        return i if u - i < self.probs[i] else self.alias[i]
 
-    def verificar_logros(self):
-        if self.jugador.nivel >= 5 and "Maestro del Tiempo" not in self.logros:
-            self.logros.append("Maestro del Tiempo")
-            print("¡Logro desbloqueado: Maestro del Tiempo!")
+    def muestra(self, rng):
+        return self.valores[self.indice(rng)]
 
-    def generar_dropeo(self, enemigos):
-        """Genera un drop simple tras la batalla: pociones o equipo básico."""
-        posible = random.random()
-        if posible < 0.25:
-            # Poción
-            tipo = random.choice(["Poción de Vida", "Poción de Mana"])
-            self.jugador.inventario[tipo] = self.jugador.inventario.get(tipo, 0) + 1
-            print(f"Has encontrado una {tipo} en los restos del combate.")
-        elif posible < 0.5:
-            # arma básica
-            arma = {"tipo": "arma", "nombre": "Daga Serrada", "ataque": 3}
-            print(f"Has encontrado un arma: {arma['nombre']} (+{arma['ataque']} ataque).")
-            # pregunta si equipar
-            opcion = input("¿Deseas equiparla? (s/n): ").lower()
-            if opcion == 's':
-                msg = self.jugador.equipar(arma)
-                print(msg)
-            else:
-                # guardarla como objeto en inventario simple
-                self.jugador.inventario.setdefault('Objetos', [])
-                self.jugador.inventario['Objetos'].append(arma)
-        elif posible < 0.75:
-            # armadura básica
-            arm = {"tipo": "armadura", "nombre": "Grebas Oxidadas", "defensa": 2}
-            print(f"Has encontrado una armadura: {arm['nombre']} (+{arm['defensa']} defensa).")
-            opcion = input("¿Deseas equiparla? (s/n): ").lower()
-            if opcion == 's':
-                msg = self.jugador.equipar(arm)
-                print(msg)
-            else:
-                self.jugador.inventario.setdefault('Objetos', [])
-                self.jugador.inventario['Objetos'].append(arm)
-        else:
-            print("No encontraste nada valioso en el combate.")
+    def indices(self, rng, n):
+        """`n` índices de una vez (lista)."""
+        probs, alias = self.probs, self.alias
+        k = len(probs)
+        resultado = []
+        agregar = resultado.append
+        aleatorio = rng.random
+        for _ in range(n):
+            u = aleatorio() * k
+            i = int(u)
+            agregar(i if u - i < probs[i] else alias[i])
+        return resultado
 
-    def _sincronizar_habilidades(self):
-        """
-        Otorga al jugador todas las habilidades en 'habilidades_disponibles'
-        cuyo requisito de nivel ya fue alcanzado y que aún no tenga.
-        Retorna la lista de habilidades nuevas añadidas.
-        """
-        nuevas = []
-        for nivel_req, habilidad in sorted(self.habilidades_disponibles.items()):
-            if self.jugador.nivel >= nivel_req and habilidad not in self.jugador.habilidades:
-                self.jugador.habilidades.append(habilidad)
-                nuevas.append(habilidad)
-        return nuevas
+    def indices_np(self, generador, n):
+        """`n` índices con NumPy (`generador` es un np.random.Generator)."""
+        u = generador.random(n) * len(self.probs)
+        i = u.astype(np.intp)
+        return np.where(u - i < np.asarray(self.probs)[i], i, np.asarray(self.alias)[i])
 
-    def to_dict(self):
-        return {
-            'jugador': self.jugador.to_dict(),
-            'nivel_actual': self.nivel_actual,
-            'habilidades_disponibles': self.habilidades_disponibles,
-            'logros': self.logros,
-            'archivo_guardado': self.archivo_guardado,
-        }
+    def probabilidades(self):
+        """Probabilidad exacta de cada índice según la tabla."""
+        n = len(self.probs)
+        resultado = [p / n for p in self.probs]
+        for i, (p, a) in enumerate(zip(self.probs, self.alias)):
+            if a != i:
+                resultado[a] += (1.0 - p) / n
+        return resultado
 
-    @staticmethod
-    def from_dict(d):
-        jugador_data = d.get('jugador')
-        jugador = Personaje.from_dict(jugador_data) if jugador_data else None
-        juego = Juego(jugador=jugador)
-        juego.nivel_actual = d.get('nivel_actual', juego.nivel_actual)
-        juego.habilidades_disponibles = d.get('habilidades_disponibles', juego.habilidades_disponibles)
-        juego.logros = d.get('logros', [])
-        juego.archivo_guardado = d.get('archivo_guardado', juego.archivo_guardado)
-        return juego
+class _TiradasFijas:
+    """Flujo aleatorio guionizado: hace que Enemigo._inicializar produzca un resultado concreto."""
+    def __init__(self, elemento, desplazamiento, tipo, jefe):
+        self.elemento, self.desplazamiento, self.tipo, self.jefe = elemento, desplazamiento, tipo, jefe
 
-    def batalla(self):
-        print(f"\n=== NIVEL {self.nivel_actual} ===")
-        print(f"\n=== {self.jugador.nombre.upper()} ===")
-        print(f"Nivel: {self.jugador.nivel} | Vida: {self.jugador.vida}/{self.jugador.max_vida} | Mana: {self.jugador.mana}/{self.jugador.max_mana}")
+    def choice(self, opciones):
+        return self.elemento
 
-        enemigos_iniciales = [FabricaEnemigos.crear_enemigo(self.jugador.nivel, self.jugador.elemento) for _ in range(random.randint(2, 4))]
-        enemigos = list(enemigos_iniciales)
+    def randint(self, a, b):
+        return self.desplazamiento
 
-        while any(e.vida > 0 for e in enemigos) and self.jugador.vida > 0:
-            # --- Turno del jugador ---
-            print("\n" + "-"*10 + " TU TURNO " + "-"*10)
-            print(f"Jugador: {self.jugador.vida} HP | {self.jugador.mana} MP")
-            # Procesar estados del jugador al inicio del turno
-            pre_stun = 'stun' in self.jugador.estados
-            est_msgs = self.jugador.procesar_estados()
-            for m in est_msgs:
-                print(m)
-            enemigos_vivos = [e for e in enemigos if e.vida > 0]
-            for i, e in enumerate(enemigos_vivos):
-                print(f"Enemigo {i+1}: {e.nombre} - {e.vida} HP")
-            
-            accion_valida = False
-            defendiendo = False
-            # Si estaba aturdido antes de procesar estados, pierde el turno
-            if pre_stun:
-                print("Estás aturdido y pierdes este turno.")
-            else:
-                while not accion_valida:
-                    accion = input("\nAcción [A]tacar, [H]abilidad, [D]efensa, [O]bjeto, [G]uardar: ").upper()
-                    if accion not in ["A", "H", "D", "O", "G"]:
-                        print("Acción no válida. Intenta de nuevo.")
-                        continue
+    def choices(self, poblacion, weights=None, k=1):
+        return [self.tipo]
 
-                    accion_valida = True # Asumimos que la acción será válida
+    def random(self):
+        return 0.0 if self.jefe else 1.0
 
-                    if accion == "G":
-                        self.guardar_progreso()
-                        accion_valida = False # Permitir otra acción después de guardar
-                        continue
+# Campos de un enemigo recién creado que dependen de las tiradas
+CAMPOS_PLANTILLA = ('elemento', 'nivel', 'vida_max', 'ataque', 'defensa', 'velocidad', 'mana', 'tipo', 'fase', 'nombre')
+
+class GeneradorEncuentros:
+    """
+    Enemigos con la misma distribución que Enemigo._inicializar, pero con una
+    sola tirada cada uno. Para cada (nivel, elemento del jugador) se enumeran
+    todas las combinaciones de elemento, desplazamiento de nivel, tipo y jefe,
+    se obtienen sus estadísticas con el propio _inicializar (así las fórmulas
+    no se duplican) y se agrupan las iguales en una TablaAlias de plantillas.
+    Las tablas se rehacen si cambia el contenido, PESOS_ENEMIGO o PROB_JEFE. El flujo
+    aleatorio que consume no es el de FabricaEnemigos: las partidas grabadas
+    solo se reproducen con el generador con el que se jugaron.
+    """
+    def __init__(self):
+        self._tablas = {}
+
+    def tabla(self, nivel_jugador, elemento_jugador):
+        clave = (nivel_jugador, elemento_jugador, HUELLA_CONTENIDO, tuple(PESOS_ENEMIGO), PROB_JEFE)
+        tabla = self._tablas.get(clave)
+        if tabla is None:
+            tabla = self._tablas[clave] = self._compilar(nivel_jugador, elemento_jugador)
+        return tabla
+
+    @staticmethod
+    def _compilar(nivel_jugador, elemento_jugador):
+        elementos = ELEMENTOS_OPUESTOS.get(elemento_jugador, ELEMENTOS)
+        total_pesos = sum(PESOS_ENEMIGO)
+        pesos = {}
+        enemigo = Enemigo.__new__(Enemigo)
+        for elemento in elementos:
+            for desplazamiento in range(-1, 3):
+                for tipo, peso in zip(TIPOS_ENEMIGO, PESOS_ENEMIGO):
+                    for jefe, p_jefe in ((True, PROB_JEFE), (False, 1.0 - PROB_JEFE)):
+                        p = peso / total_pesos * p_jefe / (4 * len(elementos))
+                        if p <= 0.0:
+                            continue
+                        enemigo._inicializar(nivel_jugador, elemento_jugador,
+                                             _TiradasFijas(elemento, desplazamiento, tipo, jefe))
+                        plantilla = tuple(getattr(enemigo, c) for c in CAMPOS_PLANTILLA)
+                        pesos[plantilla] = pesos.get(plantilla, 0.0) + p
+        return TablaAlias(list(pesos), list(pesos.values()))
+
+    @staticmethod
+    def desde_plantilla(plantilla, rng):
+        """Enemigo (de la reserva de FabricaEnemigos si hay) con las estadísticas de `plantilla`."""
+        reserva = FabricaEnemigos._reserva
+        enemigo = reserva.pop() if reserva else Enemigo.__new__(Enemigo)
+        (enemigo.elemento, enemigo.nivel, enemigo.vida_max, enemigo.ataque, enemigo.defensa,
+         enemigo.velocidad, enemigo.mana, enemigo.tipo, enemigo.fase, enemigo.nombre) = plantilla
+        enemigo.vida = enemigo.vida_max
+        enemigo.estados = SIN_ESTADOS
+        enemigo.rng = rng
+        return enemigo
+
+    def crear(self, nivel_jugador, elemento_jugador, rng):
+        return self.desde_plantilla(self.tabla(nivel_jugador, elemento_jugador).muestra(rng), rng)
+
+    def oleada(self, nivel_jugador, elemento_jugador, rng):
+        """Los 2-4 enemigos de una batalla."""
+        tabla = self.tabla(nivel_jugador, elemento_jugador)
+        valores = tabla.valores
+        return [self.desde_plantilla(valores[i], rng) for i in tabla.indices(rng, rng.randint(2, 4))]
+
+    def lote(self, n, nivel_jugador, elemento_jugador, rng):
+        """`n` plantillas (tuplas de CAMPOS_PLANTILLA compartidas) sin crear enemigos."""
+        tabla = self.tabla(nivel_jugador, elemento_jugador)
+        valores = tabla.valores
+        return [valores[i] for i in tabla.indices(rng, n)]
+
+    def lote_np(self, n, nivel_jugador, elemento_jugador, generador):
+        """
+        `n` enemigos como columnas NumPy {campo numérico: arreglo (n,)}, más
+        'plantilla' con el índice de cada uno en tabla(...).valores.
+        """
+        if not HAS_NUMPY:
+            raise RuntimeError("NumPy no está instalado; usa lote().")
+        tabla = self.tabla(nivel_jugador, elemento_jugador)
+        indices = tabla.indices_np(generador, n)
+        columnas = {'plantilla': indices}
+        for j, campo in enumerate(CAMPOS_PLANTILLA):
+            if campo in ('elemento', 'tipo', 'nombre'):
+                continue
+            columnas[campo] = np.array([v[j] for v in tabla.valores], dtype=np.int32)[indices]
+        columnas['jefe'] = columnas['fase'] > 0
+        return columnas
+
+GENERADOR_ENCUENTROS = GeneradorEncuentros()
+
+def _chi_cuadrado(conteos, probabilidades, minimo=5.0):
+    """
+    Estadístico chi-cuadrado de bondad de ajuste (las celdas con menos de
+    `minimo` esperados se agrupan), grados de libertad y p-valor por la
+    aproximación de Wilson-Hilferty.
+    """
+    n = sum(conteos)
+    celdas = []
+    resto_obs = resto_esp = 0.0
+    for c, p in zip(conteos, probabilidades):
+        esperado = n * p
+        if esperado < minimo:
+            resto_obs += c
+            resto_esp += esperado
+        else:
+            celdas.append((c, esperado))
+    if resto_esp > 0:
+        celdas.append((resto_obs, resto_esp))
+    estadistico = sum((c - e) ** 2 / e for c, e in celdas)
+    libertad = max(1, len(celdas) - 1)
+    z = ((estadistico / libertad) ** (1 / 3) - (1 - 2 / (9 * libertad))) / math.sqrt(2 / (9 * libertad))
+    return estadistico, libertad, 0.5 * math.erfc(z / math.sqrt(2))
+
+def verificar_generador(n=200_000, nivel_jugador=3, elemento_jugador=Elemento.TIEMPO, semilla=0):
+    """
+    Compara con chi-cuadrado la distribución de plantillas de FabricaEnemigos
+    y de GeneradorEncuentros contra las probabilidades exactas de la tabla.
+    Retorna {'actual': ..., 'alias': ...} con estadístico, libertad, p_valor y
+    el tiempo por enemigo de cada uno.
+    """
+    generador = GeneradorEncuentros()
+    tabla = generador.tabla(nivel_jugador, elemento_jugador)
+    posicion = {v: i for i, v in enumerate(tabla.valores)}
+    probabilidades = tabla.probabilidades()
+    resultado = {}
+
+    rng = FlujoAleatorio(derivar_semilla(semilla, 'actual'))
+    conteos = [0] * len(tabla)
+    inicio = time.perf_counter()
+    for _ in range(n):
+        enemigo = FabricaEnemigos.crear_enemigo(nivel_jugador, elemento_jugador, rng)
+        conteos[posicion[tuple(getattr(enemigo, c) for c in CAMPOS_PLANTILLA)]] += 1
+        FabricaEnemigos.reciclar((enemigo,))
+    segundos = time.perf_counter() - inicio
+    estadistico, libertad, p = _chi_cuadrado(conteos, probabilidades)
+    resultado['actual'] = {'estadistico': estadistico, 'libertad': libertad, 'p_valor': p, 'us_por_enemigo': segundos / n * 1e6}
+
+    rng = FlujoAleatorio(derivar_semilla(semilla, 'alias'))
+    conteos = [0] * len(tabla)
+    inicio = time.perf_counter()
+    for _ in range(n):
+        enemigo = generador.crear(nivel_jugador, elemento_jugador, rng)
+        conteos[posicion[tuple(getattr(enemigo, c) for c in CAMPOS_PLANTILLA)]] += 1
+        FabricaEnemigos.reciclar((enemigo,))
+    segundos = time.perf_counter() - inicio
+    estadistico, libertad, p = _chi_cuadrado(conteos, probabilidades)
+    resultado['alias'] = {'estadistico': estadistico, 'libertad': libertad, 'p_valor': p, 'us_por_enemigo': segundos / n * 1e6}
+    resultado['plantillas'] = len(tabla)
+    return resultado
+
+def _clave_estados(motor):
+    return tuple((nombre, expira - motor.tick, motor.danio.get(nombre, 0)) for nombre, expira in motor.expira.items()) if motor else ()
+
+class EstadoCombate:
+    """
+    Batalla en curso de un Juego: los enemigos con los que empezó (los
+    derrotados tienen vida <= 0), el jugador y el flujo aleatorio de la
+    batalla. Se guarda con la partida para poder reanudarla en el turno del
+    jugador (o en el reparto del botín), y sus instantáneas permiten deshacer
+    turnos o explorar continuaciones desde un mismo punto sin pasar por to_dict.
+    """
+    __slots__ = ('enemigos', 'rng', 'jugador', 'historial', '_ultima', 'botin')
+
+    def __init__(self, enemigos, rng, jugador=None):
+        self.enemigos = enemigos
+        self.rng = rng
+        self.jugador = jugador
+        self.historial = []     # instantáneas marcadas, para deshacer
+        self._ultima = None
+        self.botin = None       # botín tirado y aún sin entregar (None: sin tirar)
+
+    def terminada(self):
+        return self.jugador.vida <= 0 or not any(e.vida > 0 for e in self.enemigos)
+
+    def clave(self):
+        """
+        Posición hashable (sin el rng) para tablas de transposición. Los
+        enemigos derrotados cuentan como None: su vida y estados ya no influyen.
+        """
+        j = self.jugador
+        buffs = j.buffs
+        arma = j.equipo.get('arma')
+        return (j.nivel, j.ataque, j.defensa_base, arma.get('ataque', 0) if isinstance(arma, dict) else 0,
+                j.vida, j.mana, _clave_estados(j.estados),
+                tuple((tipo, incremento, expira - buffs.tick) for tipo, incremento, _, expira in buffs.activos.values()),
+                tuple(j.inventario.consumibles.values()),
+                tuple((e.tipo, e.nivel, e.vida, e.mana, e.ataque, e.defensa, _clave_estados(e.estados)) if e.vida > 0 else None
+                      for e in self.enemigos))
+
+    def instantanea(self):
+        """
+        Tupla inmutable (estado del rng, jugador, enemigos). Los combatientes
+        sin cambios desde la instantánea anterior comparten su tupla con ella.
+        """
+        jugador = self.jugador.instantanea_combate() if self.jugador is not None else None
+        enemigos = tuple(e.instantanea_combate() for e in self.enemigos)
+        ultima = self._ultima
+        if ultima is not None:
+            if jugador == ultima[1]:
+                jugador = ultima[1]
+            if enemigos == ultima[2]:
+                enemigos = ultima[2]
+            else:
+                enemigos = tuple(antes if antes == ahora else ahora for antes, ahora in zip(ultima[2], enemigos))
+        self._ultima = instantanea = (self.rng.getstate(), jugador, enemigos)
+        return instantanea
+
+    def restaurar(self, instantanea, rng=True):
+        """Vuelve a `instantanea`; con rng=False deja el flujo aleatorio como está."""
+        estado_rng, jugador, enemigos = instantanea
+        if rng:
+            self.rng.setstate(estado_rng)
+        if jugador is not None:
+            self.jugador.restaurar_combate(jugador)
+        for enemigo, t in zip(self.enemigos, enemigos):
+            enemigo.restaurar_combate(t)
+
+    def marcar(self):
+        """Guarda el punto actual para poder volver a él con deshacer()."""
+        self.historial.append(self.instantanea())
+
+    def deshacer(self):
+        """Vuelve al último punto marcado. Retorna False si no hay ninguno."""
+        if not self.historial:
+            return False
+        self.restaurar(self.historial.pop())
+        return True
+
+    def explorar(self, funcion, n):
+        """
+        Ejecuta funcion(self) `n` veces partiendo siempre del punto actual,
+        al que vuelve al terminar. Retorna la lista de resultados.
+        """
+        origen = self.instantanea()
+        resultados = []
+        for _ in range(n):
+            resultados.append(funcion(self))
+            self.restaurar(origen)
+        return resultados
+
+    def to_dict(self):
+        version, estado, gauss = self.rng.getstate()
+        datos = {
+            'enemigos': [e.to_dict() for e in self.enemigos],
+            'semilla': self.rng.semilla,
+            'rng': [version, list(estado), gauss],
+        }
+        if self.botin is not None:
+            datos['botin'] = [list(drop) for drop in self.botin]
+        return datos
+
+    @staticmethod
+    def from_dict(d):
+        rng = FlujoAleatorio(d['semilla'])
+        version, estado, gauss = d['rng']
+        rng.setstate((version, tuple(estado), gauss))
+        combate = EstadoCombate([Enemigo.from_dict(e, rng) for e in d['enemigos']], rng)
+        if d.get('botin') is not None:
+            combate.botin = [tuple(drop) for drop in d['botin']]
+        return combate
+
+# --- FORMATO DE GUARDADO BINARIO ---
+# Archivo = cabecera (magia, versión, nº de secciones) + índice de secciones
+# (nombre, desplazamiento, longitud) + secciones. Los campos numéricos de
+# Personaje van en un struct fijo (ESQUEMA_PERSONAJE); las secciones de tamaño
+# variable van como JSON compacto. Cada sección se decodifica al pedirla.
+MAGIA_GUARDADO = b"CTSV"
+VERSION_GUARDADO = 1
+ARCHIVO_GUARDADO = "progreso_guardado.sav"
+_CABECERA = struct.Struct('<4sHH')
+_ENTRADA_SECCION = struct.Struct('<8sII')
+
+# Campos enteros de Personaje.to_dict, en el orden en que se escriben
+ESQUEMA_PERSONAJE = (
+    'nivel', 'xp', 'vida_base', 'mana_base', 'ataque', 'defensa_base',
+    'vida', 'mana', 'velocidad', 'puntos_talento',
+)
+# ... seguidos del índice de elemento y la longitud del nombre (UTF-8, al final)
+_PERSONAJE_FIJO = struct.Struct('<' + 'i' * len(ESQUEMA_PERSONAJE) + 'BH')
+_ELEMENTOS = tuple(e.name for e in Elemento)
+
+def _codificar(valor):
+    # Secciones variables: JSON compacto (el parser en C es lo más rápido al cargar)
+    return json.dumps(valor, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def codificar_guardado(datos):
+    """Convierte un Juego.to_dict() en los bytes del formato binario."""
+    jugador = datos['jugador']
+    nombre = jugador['nombre'].encode('utf-8')
+    fijo = _PERSONAJE_FIJO.pack(*(jugador[c] for c in ESQUEMA_PERSONAJE), _ELEMENTOS.index(jugador['elemento']), len(nombre)) + nombre
+    extra = _codificar({
+        'habilidades': jugador['habilidades'],
+        'inventario': jugador['inventario'],
+        'equipo': jugador['equipo'],
+        'pasivas': [k for k, info in jugador['habilidades_pasivas'].items() if info['aplicado']],
+        'estados': jugador['estados'],
+        'buffs': jugador['buffs'],
+    })
+    juego = _codificar({k: v for k, v in datos.items() if k != 'jugador'})
+    secciones = ((b'juego', juego), (b'jugador', fijo), (b'extra', extra))
+
+    salida = bytearray(_CABECERA.pack(MAGIA_GUARDADO, VERSION_GUARDADO, len(secciones)))
+    desplazamiento = _CABECERA.size + _ENTRADA_SECCION.size * len(secciones)
+    for nombre, cuerpo in secciones:
+        salida += _ENTRADA_SECCION.pack(nombre, desplazamiento, len(cuerpo))
+        desplazamiento += len(cuerpo)
+    for _, cuerpo in secciones:
+        salida += cuerpo
+    return bytes(salida)
+
+class GuardadoBinario:
+    """
+    Lectura perezosa de un guardado binario: al abrirlo solo se lee la
+    cabecera y el índice; cada sección se decodifica la primera vez que se
+    pide (por ejemplo, `resumen()` solo toca la sección del jugador).
+    """
+    def __init__(self, datos):
+        self.datos = memoryview(datos)
+        if len(datos) < _CABECERA.size:
+            raise ValueError("Guardado truncado.")
+        magia, self.version, n = _CABECERA.unpack_from(datos, 0)
+        if magia != MAGIA_GUARDADO:
+            raise ValueError("No es un guardado binario.")
+        if self.version > VERSION_GUARDADO:
+            raise ValueError(f"Versión de guardado no soportada: {self.version}")
+        self.indice = {}
+        for i in range(n):
+            nombre, desplazamiento, longitud = _ENTRADA_SECCION.unpack_from(datos, _CABECERA.size + i * _ENTRADA_SECCION.size)
+            if desplazamiento + longitud > len(datos):
+                raise ValueError("Guardado truncado.")
+            self.indice[nombre.rstrip(b'\0').decode()] = (desplazamiento, longitud)
+        self._cache = {}
+
+    @staticmethod
+    def abrir(ruta):
+        with open(ruta, "rb") as f:
+            return GuardadoBinario(f.read())
+
+    def _cuerpo(self, nombre):
+        desplazamiento, longitud = self.indice[nombre]
+        return self.datos[desplazamiento:desplazamiento + longitud]
+
+    def seccion(self, nombre):
+        if nombre not in self._cache:
+            if nombre == 'jugador':
+                cuerpo = self._cuerpo(nombre)
+                *enteros, elemento, largo = _PERSONAJE_FIJO.unpack_from(cuerpo, 0)
+                valores = dict(zip(ESQUEMA_PERSONAJE, enteros))
+                valores['elemento'] = _ELEMENTOS[elemento]
+                valores['nombre'] = bytes(cuerpo[_PERSONAJE_FIJO.size:_PERSONAJE_FIJO.size + largo]).decode('utf-8')
+                self._cache[nombre] = valores
+            else:
+                self._cache[nombre] = json.loads(bytes(self._cuerpo(nombre)))
+        return self._cache[nombre]
+
+    def resumen(self):
+        """Nombre, nivel, XP y vida del jugador sin decodificar el resto."""
+        j = self.seccion('jugador')
+        return {'nombre': j['nombre'], 'nivel': j['nivel'], 'xp': j['xp'], 'vida': j['vida']}
+
+    def to_dict(self):
+        """Reconstruye el diccionario de Juego.to_dict()."""
+        jugador = dict(self.seccion('jugador'))
+        extra = self.seccion('extra')
+        pasivas = extra['pasivas']
+        jugador.update(
+            habilidades=extra['habilidades'],
+            inventario=extra['inventario'],
+            equipo=extra['equipo'],
+            estados=extra['estados'],
+            buffs=extra['buffs'],
+            habilidades_pasivas={k: {"aplicado": k in pasivas} for k in PASIVAS},
+        )
+        datos = dict(self.seccion('juego'))
+        datos['jugador'] = jugador
+        return datos
+
+def escribir_atomico(ruta, contenido):
+    """
+    Escribe `contenido` (bytes) en un temporal del mismo directorio, lo
+    sincroniza a disco y lo renombra sobre `ruta`: un fallo a mitad de
+    escritura nunca deja un guardado truncado.
+    """
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    # Propio de cada hilo: dos escritores del mismo proceso no comparten temporal
+    temporal = os.path.join(directorio, f".{os.path.basename(ruta)}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temporal, "wb") as f:
+            f.write(contenido)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+def serializar_guardado(datos, formato="binario"):
+    """Bytes de un Juego.to_dict() en formato binario o 'json' (legible)."""
+    if formato == "json":
+        return json.dumps(datos, ensure_ascii=False, indent=2).encode('utf-8')
+    return codificar_guardado(datos)
+
+# --- BOTÍN ---
+# Una tabla de botín tiene 'entradas' con peso, de las que se eligen
+# 'tiradas' (1 por defecto), y 'garantizados', que salen siempre. Una entrada
+# es una poción (una de sus 'opciones' al azar), un arma, una armadura, nada
+# o {'tipo': 'tabla', 'tabla': nombre}, que tira en otra tabla. La lista
+# 'dropeos' del contenido es la tabla TABLA_POR_DEFECTO. Las reglas eligen
+# tablas según los enemigos derrotados (gana la primera que encaje):
+#   {'tabla': t, 'nivel_min': a, 'nivel_max': b}     la tirada de la batalla
+#   {'tabla': t, 'enemigo': 'Jefe', 'nivel_min': a}  una tirada más por enemigo
+# El nivel de la batalla es el de su enemigo de más nivel. Las tablas
+# compiladas guardan umbrales acumulados: una tirada es un random() y una
+# búsqueda binaria que reparte igual que el antiguo recorrido de 'dropeos',
+# así que las partidas con semilla dan el mismo botín. Los lotes para
+# simulación tiran con tablas alias y solo cuentan.
+
+TABLA_POR_DEFECTO = 'dropeos'
+
+class MotorBotin:
+    """
+    Tablas de botín compiladas (compilar_contenido()['botin']): qué tablas
+    tocan tras una batalla, tiradas de la partida, lotes de simulación y
+    objetos esperados calculados sin tirar.
+    """
+    def __init__(self, compilado):
+        self.tablas = compilado['tablas']   # nombre -> (umbrales, entradas, garantizados, tiradas)
+        self.reglas = compilado['reglas']   # (enemigo o None, nivel_min, nivel_max, tabla)
+        self.por_enemigo = any(enemigo is not None for enemigo, *_ in self.reglas)
+        self._elegidas = {}                 # (enemigo o None, nivel) -> tabla o None
+        self._alias = {}
+        self._esperados = {}
+
+    def _elegir(self, enemigo, nivel):
+        clave = (enemigo, nivel)
+        if clave not in self._elegidas:
+            self._elegidas[clave] = next(
+                (tabla for e, minimo, maximo, tabla in self.reglas
+                 if e == enemigo and minimo <= nivel and (maximo is None or nivel <= maximo)),
+                TABLA_POR_DEFECTO if enemigo is None else None)
+        return self._elegidas[clave]
+
+    def tablas_batalla(self, enemigos):
+        """Tablas en que se tira tras derrotar a `enemigos` (con .tipo y .nivel), en orden."""
+        tablas = [self._elegir(None, max((e.nivel for e in enemigos), default=1))]
+        if self.por_enemigo:
+            for e in enemigos:
+                tabla = self._elegir(e.tipo, e.nivel)
+                if tabla is not None:
+                    tablas.append(tabla)
+        return tablas
+
+    # --- Tiradas de la partida ---
+    def botin(self, enemigos, rng):
+        """Botín de una batalla: lista de ('pocion', nombre) y (ranura, objeto)."""
+        botin = []
+        for tabla in self.tablas_batalla(enemigos):
+            self.tirar(tabla, rng, botin)
+        return botin
+
+    def tirar(self, tabla, rng, botin=None):
+        """Añade a `botin` (o a una lista nueva) lo que sale en la tabla `tabla`. Lo retorna."""
+        if botin is None:
+            botin = []
+        umbrales, entradas, garantizados, tiradas = self.tablas[tabla]
+        for entrada in garantizados:
+            self._resolver(entrada, rng, botin)
+        if umbrales:
+            for _ in range(tiradas):
+                i = bisect.bisect_right(umbrales, rng.random())
+                # El último umbral puede quedar bajo 1.0 por redondeo: nada
+                if i < len(entradas):
+                    self._resolver(entradas[i], rng, botin)
+        return botin
+
+    def _resolver(self, entrada, rng, botin):
+        tipo, dato = entrada
+        if tipo == 'pocion':
+            botin.append(('pocion', rng.choice(dato)))
+        elif tipo == 'tabla':
+            self.tirar(dato, rng, botin)
+        elif tipo != 'nada':
+            botin.append(entrada)
+
+    # --- Lotes de simulación ---
+    def _tabla_alias(self, tabla):
+        alias = self._alias.get(tabla)
+        if alias is None:
+            umbrales = self.tablas[tabla][0]
+            alias = self._alias[tabla] = TablaAlias(range(len(umbrales)), _probabilidades(umbrales))
+        return alias
+
+    def lote(self, tabla, n, rng=None, generador=None):
+        """
+        Lo que sale en `n` tiradas de la tabla `tabla`, como Counter
+        {(tipo, nombre): cantidad}. Con `generador` (np.random.Generator)
+        cuenta con NumPy; si no, con `rng` (o un FlujoAleatorio nuevo).
+        """
+        if generador is None and rng is None:
+            rng = FlujoAleatorio()
+        conteo = Counter()
+        self._lote(tabla, n, rng, generador, conteo)
+        return conteo
+
+    def lote_batallas(self, n, enemigos, rng=None, generador=None):
+        """Botín de `n` batallas contra `enemigos`, contado como en lote()."""
+        if generador is None and rng is None:
+            rng = FlujoAleatorio()
+        conteo = Counter()
+        for tabla in self.tablas_batalla(enemigos):
+            self._lote(tabla, n, rng, generador, conteo)
+        return conteo
+
+    def _lote(self, tabla, n, rng, generador, conteo):
+        umbrales, entradas, garantizados, tiradas = self.tablas[tabla]
+        for entrada in garantizados:
+            self._contar(entrada, n, rng, generador, conteo)
+        if not umbrales or not n:
+            return
+        alias = self._tabla_alias(tabla)
+        if generador is not None:
+            veces = np.bincount(alias.indices_np(generador, n * tiradas), minlength=len(entradas)).tolist()
+        else:
+            cuenta = Counter(alias.indices(rng, n * tiradas))
+            veces = [cuenta[i] for i in range(len(entradas))]
+        for entrada, k in zip(entradas, veces):
+            if k:
+                self._contar(entrada, k, rng, generador, conteo)
+
+    def _contar(self, entrada, k, rng, generador, conteo):
+        tipo, dato = entrada
+        if tipo == 'pocion':
+            if generador is not None:
+                veces = np.bincount(generador.integers(len(dato), size=k), minlength=len(dato)).tolist()
+                conteo.update({('pocion', opcion): v for opcion, v in zip(dato, veces) if v})
+            else:
+                conteo.update(('pocion', opcion) for opcion in rng.choices(dato, k=k))
+        elif tipo == 'tabla':
+            self._lote(dato, k, rng, generador, conteo)
+        elif tipo != 'nada':
+            conteo[(tipo, dato['nombre'])] += k
+
+    # --- Tasas esperadas ---
+    def esperado(self, tabla):
+        """Objetos esperados por tirada de la tabla `tabla`: {(tipo, nombre): media}."""
+        resultado = self._esperados.get(tabla)
+        if resultado is None:
+            umbrales, entradas, garantizados, tiradas = self.tablas[tabla]
+            resultado = {}
+            for entrada in garantizados:
+                self._esperar(entrada, 1.0, resultado)
+            for entrada, p in zip(entradas, _probabilidades(umbrales)):
+                self._esperar(entrada, p * tiradas, resultado)
+            self._esperados[tabla] = resultado
+        return resultado
+
+    def esperado_batalla(self, enemigos):
+        """Objetos esperados tras una batalla contra `enemigos`."""
+        resultado = {}
+        for tabla in self.tablas_batalla(enemigos):
+            for clave, media in self.esperado(tabla).items():
+                resultado[clave] = resultado.get(clave, 0.0) + media
+        return resultado
+
+    def _esperar(self, entrada, p, resultado):
+        tipo, dato = entrada
+        if p <= 0.0 or tipo == 'nada':
+            return
+        if tipo == 'pocion':
+            for opcion in dato:
+                resultado[('pocion', opcion)] = resultado.get(('pocion', opcion), 0.0) + p / len(dato)
+        elif tipo == 'tabla':
+            for clave, media in self.esperado(dato).items():
+                resultado[clave] = resultado.get(clave, 0.0) + p * media
+        else:
+            clave = (tipo, dato['nombre'])
+            resultado[clave] = resultado.get(clave, 0.0) + p
+
+def _probabilidades(umbrales):
+    """Probabilidad de cada entrada a partir de sus umbrales acumulados."""
+    return [b - a for a, b in zip((0.0,) + tuple(umbrales[:-1]), umbrales)]
+
+# --- PAQUETES DE CONTENIDO ---
+# Un paquete es un JSON con las secciones de CONTENIDO_BASE; varios se
+# combinan en orden sobre él. Los tipos de enemigo y las habilidades se
+# actualizan por nombre (un tipo nuevo se añade y con peso 0 sale del
+# sorteo); 'dropeos', si aparece, sustituye a la lista anterior, las tablas
+# de 'botin' se actualizan por nombre y sus 'reglas' se sustituyen. Los efectos
+# de las habilidades y el comportamiento de Mago, Sanador y Jefe siguen en el
+# código: un paquete solo da coste y nivel a habilidades ya registradas.
+# El contenido validado se compila en un índice binario (las secciones del
+# guardado binario) que se guarda en CACHE_CONTENIDO con la huella de los
+# paquetes como nombre: con los mismos paquetes, el arranque abre el índice
+# con mmap sin volver a leer, validar ni combinar el JSON.
+
+MAGIA_CONTENIDO = b"CTPK"
+VERSION_CONTENIDO = 2
+CACHE_CONTENIDO = ".cache_contenido"
+_REGISTRO_ARQUETIPO = struct.Struct('<I4d2iB')   # peso y Arquetipo de un tipo de enemigo
+_DROPEOS_VALIDOS = ('pocion', 'arma', 'armadura', 'nada', 'tabla')
+
+# Multiplicadores de un tipo de enemigo, y el maná y el elemento con que empieza
+Arquetipo = namedtuple('Arquetipo', 'vida ataque defensa velocidad mana mana_por_nivel copia_elemento',
+                       defaults=(1.0, 1.0, 1.0, 1.0, 0, 0, False))
+
+def _es_entero(valor):
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+def _es_numero(valor):
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool)
+
+_CAMPOS_TIPO = ('nombre', 'peso') + Arquetipo._fields
+_CAMPOS_JEFE = ('vida', 'ataque', 'defensa', 'velocidad')
+
+def _validar_arquetipo(datos, ruta, permitidos):
+    for clave, valor in datos.items():
+        if clave not in permitidos:
+            raise ValueError(f"{ruta}: campo desconocido '{clave}'.")
+        if clave in _CAMPOS_JEFE:
+            if not _es_numero(valor) or valor <= 0:
+                raise ValueError(f"{ruta}.{clave}: debe ser un número positivo.")
+        elif clave in ('peso', 'mana', 'mana_por_nivel'):
+            if not _es_entero(valor) or valor < 0:
+                raise ValueError(f"{ruta}.{clave}: debe ser un entero >= 0.")
+        elif clave == 'copia_elemento' and not isinstance(valor, bool):
+            raise ValueError(f"{ruta}.{clave}: debe ser true o false.")
+
+def _validar_entrada_botin(drop, ruta, con_peso=True):
+    if not isinstance(drop, dict) or drop.get('tipo') not in _DROPEOS_VALIDOS:
+        raise ValueError(f"{ruta}: 'tipo' debe ser uno de {', '.join(_DROPEOS_VALIDOS)}.")
+    if con_peso and (not _es_numero(drop.get('peso')) or drop['peso'] < 0):
+        raise ValueError(f"{ruta}.peso: debe ser un número >= 0.")
+    tipo = drop['tipo']
+    if tipo == 'pocion':
+        opciones = drop.get('opciones')
+        if not opciones or not isinstance(opciones, list) or not all(isinstance(o, str) for o in opciones):
+            raise ValueError(f"{ruta}.opciones: lista de nombres de poción.")
+    elif tipo == 'tabla':
+        if not isinstance(drop.get('tabla'), str):
+            raise ValueError(f"{ruta}.tabla: nombre de una tabla de botín.")
+    elif tipo != 'nada':
+        objeto = drop.get('objeto')
+        estadistica = ESTADISTICA_RANURA[tipo]
+        if not isinstance(objeto, dict) or not isinstance(objeto.get('nombre'), str) or not _es_entero(objeto.get(estadistica)):
+            raise ValueError(f"{ruta}.objeto: necesita 'nombre' y '{estadistica}' (entero).")
+
+def validar_paquete(datos, origen="paquete"):
+    """Comprueba la forma de un paquete (sus secciones pueden faltar). ValueError si no es válido."""
+    if not isinstance(datos, dict):
+        raise ValueError(f"{origen}: un paquete es un objeto JSON.")
+    desconocidas = set(datos) - set(CONTENIDO_BASE)
+    if desconocidas:
+        raise ValueError(f"{origen}: secciones desconocidas: {', '.join(sorted(desconocidas))}.")
+    enemigos = datos.get('enemigos', {})
+    if not isinstance(enemigos, dict) or set(enemigos) - {'tipos', 'prob_jefe', 'jefe'}:
+        raise ValueError(f"{origen}: 'enemigos' admite 'tipos', 'prob_jefe' y 'jefe'.")
+    for i, tipo in enumerate(enemigos.get('tipos', [])):
+        ruta = f"{origen}: enemigos.tipos[{i}]"
+        if not isinstance(tipo, dict) or not isinstance(tipo.get('nombre'), str) or not tipo['nombre']:
+            raise ValueError(f"{ruta}: cada tipo necesita un 'nombre'.")
+        if tipo['nombre'] == 'Jefe':
+            raise ValueError(f"{ruta}: 'Jefe' está reservado; usa enemigos.jefe.")
+        _validar_arquetipo(tipo, ruta, _CAMPOS_TIPO)
+    if 'prob_jefe' in enemigos and not (_es_numero(enemigos['prob_jefe']) and 0 <= enemigos['prob_jefe'] <= 1):
+        raise ValueError(f"{origen}: enemigos.prob_jefe debe estar entre 0 y 1.")
+    if 'jefe' in enemigos:
+        if not isinstance(enemigos['jefe'], dict):
+            raise ValueError(f"{origen}: enemigos.jefe debe ser un objeto.")
+        _validar_arquetipo(enemigos['jefe'], f"{origen}: enemigos.jefe", _CAMPOS_JEFE)
+    habilidades = datos.get('habilidades', {})
+    if not isinstance(habilidades, dict):
+        raise ValueError(f"{origen}: 'habilidades' debe ser un objeto nombre -> datos.")
+    for nombre, hab in habilidades.items():
+        ruta = f"{origen}: habilidades['{nombre}']"
+        if nombre not in HABILIDADES:
+            raise ValueError(f"{ruta}: no hay ninguna habilidad registrada con ese nombre.")
+        if not isinstance(hab, dict) or set(hab) - {'costo', 'nivel'}:
+            raise ValueError(f"{ruta}: admite 'costo' y 'nivel'.")
+        if 'costo' in hab and (not _es_entero(hab['costo']) or hab['costo'] < 0):
+            raise ValueError(f"{ruta}.costo: debe ser un entero >= 0.")
+        if hab.get('nivel') is not None and (not _es_entero(hab['nivel']) or hab['nivel'] < 2):
+            raise ValueError(f"{ruta}.nivel: debe ser un entero >= 2 (o null).")
+    dropeos = datos.get('dropeos', [])
+    if not isinstance(dropeos, list):
+        raise ValueError(f"{origen}: 'dropeos' debe ser una lista.")
+    for i, drop in enumerate(dropeos):
+        _validar_entrada_botin(drop, f"{origen}: dropeos[{i}]")
+    botin = datos.get('botin', {})
+    if not isinstance(botin, dict) or set(botin) - {'tablas', 'reglas'}:
+        raise ValueError(f"{origen}: 'botin' admite 'tablas' y 'reglas'.")
+    tablas = botin.get('tablas', {})
+    if not isinstance(tablas, dict):
+        raise ValueError(f"{origen}: botin.tablas debe ser un objeto nombre -> tabla.")
+    for nombre, tabla in tablas.items():
+        ruta = f"{origen}: botin.tablas['{nombre}']"
+        if nombre == TABLA_POR_DEFECTO:
+            raise ValueError(f"{ruta}: '{TABLA_POR_DEFECTO}' se define en la sección 'dropeos'.")
+        if not isinstance(tabla, dict) or set(tabla) - {'entradas', 'garantizados', 'tiradas'}:
+            raise ValueError(f"{ruta}: admite 'entradas', 'garantizados' y 'tiradas'.")
+        if 'tiradas' in tabla and (not _es_entero(tabla['tiradas']) or tabla['tiradas'] < 0):
+            raise ValueError(f"{ruta}.tiradas: debe ser un entero >= 0.")
+        for campo in ('entradas', 'garantizados'):
+            if not isinstance(tabla.get(campo, []), list):
+                raise ValueError(f"{ruta}.{campo}: debe ser una lista.")
+            for i, drop in enumerate(tabla.get(campo, [])):
+                _validar_entrada_botin(drop, f"{ruta}.{campo}[{i}]", con_peso=campo == 'entradas')
+    reglas = botin.get('reglas', [])
+    if not isinstance(reglas, list):
+        raise ValueError(f"{origen}: botin.reglas debe ser una lista.")
+    for i, regla in enumerate(reglas):
+        ruta = f"{origen}: botin.reglas[{i}]"
+        if (not isinstance(regla, dict) or not isinstance(regla.get('tabla'), str)
+                or set(regla) - {'tabla', 'enemigo', 'nivel_min', 'nivel_max'}):
+            raise ValueError(f"{ruta}: necesita 'tabla' y admite 'enemigo', 'nivel_min' y 'nivel_max'.")
+        if 'enemigo' in regla and not isinstance(regla['enemigo'], str):
+            raise ValueError(f"{ruta}.enemigo: nombre de un tipo de enemigo o 'Jefe'.")
+        for campo in ('nivel_min', 'nivel_max'):
+            if campo in regla and (not _es_entero(regla[campo]) or regla[campo] < 1):
+                raise ValueError(f"{ruta}.{campo}: debe ser un entero >= 1.")
+
+def combinar_contenido(paquetes, base=CONTENIDO_BASE):
+    """Combina los paquetes (ya validados) en orden sobre `base`. Retorna el contenido resultante."""
+    contenido = json.loads(json.dumps(base))
+    tipos = {t['nombre']: t for t in contenido['enemigos']['tipos']}
+    for paquete in paquetes:
+        enemigos = paquete.get('enemigos', {})
+        for tipo in enemigos.get('tipos', []):
+            if tipo['nombre'] in tipos:
+                tipos[tipo['nombre']].update(tipo)
+            elif 'peso' not in tipo:
+                raise ValueError(f"El tipo de enemigo nuevo '{tipo['nombre']}' necesita un 'peso'.")
+            else:
+                tipos[tipo['nombre']] = dict(tipo)
+                contenido['enemigos']['tipos'].append(tipos[tipo['nombre']])
+        if 'prob_jefe' in enemigos:
+            contenido['enemigos']['prob_jefe'] = enemigos['prob_jefe']
+        contenido['enemigos']['jefe'].update(enemigos.get('jefe', {}))
+        for nombre, hab in paquete.get('habilidades', {}).items():
+            contenido['habilidades'].setdefault(nombre, {'costo': HABILIDADES[nombre].costo}).update(hab)
+        if 'dropeos' in paquete:
+            contenido['dropeos'] = paquete['dropeos']
+        botin = paquete.get('botin', {})
+        contenido['botin']['tablas'].update(botin.get('tablas', {}))
+        if 'reglas' in botin:
+            contenido['botin']['reglas'] = botin['reglas']
+    # Reglas sobre el resultado combinado
+    if not any(t['peso'] > 0 for t in contenido['enemigos']['tipos']):
+        raise ValueError("El contenido necesita al menos un tipo de enemigo con peso > 0.")
+    niveles = Counter(h['nivel'] for h in contenido['habilidades'].values() if h.get('nivel') is not None)
+    repetidos = sorted(nivel for nivel, veces in niveles.items() if veces > 1)
+    if repetidos:
+        raise ValueError(f"Varias habilidades se aprenden en el nivel {', '.join(map(str, repetidos))}.")
+    _comprobar_botin(contenido)
+    return contenido
+
+def _comprobar_botin(contenido):
+    """Pesos, referencias entre tablas (sin ciclos) y reglas del botín combinado."""
+    tablas = {TABLA_POR_DEFECTO: {'entradas': contenido['dropeos']}, **contenido['botin']['tablas']}
+    for nombre, tabla in tablas.items():
+        if tabla.get('entradas') and sum(d['peso'] for d in tabla['entradas']) <= 0:
+            raise ValueError(f"Los pesos de '{nombre}' suman 0.")
+        for drop in tabla.get('entradas', []) + tabla.get('garantizados', []):
+            if drop['tipo'] == 'tabla' and drop['tabla'] not in tablas:
+                raise ValueError(f"La tabla de botín '{nombre}' usa '{drop['tabla']}', que no existe.")
+    terminadas = set()
+
+    def recorrer(nombre, camino):
+        if nombre in terminadas:
+            return
+        if nombre in camino:
+            raise ValueError(f"Las tablas de botín forman un ciclo: {' -> '.join(camino + [nombre])}.")
+        tabla = tablas[nombre]
+        for drop in tabla.get('entradas', []) + tabla.get('garantizados', []):
+            if drop['tipo'] == 'tabla':
+                recorrer(drop['tabla'], camino + [nombre])
+        terminadas.add(nombre)
+    for nombre in tablas:
+        recorrer(nombre, [])
+    enemigos = {t['nombre'] for t in contenido['enemigos']['tipos']} | {'Jefe'}
+    for regla in contenido['botin']['reglas']:
+        if regla['tabla'] not in tablas:
+            raise ValueError(f"Una regla de botín usa la tabla '{regla['tabla']}', que no existe.")
+        if regla.get('enemigo', 'Jefe') not in enemigos:
+            raise ValueError(f"Una regla de botín usa el tipo de enemigo '{regla['enemigo']}', que no existe.")
+        if regla.get('nivel_max') is not None and regla['nivel_max'] < regla.get('nivel_min', 1):
+            raise ValueError(f"Una regla de botín de '{regla['tabla']}' tiene nivel_max < nivel_min.")
+
+def _compilar_entrada(d):
+    if d['tipo'] == 'pocion':
+        return ('pocion', tuple(d['opciones']))
+    if d['tipo'] == 'tabla':
+        return ('tabla', d['tabla'])
+    return (d['tipo'], d.get('objeto'))
+
+def _compilar_tabla(tabla):
+    umbrales = []
+    total = sum(d['peso'] for d in tabla.get('entradas', []))
+    acumulado = 0
+    for d in tabla.get('entradas', []):
+        acumulado += d['peso']
+        umbrales.append(acumulado / total)
+    return (tuple(umbrales), tuple(_compilar_entrada(d) for d in tabla.get('entradas', [])),
+            tuple(_compilar_entrada(d) for d in tabla.get('garantizados', [])), tabla.get('tiradas', 1))
+
+def compilar_contenido(contenido):
+    """Forma que usa el juego: tablas de enemigos, costes, niveles y tablas de botín."""
+    enemigos = contenido['enemigos']
+    campos = Arquetipo._fields
+    arquetipos = {t['nombre']: Arquetipo(**{c: t[c] for c in campos if c in t}) for t in enemigos['tipos']}
+    tablas = {TABLA_POR_DEFECTO: _compilar_tabla({'entradas': contenido['dropeos']})}
+    for nombre, tabla in contenido['botin']['tablas'].items():
+        tablas[nombre] = _compilar_tabla(tabla)
+    reglas = tuple((r.get('enemigo'), r.get('nivel_min', 1), r.get('nivel_max'), r['tabla'])
+                   for r in contenido['botin']['reglas'])
+    return {
+        'tipos': [t['nombre'] for t in enemigos['tipos']],
+        'pesos': [t['peso'] for t in enemigos['tipos']],
+        'arquetipos': arquetipos,
+        'jefe': Arquetipo(**{c: v for c, v in enemigos['jefe'].items() if c in campos}),
+        'prob_jefe': enemigos['prob_jefe'],
+        'costos': {nombre: h['costo'] for nombre, h in contenido['habilidades'].items()},
+        'por_nivel': {h['nivel']: nombre for nombre, h in contenido['habilidades'].items() if h.get('nivel') is not None},
+        'botin': {'tablas': tablas, 'reglas': reglas},
+    }
+
+def codificar_indice(compilado, huella):
+    """Bytes del índice binario de un contenido compilado."""
+    registros = bytearray()
+    for nombre, peso in zip(compilado['tipos'], compilado['pesos']):
+        a = compilado['arquetipos'][nombre]
+        registros += _REGISTRO_ARQUETIPO.pack(peso, a.vida, a.ataque, a.defensa, a.velocidad, a.mana, a.mana_por_nivel, a.copia_elemento)
+    j = compilado['jefe']
+    registros += _REGISTRO_ARQUETIPO.pack(0, j.vida, j.ataque, j.defensa, j.velocidad, j.mana, j.mana_por_nivel, j.copia_elemento)
+    reglas = _codificar({
+        'prob_jefe': compilado['prob_jefe'],
+        'costos': compilado['costos'],
+        'por_nivel': sorted(compilado['por_nivel'].items()),
+        'botin': compilado['botin'],
+    })
+    secciones = ((b'huella', huella.encode()), (b'tipos', bytes(registros)),
+                 (b'nombres', _codificar(compilado['tipos'])), (b'reglas', reglas))
+    salida = bytearray(_CABECERA.pack(MAGIA_CONTENIDO, VERSION_CONTENIDO, len(secciones)))
+    desplazamiento = _CABECERA.size + _ENTRADA_SECCION.size * len(secciones)
+    for nombre, cuerpo in secciones:
+        salida += _ENTRADA_SECCION.pack(nombre, desplazamiento, len(cuerpo))
+        desplazamiento += len(cuerpo)
+    for _, cuerpo in secciones:
+        salida += cuerpo
+    return bytes(salida)
+
+def _leer_entradas(entradas):
+    return tuple((tipo, tuple(dato) if tipo == 'pocion' else dato) for tipo, dato in entradas)
+
+def leer_indice(datos):
+    """Contenido compilado desde los bytes (o un mmap) de codificar_indice. Retorna (compilado, huella)."""
+    if len(datos) < _CABECERA.size:
+        raise ValueError("Índice de contenido truncado.")
+    magia, version, n = _CABECERA.unpack_from(datos, 0)
+    if magia != MAGIA_CONTENIDO or version != VERSION_CONTENIDO:
+        raise ValueError("No es un índice de contenido de esta versión.")
+    secciones = {}
+    for i in range(n):
+        nombre, desplazamiento, longitud = _ENTRADA_SECCION.unpack_from(datos, _CABECERA.size + i * _ENTRADA_SECCION.size)
+        if desplazamiento + longitud > len(datos):
+            raise ValueError("Índice de contenido truncado.")
+        secciones[nombre.rstrip(b'\0')] = datos[desplazamiento:desplazamiento + longitud]
+    nombres = json.loads(secciones[b'nombres'])
+    registros = list(_REGISTRO_ARQUETIPO.iter_unpack(secciones[b'tipos']))
+    if len(registros) != len(nombres) + 1:
+        raise ValueError("Índice de contenido inconsistente.")
+    arquetipos = [Arquetipo(*r[1:7], bool(r[7])) for r in registros]
+    reglas = json.loads(secciones[b'reglas'])
+    compilado = {
+        'tipos': nombres,
+        'pesos': [r[0] for r in registros[:-1]],
+        'arquetipos': dict(zip(nombres, arquetipos)),
+        'jefe': arquetipos[-1],
+        'prob_jefe': reglas['prob_jefe'],
+        'costos': reglas['costos'],
+        'por_nivel': {nivel: nombre for nivel, nombre in reglas['por_nivel']},
+        'botin': {
+            'tablas': {nombre: (tuple(umbrales), _leer_entradas(entradas), _leer_entradas(garantizados), tiradas)
+                       for nombre, (umbrales, entradas, garantizados, tiradas) in reglas['botin']['tablas'].items()},
+            'reglas': tuple(map(tuple, reglas['botin']['reglas'])),
+        },
+    }
+    return compilado, secciones[b'huella'].decode()
+
+def huella_paquetes(contenidos):
+    """Huella de los bytes de los paquetes (en orden) y de la versión del índice."""
+    h = hashlib.blake2b(f"{VERSION_CONTENIDO}:".encode(), digest_size=16)
+    for datos in contenidos:
+        h.update(len(datos).to_bytes(8, 'little'))
+        h.update(datos)
+    return h.hexdigest()
+
+def cargar_contenido(rutas, cache=CACHE_CONTENIDO):
+    """
+    Contenido compilado de los paquetes `rutas`. Usa el índice de la caché si
+    existe para su huella; si no, valida, combina, compila y lo escribe.
+    Retorna (compilado, huella, desde_cache).
+    """
+    contenidos = []
+    for ruta in rutas:
+        with open(ruta, 'rb') as f:
+            contenidos.append(f.read())
+    huella = huella_paquetes(contenidos)
+    ruta_indice = os.path.join(cache, f"{huella}.idx") if cache else None
+    if ruta_indice and os.path.exists(ruta_indice):
+        import mmap
+        try:
+            with open(ruta_indice, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                compilado, huella_indice = leer_indice(mapa)
+            if huella_indice == huella:
+                return compilado, huella, True
+        except (ValueError, KeyError, OSError, struct.error):
+            pass    # índice dañado o de otra versión: se recompila
+    paquetes = []
+    for ruta, datos in zip(rutas, contenidos):
+        try:
+            paquete = json.loads(datos)
+        except ValueError as e:
+            raise ValueError(f"{ruta}: JSON inválido ({e}).")
+        validar_paquete(paquete, ruta)
+        paquetes.append(paquete)
+    compilado = compilar_contenido(combinar_contenido(paquetes))
+    if ruta_indice:
+        try:
+            os.makedirs(cache, exist_ok=True)
+            escribir_atomico(ruta_indice, codificar_indice(compilado, huella))
+        except OSError:
+            pass    # sin caché (p. ej. directorio de solo lectura): solo se pierde el arranque rápido
+    return compilado, huella, False
+
+CONTENIDO_ACTIVO = None
+HUELLA_CONTENIDO = None
+
+def activar_contenido(compilado, huella):
+    """
+    Pone `compilado` como contenido del juego (constantes del módulo y costes
+    de HABILIDADES). Las partidas ya creadas conservan su mapa de
+    habilidades por nivel; los enemigos y el botín nuevos usan el nuevo
+    contenido. Retorna el contenido que estaba activo.
+    """
+    global TIPOS_ENEMIGO, PESOS_ENEMIGO, PROB_JEFE, ARQUETIPOS_ENEMIGO, ARQUETIPO_JEFE
+    global HABILIDADES_POR_NIVEL, BOTIN, CONTENIDO_ACTIVO, HUELLA_CONTENIDO
+    anterior = CONTENIDO_ACTIVO
+    TIPOS_ENEMIGO = list(compilado['tipos'])
+    PESOS_ENEMIGO = list(compilado['pesos'])
+    PROB_JEFE = compilado['prob_jefe']
+    ARQUETIPOS_ENEMIGO = dict(compilado['arquetipos'])
+    ARQUETIPO_JEFE = compilado['jefe']
+    HABILIDADES_POR_NIVEL = dict(compilado['por_nivel'])
+    BOTIN = MotorBotin(compilado['botin'])
+    for nombre, costo in compilado['costos'].items():
+        HABILIDADES[nombre].costo = costo
+    CONTENIDO_ACTIVO, HUELLA_CONTENIDO = compilado, huella
+    return anterior
+
+activar_contenido(compilar_contenido(CONTENIDO_BASE), "base")
+
+class PaqueteContenido:
+    """
+    Paquetes de contenido de un proceso de larga vida: `cargar()` los activa
+    y `recargar()` lo vuelve a hacer solo si algún archivo cambió (tamaño o
+    fecha de modificación). Si la nueva versión no es válida sigue activa la
+    anterior y se propaga el ValueError.
+    """
+    def __init__(self, rutas, cache=CACHE_CONTENIDO):
+        self.rutas = list(rutas)
+        self.cache = cache
+        self.firma = None
+        self.huella = None
+        self.desde_cache = False
+        self.segundos = 0.0
+        self.recargas = 0
+
+    def _firma(self):
+        return tuple((e.st_size, e.st_mtime_ns) for e in map(os.stat, self.rutas))
+
+    def cargar(self):
+        inicio = time.perf_counter()
+        firma = self._firma()
+        compilado, huella, self.desde_cache = cargar_contenido(self.rutas, self.cache)
+        activar_contenido(compilado, huella)
+        self.firma, self.huella = firma, huella
+        self.segundos = time.perf_counter() - inicio
+        return compilado
+
+    def recargar(self):
+        """Recarga si cambió algún paquete. Retorna True si se recargó."""
+        firma = self._firma()
+        if firma == self.firma:
+            return False
+        # Un paquete inválido no se reintenta hasta que vuelva a cambiar
+        self.firma = firma
+        self.cargar()
+        self.recargas += 1
+        return True
+
+# --- ALMACÉN DE PERFILES (SQLite) ---
+# Un destino de guardado "sqlite:<ruta>" guarda la partida como perfil (por
+# nombre del jugador) dentro de esa base en lugar de en un archivo propio.
+PREFIJO_SQLITE = "sqlite:"
+
+class AlmacenPerfiles:
+    """
+    Muchas partidas en una base SQLite local. Cada perfil guarda su última
+    partida (formato binario) junto a columnas indexadas (nombre, nivel y
+    fecha de última partida) para buscar sin decodificar nada, y la tabla
+    `instantaneas` conserva las `retencion` versiones anteriores de cada uno.
+    """
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS perfiles (
+            id INTEGER PRIMARY KEY,
+            nombre TEXT NOT NULL UNIQUE,
+            nivel INTEGER NOT NULL,
+            xp INTEGER NOT NULL,
+            actualizado REAL NOT NULL,
+            datos BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS perfiles_nivel ON perfiles (nivel);
+        CREATE INDEX IF NOT EXISTS perfiles_actualizado ON perfiles (actualizado);
+        CREATE TABLE IF NOT EXISTS instantaneas (
+            id INTEGER PRIMARY KEY,
+            perfil TEXT NOT NULL,
+            creado REAL NOT NULL,
+            datos BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS instantaneas_perfil ON instantaneas (perfil, id);
+    """
+
+    def __init__(self, ruta, retencion=5):
+        self.ruta = ruta
+        self.retencion = retencion
+        # Una conexión compartida (también por el hilo de autoguardado)
+        self._bloqueo = threading.Lock()
+        self.conexion = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        if ruta != ":memory:":
+            self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.execute("PRAGMA synchronous=NORMAL")
+        self.conexion.executescript(self.ESQUEMA)
+
+    def __len__(self):
+        return self.conexion.execute("SELECT COUNT(*) FROM perfiles").fetchone()[0]
+
+    def guardar_datos(self, datos):
+        """Guarda un Juego.to_dict() en el perfil de su jugador."""
+        self.guardar_lote([datos])
+
+    def guardar(self, juego):
+        self.guardar_datos(juego.to_dict())
+
+    def guardar_lote(self, lista_datos):
+        """
+        Guarda varios Juego.to_dict() en una sola transacción. La versión
+        anterior de cada perfil pasa a `instantaneas`, que se recorta a las
+        `retencion` más recientes.
+        """
+        ahora = time.time()
+        filas = [
+            (d['jugador']['nombre'], d['jugador']['nivel'], d['jugador']['xp'], ahora, codificar_guardado(d))
+            for d in lista_datos
+        ]
+        nombres = [(fila[0],) for fila in filas]
+        with self._bloqueo:
+            cursor = self.conexion.cursor()
+            cursor.execute("BEGIN")
+            try:
+                if self.retencion > 0:
+                    cursor.executemany(
+                        "INSERT INTO instantaneas (perfil, creado, datos) "
+                        "SELECT nombre, actualizado, datos FROM perfiles WHERE nombre = ?", nombres)
+                cursor.executemany(
+                    "INSERT INTO perfiles (nombre, nivel, xp, actualizado, datos) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (nombre) DO UPDATE SET nivel = excluded.nivel, xp = excluded.xp, "
+                    "actualizado = excluded.actualizado, datos = excluded.datos", filas)
+                if self.retencion > 0:
+                    cursor.executemany(
+                        "DELETE FROM instantaneas WHERE perfil = ? AND id NOT IN "
+                        "(SELECT id FROM instantaneas WHERE perfil = ? ORDER BY id DESC LIMIT ?)",
+                        [(n, n, self.retencion) for (n,) in nombres])
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+
+    def cargar_datos(self, nombre):
+        """Juego.to_dict() del perfil `nombre`, o None si no existe."""
+        with self._bloqueo:
+            fila = self.conexion.execute("SELECT datos FROM perfiles WHERE nombre = ?", (nombre,)).fetchone()
+        return GuardadoBinario(fila[0]).to_dict() if fila else None
+
+    def cargar(self, nombre, consola=True):
+        datos = self.cargar_datos(nombre)
+        return Juego.from_dict(datos, consola=consola) if datos else None
+
+    def listar(self, nivel_minimo=1, limite=20):
+        """Perfiles de nivel >= `nivel_minimo`, de la última partida a la más antigua."""
+        with self._bloqueo:
+            filas = self.conexion.execute(
+                "SELECT nombre, nivel, xp, actualizado FROM perfiles WHERE nivel >= ? "
+                "ORDER BY actualizado DESC LIMIT ?", (nivel_minimo, limite)).fetchall()
+        return [{'nombre': n, 'nivel': nv, 'xp': xp, 'actualizado': t} for n, nv, xp, t in filas]
+
+    def historial(self, nombre):
+        """Instantáneas conservadas de `nombre`: lista de (id, fecha), la más reciente primero."""
+        with self._bloqueo:
+            return self.conexion.execute(
+                "SELECT id, creado FROM instantaneas WHERE perfil = ? ORDER BY id DESC", (nombre,)).fetchall()
+
+    def cargar_instantanea(self, ident):
+        with self._bloqueo:
+            fila = self.conexion.execute("SELECT datos FROM instantaneas WHERE id = ?", (ident,)).fetchone()
+        return GuardadoBinario(fila[0]).to_dict() if fila else None
+
+    def cerrar(self):
+        with self._bloqueo:
+            self.conexion.close()
+
+# Almacenes abiertos por ruta (un destino "sqlite:..." reutiliza su conexión)
+_ALMACENES = {}
+
+def abrir_almacen(ruta):
+    if ruta not in _ALMACENES:
+        _ALMACENES[ruta] = AlmacenPerfiles(ruta)
+    return _ALMACENES[ruta]
+
+def destino_de_jugador(destino, nombre):
+    """
+    Destino de guardado propio de `nombre` dentro de un destino compartido
+    por muchas partidas: un almacén SQLite ya separa los perfiles por nombre
+    y un archivo "partidas.sav" pasa a "partidas.<nombre>.sav" (con los
+    caracteres que no valen en un nombre de archivo cambiados por '_' y, si
+    hubo que cambiar alguno, un resumen del nombre para no mezclar jugadores).
+    """
+    if not destino or destino.startswith(PREFIJO_SQLITE):
+        return destino
+    base, extension = os.path.splitext(destino)
+    seguro = "".join(c if c.isalnum() or c in "-_" else "_" for c in nombre)
+    if seguro != nombre or not seguro:
+        seguro += "-" + hashlib.blake2b(nombre.encode('utf-8'), digest_size=4).hexdigest()
+    return f"{base}.{seguro}{extension}"
+
+def escribir_guardado(destino, datos, formato="binario"):
+    """Guarda un Juego.to_dict() en un archivo o, si `destino` es "sqlite:<ruta>", como perfil."""
+    if destino.startswith(PREFIJO_SQLITE):
+        abrir_almacen(destino[len(PREFIJO_SQLITE):]).guardar_datos(datos)
+    else:
+        escribir_atomico(destino, serializar_guardado(datos, formato))
+
+def leer_guardado(origen, nombre=None):
+    """
+    Juego.to_dict() guardado en `origen`: un archivo (binario o JSON) o el
+    perfil `nombre` de "sqlite:<ruta>". None si no existe.
+    """
+    if origen.startswith(PREFIJO_SQLITE):
+        return abrir_almacen(origen[len(PREFIJO_SQLITE):]).cargar_datos(nombre)
+    if not os.path.exists(origen):
+        return None
+    with open(origen, "rb") as f:
+        contenido = f.read()
+    if contenido.startswith(MAGIA_GUARDADO):
+        return GuardadoBinario(contenido).to_dict()
+    return json.loads(contenido.decode('utf-8'))
+
+class AutoGuardado:
+    """
+    Escritor de guardados en segundo plano. `solicitar` solo deja pendiente
+    la instantánea más reciente de cada partida (una ráfaga de guardados
+    produce una única escritura) y el hilo escritor la serializa, sincroniza
+    y reemplaza el archivo, así el bucle de juego nunca espera al disco. Un
+    mismo escritor puede atender muchas partidas; las que van a un almacén
+    SQLite se escriben juntas en una transacción. Lo pendiente se escribe al
+    cerrar, también al salir del intérprete.
+    """
+    def __init__(self):
+        self._condicion = threading.Condition()
+        self._pendientes = {}       # (ruta, jugador) -> (ruta, datos, formato) más reciente
+        self._escribiendo = False
+        self._cerrado = False
+        self.escrituras = 0
+        self.error = None           # último error de escritura, si lo hubo
+        self.errores = {}           # ruta -> error de su última escritura (hasta tomar_error)
+        self._hilo = threading.Thread(target=self._bucle, name="autoguardado", daemon=True)
+        self._hilo.start()
+        atexit.register(self.cerrar)
+
+    def solicitar(self, ruta, datos, formato="binario"):
+        """`datos` debe ser una instantánea (Juego.to_dict()): no se copia."""
+        with self._condicion:
+            if self._cerrado:
+                raise RuntimeError("El autoguardado está cerrado.")
+            self._pendientes[ruta, datos['jugador']['nombre']] = (ruta, datos, formato)
+            self._condicion.notify_all()
+
+    def _bucle(self):
+        while True:
+            with self._condicion:
+                while not self._pendientes and not self._cerrado:
+                    self._condicion.wait()
+                if not self._pendientes:
+                    return
+                pendientes = list(self._pendientes.values())
+                self._pendientes = {}
+                self._escribiendo = True
+            resultados = {}         # ruta -> error o None si se escribió
+            try:
+                lotes = {}
+                for ruta, datos, formato in pendientes:
+                    if ruta.startswith(PREFIJO_SQLITE):
+                        lotes.setdefault(ruta, []).append(datos)
+                        continue
+                    try:
+                        escribir_guardado(ruta, datos, formato)
+                        self.escrituras += 1
+                        resultados.setdefault(ruta, None)
+                    except (IOError, ValueError, TypeError) as e:
+                        resultados[ruta] = e
+                for ruta, lista in lotes.items():
+                    try:
+                        abrir_almacen(ruta[len(PREFIJO_SQLITE):]).guardar_lote(lista)
+                        self.escrituras += len(lista)
+                        resultados[ruta] = None
+                    except (ValueError, TypeError, sqlite3.Error) as e:
+                        resultados[ruta] = e
+            finally:
+                with self._condicion:
+                    for ruta, error in resultados.items():
+                        if error is None:
+                            self.errores.pop(ruta, None)
+                        else:
+                            self.error = self.errores[ruta] = error
+                    self._escribiendo = False
+                    self._condicion.notify_all()
+
+    def tomar_error(self, ruta):
+        """Error de la última escritura en `ruta`, si falló y nadie lo ha tomado aún; si no, None."""
+        with self._condicion:
+            return self.errores.pop(ruta, None)
+
+    def esperar(self):
+        """Bloquea hasta que la última instantánea solicitada esté en disco."""
+        with self._condicion:
+            while self._pendientes or self._escribiendo:
+                self._condicion.wait()
+
+    def cerrar(self):
+        with self._condicion:
+            self._cerrado = True
+            self._condicion.notify_all()
+        self._hilo.join()
+        atexit.unregister(self.cerrar)
+
+_AUTOGUARDADO_COMPARTIDO = None     # (pid, AutoGuardado)
+_CERROJO_AUTOGUARDADO = threading.Lock()
+
+def autoguardado_compartido():
+    """
+    Escritor común de las partidas que no tienen uno propio: un solo hilo
+    para todas. Se crea con el primer autoguardado (y de nuevo en un proceso
+    hijo, que no hereda el hilo).
+    """
+    global _AUTOGUARDADO_COMPARTIDO
+    with _CERROJO_AUTOGUARDADO:
+        pid = os.getpid()
+        if _AUTOGUARDADO_COMPARTIDO is None or _AUTOGUARDADO_COMPARTIDO[0] != pid or _AUTOGUARDADO_COMPARTIDO[1]._cerrado:
+            _AUTOGUARDADO_COMPARTIDO = (pid, AutoGuardado())
+        return _AUTOGUARDADO_COMPARTIDO[1]
+
+# --- PERFILADO DE TURNOS ---
+# Contadores e histogramas por fase de un turno de batalla. Juego.perfil es
+# None por defecto y cada punto medido solo comprueba eso; con un Perfilador,
+# iniciar_turno() decide al empezar cada turno si se mide (uno de cada
+# `muestreo`). El dropeo y el guardado, que no son por turno, se miden siempre.
+
+# Cubetas del histograma: la k-ésima cuenta duraciones menores que 2**k µs
+# (la última, todo lo demás)
+CUBETAS_PERFIL = 25
+LIMITES_PERFIL = tuple(2 ** k * 1e-6 for k in range(CUBETAS_PERFIL - 1)) + (float('inf'),)
+
+class Perfilador:
+    """
+    Tiempos por fase: 'turno', 'decision' (desde la pregunta de acción hasta
+    que la acción empieza), 'habilidad', 'ataque', 'objeto', 'estados',
+    'accion_enemigo', 'buffs', 'dropeo', 'guardado' y 'autoguardado'. Puede
+    compartirse entre partidas (p. ej. todas las de un servidor).
+    """
+    def __init__(self, muestreo=1):
+        self.muestreo = max(1, int(muestreo))
+        self.turnos = 0
+        self.turnos_medidos = 0
+        self.fases = {}     # fase -> [n, total, máximo, cubetas]
+
+    def iniciar_turno(self):
+        """Cuenta un turno y retorna si hay que medirlo."""
+        self.turnos += 1
+        if self.turnos % self.muestreo:
+            return False
+        self.turnos_medidos += 1
+        return True
+
+    def registrar(self, fase, segundos):
+        datos = self.fases.get(fase)
+        if datos is None:
+            datos = self.fases[fase] = [0, 0.0, 0.0, [0] * CUBETAS_PERFIL]
+        datos[0] += 1
+        datos[1] += segundos
+        if segundos > datos[2]:
+            datos[2] = segundos
+        datos[3][min(int(segundos * 1e6).bit_length(), CUBETAS_PERFIL - 1)] += 1
+
+    def reiniciar(self):
+        self.turnos = self.turnos_medidos = 0
+        self.fases.clear()
+
+    @staticmethod
+    def _percentil(cubetas, n, maximo, q):
+        """Límite superior de la cubeta que contiene el cuantil `q` (acotado por el máximo)."""
+        acumulado = 0
+        for limite, cuenta in zip(LIMITES_PERFIL, cubetas):
+            acumulado += cuenta
+            if acumulado >= q * n:
+                return min(limite, maximo)
+        return maximo
+
+    def instantanea(self):
+        """Dict serializable con los contadores y, por fase, n, total, media, máximo, percentiles y cubetas no vacías."""
+        fases = {}
+        for fase, (n, total, maximo, cubetas) in self.fases.items():
+            fases[fase] = {
+                'n': n,
+                'total': total,
+                'media': total / n,
+                'max': maximo,
+                'p50': self._percentil(cubetas, n, maximo, 0.50),
+                'p90': self._percentil(cubetas, n, maximo, 0.90),
+                'p99': self._percentil(cubetas, n, maximo, 0.99),
+                'cubetas': [[None if limite == float('inf') else limite, cuenta]
+                            for limite, cuenta in zip(LIMITES_PERFIL, cubetas) if cuenta],
+            }
+        return {'turnos': self.turnos, 'turnos_medidos': self.turnos_medidos,
+                'muestreo': self.muestreo, 'fases': fases}
+
+    def prometheus(self, prefijo="chrono"):
+        """Los contadores en el formato de texto de Prometheus."""
+        lineas = [
+            f"# HELP {prefijo}_turnos_total Turnos de batalla jugados.",
+            f"# TYPE {prefijo}_turnos_total counter",
+            f"{prefijo}_turnos_total {self.turnos}",
+            f"# HELP {prefijo}_turnos_medidos_total Turnos de batalla medidos (1 de cada {self.muestreo}).",
+            f"# TYPE {prefijo}_turnos_medidos_total counter",
+            f"{prefijo}_turnos_medidos_total {self.turnos_medidos}",
+            f"# HELP {prefijo}_fase_segundos Duración de cada fase de un turno de batalla.",
+            f"# TYPE {prefijo}_fase_segundos histogram",
+        ]
+        for fase, (n, total, maximo, cubetas) in sorted(self.fases.items()):
+            acumulado = 0
+            for limite, cuenta in zip(LIMITES_PERFIL, cubetas):
+                acumulado += cuenta
+                le = "+Inf" if limite == float('inf') else f"{limite:g}"
+                lineas.append(f'{prefijo}_fase_segundos_bucket{{fase="{fase}",le="{le}"}} {acumulado}')
+            lineas.append(f'{prefijo}_fase_segundos_sum{{fase="{fase}"}} {total!r}')
+            lineas.append(f'{prefijo}_fase_segundos_count{{fase="{fase}"}} {n}')
+        return "\n".join(lineas) + "\n"
+
+    def exportar(self, ruta, prefijo="chrono"):
+        """Escribe prometheus() en `ruta` (temporal + renombrado, para el textfile collector)."""
+        temporal = f"{ruta}.tmp"
+        with open(temporal, "w", encoding='utf-8') as f:
+            f.write(self.prometheus(prefijo))
+        os.replace(temporal, ruta)
+
+# --- CONTABILIDAD DE MEMORIA ---
+# Tamaño estructural aproximado: sys.getsizeof sobre cada objeto alcanzable,
+# contando cada uno una sola vez. No se recorre lo que comparten todas las
+# partidas (clases, funciones, métodos, miembros de Enum), así que la suma por
+# sesión se acerca a lo que se liberaría al desalojarla. None y los booleanos
+# tampoco cuentan: son únicos en todo el proceso.
+
+_NO_CONTADOS = (type, ModuleType, FunctionType, MethodType, BuiltinFunctionType, Enum, bool, type(None))
+_HOJAS = (str, bytes, int, float, complex, range)
+
+_FORMAS = {}    # tipo -> (forma, nombres de __slots__); 0 no cuenta, 1 hoja, 2 dict, 3 secuencia, 4 objeto
+
+def _forma(tipo):
+    if issubclass(tipo, _NO_CONTADOS):
+        forma = 0
+    elif issubclass(tipo, _HOJAS):
+        forma = 1
+    elif issubclass(tipo, dict):
+        forma = 2
+    elif issubclass(tipo, (list, tuple, set, frozenset)):
+        forma = 3
+    else:
+        forma = 4
+    slots = []
+    for clase in tipo.__mro__:
+        nombres = clase.__dict__.get('__slots__', ())
+        slots.extend((nombres,) if isinstance(nombres, str) else nombres)
+    _FORMAS[tipo] = resultado = (forma, tuple(slots))
+    return resultado
+
+def tamano_estructural(obj, vistos=None):
+    """Bytes aproximados de `obj` y todo lo que alcanza. `vistos` (ids) evita contar dos veces."""
+    if vistos is None:
+        vistos = set()
+    getsizeof = sys.getsizeof
+    total = 0
+    pendientes = [obj]
+    while pendientes:
+        o = pendientes.pop()
+        if id(o) in vistos:
+            continue
+        tipo = type(o)
+        forma, slots = _FORMAS.get(tipo) or _forma(tipo)
+        if not forma:
+            continue
+        vistos.add(id(o))
+        total += getsizeof(o)
+        if forma == 2:
+            pendientes.extend(o.keys())
+            pendientes.extend(o.values())
+        elif forma == 3:
+            pendientes.extend(o)
+        elif forma == 4:
+            atributos = getattr(o, '__dict__', None)
+            if atributos is not None:
+                pendientes.append(atributos)
+            for nombre in slots:
+                pendientes.append(getattr(o, nombre, None))
+    return total
+
+class Juego:
+    def __init__(self, jugador=None, semilla=None, consola=True, salida=print):
+        if jugador:
+            self.jugador = jugador
+        else:
+            nombre_heroe = input("Nombre de tu héroe: ")
+            self.jugador = Personaje(nombre_heroe)
+
+        # Texto de menús y avisos; un servidor la cambia por el envío a su cliente
+        self.mostrar = salida
+        # Bus de eventos de la partida; sin suscriptores no se formatea ningún mensaje
+        self.eventos = BusEventos()
+        if consola:
+            self.eventos.suscribir(RenderizadorConsola(salida))
+
+        # Flujo aleatorio propio de la partida; cada batalla deriva uno hijo
+        self.rng = FlujoAleatorio(semilla)
+        self.semilla = self.rng.semilla
+        self.jugador.rng = self.rng
+
+        self.nivel_actual = 1
+        # Nivel -> habilidad que se aprende (del contenido activo; se guarda con la partida)
+        self.habilidades_disponibles = dict(HABILIDADES_POR_NIVEL)
+        self.logros = []
+        self.archivo_guardado = ARCHIVO_GUARDADO
+        # Batalla en curso (EstadoCombate) o None entre batallas
+        self.combate = None
+        # Escritor de autoguardado (con el primer guardado en segundo plano se
+        # toma autoguardado_compartido()). Sin archivo_guardado no se guarda.
+        self.autoguardado = None
+        # IA opcional: asesor del jugador (acción [I]) y control de los jefes (BuscadorMCTS)
+        self.asesor = None
+        self.ia_jefe = None
+        # Generador de enemigos por tabla alias (GeneradorEncuentros) o None
+        # para FabricaEnemigos, con cuyo flujo aleatorio se graban las partidas
+        self.encuentros = None
+        # Perfilador de turnos (Perfilador) o None para no medir nada
+        self.perfil = None
+
+        # Sincroniza y notifica habilidades que por nivel ya debería tener el jugador
+        nuevas = self._sincronizar_habilidades()
+        if nuevas and self.eventos:
+            for hab in nuevas:
+                self.eventos.emitir(Evento(TipoEvento.NIVEL, 'habilidad_inicial', self.jugador.nombre, None, None, hab))
+
+    def guardar_progreso(self, formato="binario"):
+        """
+        Guarda la partida (formato binario, o 'json' para exportarla legible).
+        Si archivo_guardado es "sqlite:<ruta>", se guarda como perfil en esa base.
+        """
+        try:
+            inicio = time.perf_counter()
+            escribir_guardado(self.archivo_guardado, self.to_dict(), formato)
+            if self.perfil is not None:
+                self.perfil.registrar('guardado', time.perf_counter() - inicio)
+            self.mostrar("Progreso guardado.")
+        except (IOError, sqlite3.Error) as e:
+            self.mostrar(f"Error al guardar el progreso: {e}")
+
+    def exportar_json(self, ruta):
+        """Exporta la partida como JSON legible (no cambia el guardado binario)."""
+        escribir_atomico(ruta, serializar_guardado(self.to_dict(), "json"))
+
+    def autoguardar(self):
+        """
+        Encola una instantánea de la partida para el escritor en segundo plano.
+        Retorna False si la partida no tiene destino de guardado.
+        """
+        if not self.archivo_guardado:
+            return False
+        inicio = time.perf_counter()
+        if self.autoguardado is None:
+            self.autoguardado = autoguardado_compartido()
+        self.autoguardado.solicitar(self.archivo_guardado, self.to_dict())
+        if self.perfil is not None:
+            self.perfil.registrar('autoguardado', time.perf_counter() - inicio)
+        return True
+
+    def avisar_error_guardado(self):
+        """Muestra el error del último autoguardado si falló. Retorna si lo hubo."""
+        if self.autoguardado is None:
+            return False
+        error = self.autoguardado.tomar_error(self.archivo_guardado)
+        if error is not None:
+            self.mostrar(f"Error al guardar el progreso: {error}")
+        return error is not None
+
+    @staticmethod
+    def cargar_progreso(archivo, nombre=None, salida=print):
+        """
+        Carga un guardado binario o JSON (se detecta por la cabecera), o el
+        perfil `nombre` si `archivo` es "sqlite:<ruta>". Los avisos van a
+        `salida`, que pasa a ser el `mostrar` de la partida cargada.
+        """
+        try:
+            data = leer_guardado(archivo, nombre)
+            if data is None:
+                return None
+            juego_cargado = Juego.from_dict(data, salida=salida)
+            if archivo.startswith(PREFIJO_SQLITE):
+                # Los guardados siguientes vuelven al mismo almacén
+                juego_cargado.archivo_guardado = archivo
+            juego_cargado.mostrar("Progreso cargado exitosamente.")
+            try:
+                nuevas = juego_cargado._sincronizar_habilidades()
+                if nuevas and juego_cargado.eventos:
+                    for hab in nuevas:
+                        juego_cargado.eventos.emitir(Evento(TipoEvento.NIVEL, 'habilidad_al_cargar',
+                                                            juego_cargado.jugador.nombre, None, None, hab))
+            except Exception:
+                pass
+            return juego_cargado
+        except (ValueError, struct.error, IOError, sqlite3.Error) as e:
+            salida(f"No se pudo cargar el progreso guardado. Error: {e}")
+            return None
+
+    def verificar_logros(self):
+        if self.jugador.nivel >= 5 and "Maestro del Tiempo" not in self.logros:
+            self.logros.append("Maestro del Tiempo")
+            if self.eventos:
+                self.eventos.emitir(Evento(TipoEvento.NIVEL, 'logro', self.jugador.nombre, None, None, "Maestro del Tiempo"))
+
+    # --- Flujo interactivo ---
+    # Las partes que piden datos al jugador son generadores: cada `yield`
+    # entrega el texto de la pregunta y recibe la respuesta. `ejecutar` las
+    # conduce con input(); un servidor puede conducirlas con E/S asíncrona.
+    def ejecutar(self, flujo):
+        """Conduce `flujo` respondiendo cada pregunta con input(). Retorna su resultado."""
+        try:
+            pregunta = next(flujo)
+            while True:
+                try:
+                    respuesta = input(pregunta)
+                except Exception as e:
+                    # El error se lanza dentro del flujo, donde estaba el input() original
+                    pregunta = flujo.throw(e)
+                else:
+                    pregunta = flujo.send(respuesta)
+        except StopIteration as fin:
+            return fin.value
+
+    def generar_dropeo(self, enemigos):
+        return self.ejecutar(self.flujo_dropeo(enemigos))
+
+    def batalla(self):
+        return self.ejecutar(self.flujo_batalla())
+
+    def evento_aleatorio(self):
+        return self.ejecutar(self.flujo_evento_aleatorio())
+
+    def iniciar(self):
+        resultado = self.ejecutar(self.flujo_iniciar())
+        if self.autoguardado is not None:
+            self.autoguardado.esperar()
+            self.avisar_error_guardado()
+        return resultado
+
+    def flujo_dropeo(self, enemigos, combate=None):
+        """
+        Botín tras la batalla según las tablas de BOTIN: pociones y equipo.
+        Con `combate`, lo tirado queda en combate.botin y se quita al
+        entregarlo: una partida guardada en la pregunta de equipar se
+        reanuda con lo que faltaba, sin volver a tirar.
+        """
+        eventos = self.eventos
+        nombre = self.jugador.nombre
+        botin = combate.botin if combate is not None else None
+        if botin is None:
+            botin = BOTIN.botin(enemigos, self.rng)
+            if combate is not None:
+                combate.botin = botin
+            if not botin and eventos:
+                eventos.emitir(Evento(TipoEvento.DROP, 'sin_drop', nombre, None, 0))
+        while botin:
+            tipo_drop, dato = botin[0]
+            if tipo_drop == 'pocion':
+                del botin[0]
+                self.jugador.inventario.agregar(dato)
+                if eventos:
+                    eventos.emitir(Evento(TipoEvento.DROP, 'drop_pocion', nombre, None, 1, dato))
+                continue
+            objeto = {"tipo": tipo_drop, **dato}
+            if eventos:
+                eventos.emitir(Evento(TipoEvento.DROP, f'drop_{tipo_drop}', nombre, None, 1, objeto))
+            # pregunta si equipar
+            opcion = (yield "¿Deseas equiparla? (s/n): ").lower()
+            del botin[0]
+            if opcion == 's':
+                if eventos:
+                    eventos.emitir(self.jugador.equipar(objeto))
+                else:
+                    # Sin suscriptores no hace falta el Evento que retorna equipar()
+                    self.jugador.equipo[tipo_drop] = objeto
+            else:
+                self.jugador.inventario.guardar(objeto)
+
+    def _sincronizar_habilidades(self):
+        """
+        Otorga al jugador todas las habilidades en 'habilidades_disponibles'
+        cuyo requisito de nivel ya fue alcanzado y que aún no tenga.
+        Retorna la lista de habilidades nuevas añadidas.
+        """
+        nuevas = []
+        for nivel_req, habilidad in sorted(self.habilidades_disponibles.items()):
+            if self.jugador.nivel >= nivel_req and habilidad not in self.jugador.habilidades:
+                self.jugador.habilidades.append(habilidad)
+                nuevas.append(habilidad)
+        return nuevas
+
+    def to_dict(self):
+        return {
+            'jugador': self.jugador.to_dict(),
+            'nivel_actual': self.nivel_actual,
+            'habilidades_disponibles': dict(self.habilidades_disponibles),
+            'logros': list(self.logros),
+            'archivo_guardado': self.archivo_guardado,
+            'semilla': self.semilla,
+            'combate': self.combate.to_dict() if self.combate else None,
+        }
+
+    @staticmethod
+    def from_dict(d, consola=True, salida=print):
+        jugador_data = d.get('jugador')
+        jugador = Personaje.from_dict(jugador_data) if jugador_data else None
+        juego = Juego(jugador=jugador, semilla=d.get('semilla'), consola=consola, salida=salida)
+        juego.nivel_actual = d.get('nivel_actual', juego.nivel_actual)
+        # JSON convierte las claves (nivel requerido) en texto
+        juego.habilidades_disponibles = {int(k): v for k, v in d.get('habilidades_disponibles', juego.habilidades_disponibles).items()}
+        juego.logros = d.get('logros', [])
+        juego.archivo_guardado = d.get('archivo_guardado', juego.archivo_guardado)
+        if d.get('combate'):
+            juego.combate = EstadoCombate.from_dict(d['combate'])
+            juego.combate.jugador = juego.jugador
+        return juego
+
+    def memoria(self):
+        """
+        Bytes aproximados de la partida por componente (tamano_estructural) y
+        su 'total'. Cada objeto cuenta en un solo componente; no se cuenta lo
+        que puede compartirse entre partidas (autoguardado, perfil, encuentros).
+        """
+        j = self.jugador
+        vistos = {id(SIN_ESTADOS), id(self.autoguardado), id(self.perfil), id(self.encuentros)}
+        inventario = j.inventario
+        memoria = {
+            'rng': tamano_estructural(self.rng, vistos),
+            'objetos': sum(tamano_estructural(t, vistos) for t in (inventario.objetos, inventario.orden, inventario.por_ranura)),
+            'inventario': tamano_estructural(inventario, vistos),
+            'equipo': tamano_estructural(j.equipo, vistos),
+            'estados': tamano_estructural(j.estados, vistos),
+            'buffs': tamano_estructural(j.buffs, vistos),
+            'logros': tamano_estructural(self.logros, vistos),
+        }
+        # El combate antes que el jugador (al que referencia) para que su rng cuente aquí
+        vistos.add(id(j))
+        memoria['combate'] = tamano_estructural(self.combate, vistos)
+        vistos.discard(id(j))
+        memoria['jugador'] = tamano_estructural(j, vistos)
+        memoria['ia'] = tamano_estructural(self.asesor, vistos) + tamano_estructural(self.ia_jefe, vistos)
+        memoria['partida'] = tamano_estructural(self, vistos)
+        memoria['total'] = sum(memoria.values())
+        return memoria
+
+    def compactar(self):
+        """
+        Reduce la memoria sin cambiar la partida: limpia los heaps de estados
+        y suelta la última instantánea de combate (solo servía para compartir
+        tuplas con la siguiente). Retorna los bytes liberados.
+        """
+        antes = self.memoria()['total']
+        combatientes = [self.jugador]
+        if self.combate is not None:
+            combatientes += self.combate.enemigos
+            self.combate._ultima = None
+        for c in combatientes:
+            if c.estados is not SIN_ESTADOS:
+                c.estados.compactar()
+        return antes - self.memoria()['total']
+
+    def atacar_enemigo(self, enemigo):
+        """
+        Ataque básico del jugador (acción [A]) sobre `enemigo`.
+        Aplica fallo, bonus de arma y crítico. Retorna el Evento resultante.
+        """
+        # chequeo de fallo del héroe
+        rng = self.jugador.rng
+        if rng.random() < HERO_MISS_CHANCE:
+            return Evento(TipoEvento.FALLO, 'fallo_ataque', self.jugador.nombre, enemigo.nombre)
+        # calcular daño con arma y crítico
+        arma = self.jugador.equipo.get('arma')
+        bonus_arma = arma.get('ataque', 0) if arma and isinstance(arma, dict) else 0
+        danio = max(0, (self.jugador.ataque + bonus_arma) - enemigo.defensa // 2)
+        tipo = TipoEvento.ATAQUE
+        if rng.random() < CRIT_CHANCE:
+            danio = int(danio * CRIT_MULT)
+            tipo = TipoEvento.CRITICO
+        enemigo.vida -= danio
+        return Evento(tipo, 'ataque_jugador', self.jugador.nombre, enemigo.nombre, danio, enemigo.vida <= 0)
+
+    def turno_enemigos(self, enemigos, defendiendo=False, silencioso=False, perfil=None):
+        """
+        Ejecuta el turno de los enemigos vivos (estados y acción) y actualiza
+        los buffs del jugador al final. Los eventos se emiten al bus salvo que
+        sea `silencioso` o no tenga suscriptores. Con `perfil` (un Perfilador)
+        se registra la duración de cada fase.
+        """
+        eventos = self.eventos
+        silencioso = silencioso or not eventos
+        defensa_actual_jugador = self.jugador.defensa * 2 if defendiendo else self.jugador.defensa
+
+        for i, enemigo in enumerate(enemigos):
+            if enemigo.vida > 0 and self.jugador.vida > 0:
+                pre_stun_e = 'stun' in enemigo.estados
+                if perfil is not None:
+                    inicio = time.perf_counter()
+                for ev in enemigo.procesar_estados(silencioso):
+                    eventos.emitir(ev)
+                if perfil is not None:
+                    perfil.registrar('estados', time.perf_counter() - inicio)
+                if pre_stun_e:
+                    if not silencioso:
+                        eventos.emitir(Evento(TipoEvento.ESTADO, 'enemigo_aturdido', enemigo.nombre))
+                    continue
+                if perfil is not None:
+                    inicio = time.perf_counter()
+                if self.ia_jefe is not None and enemigo.tipo == 'Jefe':
+                    opcion = self.ia_jefe.elegir_jefe(self, enemigos, i, defendiendo)
+                    resultado = enemigo.accion_jefe(opcion, self.jugador, defensa_actual_jugador)
+                else:
+                    resultado = enemigo.accion(self.jugador, defensa_actual_jugador)
+                if perfil is not None:
+                    perfil.registrar('accion_enemigo', time.perf_counter() - inicio)
+                if not silencioso:
+                    eventos.emitir(resultado)
+
+        # Actualizar duraciones de buffs del jugador (se decrementan después del turno enemigo)
+        if perfil is not None:
+            inicio = time.perf_counter()
+        for ev in self.jugador.actualizar_buffs(silencioso):
+            eventos.emitir(ev)
+        if perfil is not None:
+            perfil.registrar('buffs', time.perf_counter() - inicio)
+
+    def _accion_jugador(self, medir, inicio_decision, fase, funcion, *args, **kwargs):
+        """Ejecuta la acción elegida; en un turno medido registra la decisión y la acción como `fase`."""
+        if not medir:
+            return funcion(*args, **kwargs)
+        perfil = self.perfil
+        inicio = time.perf_counter()
+        perfil.registrar('decision', inicio - inicio_decision)
+        resultado = funcion(*args, **kwargs)
+        perfil.registrar(fase, time.perf_counter() - inicio)
+        return resultado
+
+    def simular_batalla(self, politica, max_turnos=500):
+        """
+        Versión sin interfaz de `batalla`: mismas reglas, sin input() ni eventos.
+        `politica(jugador, enemigos_vivos)` decide la acción del jugador y retorna
+        una tupla: ('A', indice), ('H', habilidad, indice), ('D',) o ('O', objeto).
+        Retorna (victoria, turnos, vida_restante).
+        """
+        jugador = self.jugador
+        rng = self.rng
+        enemigos_iniciales = self.generar_oleada(rng)
+        combate = EstadoCombate(enemigos_iniciales, rng, jugador)
+        turnos = 0
+
+        while turnos < max_turnos and not combate.terminada():
+            turnos += 1
+            self.simular_turno(combate, politica)
+
+        victoria = jugador.vida > 0 and not any(e.vida > 0 for e in enemigos_iniciales)
+        FabricaEnemigos.reciclar(enemigos_iniciales)
+        return victoria, turnos, max(0, jugador.vida)
+
+    def generar_oleada(self, rng):
+        """Enemigos de una batalla nueva, con self.encuentros si hay uno."""
+        jugador = self.jugador
+        if self.encuentros is not None:
+            return self.encuentros.oleada(jugador.nivel, jugador.elemento, rng)
+        return [FabricaEnemigos.crear_enemigo(jugador.nivel, jugador.elemento, rng) for _ in range(rng.randint(2, 4))]
+
+    def simular_campana(self, politica, batallas=10, max_turnos=500):
+        """
+        Encadena hasta `batallas` batallas sin interfaz con la XP, las subidas
+        de nivel y el descanso de flujo_iniciar (sin botín, eventos ni talentos).
+        Retorna (batallas ganadas, nivel final).
+        """
+        jugador = self.jugador
+        try:
+            for indice in range(batallas):
+                rng = self.rng.derivar('batalla', indice + 1)
+                jugador.rng = rng
+                enemigos = self.generar_oleada(rng)
+                combate = EstadoCombate(enemigos, rng, jugador)
+                turnos = 0
+                while turnos < max_turnos and not combate.terminada():
+                    turnos += 1
+                    self.simular_turno(combate, politica)
+                # Agotar los turnos cuenta como derrota
+                victoria = jugador.vida > 0 and combate.terminada()
+                xp_ganado = sum(e.nivel * 15 for e in enemigos)
+                FabricaEnemigos.reciclar(enemigos)
+                if not victoria:
+                    return indice, jugador.nivel
+                jugador.xp += xp_ganado
+                jugador.subir_nivel()
+                self._sincronizar_habilidades()
+                jugador.restaurar_vida(int(jugador.max_vida * 0.25))
+                jugador.mana = min(jugador.max_mana, jugador.mana + 20)
+            return batallas, jugador.nivel
+        finally:
+            jugador.rng = self.rng
+
+    def simular_turno(self, combate, politica):
+        """
+        Un turno sin interfaz de `combate` (del jugador de esta partida):
+        estados del jugador, la acción que elija `politica` y turno enemigo.
+        """
+        jugador = self.jugador
+        pre_stun = 'stun' in jugador.estados
+        jugador.procesar_estados(silencioso=True)
+        accion = None
+        if not pre_stun:
+            enemigos_vivos = [e for e in combate.enemigos if e.vida > 0]
+            if enemigos_vivos:
+                if isinstance(politica, BuscadorMCTS):
+                    accion = politica.elegir(self, combate)
+                else:
+                    accion = politica(jugador, enemigos_vivos)
+        self.simular_accion(combate, accion)
+
+    def simular_accion(self, combate, accion):
+        """Resto de un turno simulado tras los estados del jugador: `accion` (None si no actúa) y turno enemigo."""
+        jugador = self.jugador
+        defendiendo = False
+        if accion is not None:
+            tipo = accion[0]
+            if tipo == "A":
+                self.atacar_enemigo([e for e in combate.enemigos if e.vida > 0][accion[1]])
+            elif tipo == "H":
+                jugador.usar_habilidad(accion[1], combate.enemigos, target_index=accion[2] if len(accion) > 2 else None)
+            elif tipo == "D":
+                defendiendo = True
+            elif tipo == "O":
+                jugador.usar_objeto(accion[1])
+
+        self.turno_enemigos(combate.enemigos, defendiendo, silencioso=True)
+
+    # Pregunta de acción del turno del jugador (punto de reanudación de una batalla)
+    PREGUNTA_ACCION = "\nAcción [A]tacar, [H]abilidad, [D]efensa, [O]bjeto, [G]uardar, [I]A: "
+
+    def flujo_batalla(self):
+        """
+        Batalla del nivel actual. Si la partida se cargó con una batalla en
+        curso (self.combate), la reanuda en la acción del turno del jugador,
+        con los estados de ese turno ya procesados.
+        """
+        eventos = self.eventos
+        reanudar = self.combate is not None
+        if reanudar:
+            rng = self.combate.rng
+            enemigos_iniciales = self.combate.enemigos
+        else:
+            if eventos:
+                j = self.jugador
+                eventos.emitir(Evento(TipoEvento.BATALLA, 'inicio_batalla', j.nombre, None, self.nivel_actual,
+                                      (j.nivel, j.vida, j.max_vida, j.mana, j.max_mana)))
+
+            # Flujo propio de esta batalla: depende solo de la semilla y del nivel
+            rng = self.rng.derivar('batalla', self.nivel_actual)
+            enemigos_iniciales = self.generar_oleada(rng)
+            self.combate = EstadoCombate(enemigos_iniciales, rng, self.jugador)
+        self.jugador.rng = rng
+        enemigos = [e for e in enemigos_iniciales if e.vida > 0]
+        perfil = self.perfil
+
+        while any(e.vida > 0 for e in enemigos) and self.jugador.vida > 0:
+            medir = perfil is not None and perfil.iniciar_turno()
+            if medir:
+                inicio_turno = time.perf_counter()
+            # --- Turno del jugador ---
+            if reanudar:
+                reanudar = False
+                pre_stun = False
+            else:
+                if eventos:
+                    eventos.emitir(Evento(TipoEvento.TURNO, 'turno_jugador', self.jugador.nombre, None, self.jugador.vida, self.jugador.mana))
+                # Procesar estados del jugador al inicio del turno
+                pre_stun = 'stun' in self.jugador.estados
+                if medir:
+                    inicio = time.perf_counter()
+                for ev in self.jugador.procesar_estados(silencioso=not eventos):
+                    eventos.emitir(ev)
+                if medir:
+                    perfil.registrar('estados', time.perf_counter() - inicio)
+            enemigos_vivos = [e for e in enemigos if e.vida > 0]
+            if eventos:
+                for i, e in enumerate(enemigos_vivos):
+                    eventos.emitir(Evento(TipoEvento.TURNO, 'enemigo_vivo', e.nombre, None, i + 1, e.vida))
+            
+            accion_valida = False
+            defendiendo = False
+            # Si estaba aturdido antes de procesar estados, pierde el turno
+            if pre_stun:
+                if eventos:
+                    eventos.emitir(Evento(TipoEvento.ESTADO, 'jugador_aturdido', self.jugador.nombre))
+            else:
+                inicio_decision = time.perf_counter() if medir else 0.0
+                while not accion_valida:
+                    # Un autoguardado que falló se avisa antes de la siguiente acción
+                    if self.autoguardado is not None:
+                        self.avisar_error_guardado()
+                    accion = (yield self.PREGUNTA_ACCION).upper()
+                    if accion not in ["A", "H", "D", "O", "G", "I"]:
+                        self.mostrar("Acción no válida. Intenta de nuevo.")
+                        continue
+
+                    accion_valida = True # Asumimos que la acción será válida
+
+                    if accion == "G":
+                        # El guardado se escribe en segundo plano: el turno no espera al disco
+                        # (si falla, se avisa en la siguiente pregunta)
+                        if self.autoguardar():
+                            self.mostrar("Guardando...")
+                        else:
+                            self.mostrar("Esta partida no tiene destino de guardado.")
+                        accion_valida = False # Permitir otra acción después de guardar
+                        continue
+                    if accion == "I":
+                        # El asesor busca sobre una copia de la batalla: la partida no cambia
+                        if self.asesor is None:
+                            self.asesor = BuscadorMCTS()
+                        sugerida = self.asesor.elegir(self)
+                        self.mostrar(f"Sugerencia de la IA: {describir_accion(sugerida, enemigos_vivos)} "
+                                     f"({self.asesor.estadisticas['iteraciones']} simulaciones)")
+                        accion_valida = False
+                        continue
                     if accion == "H":
                         if not self.jugador.habilidades:
-                            print("No tienes habilidades disponibles.")
+                            self.mostrar("No tienes habilidades disponibles.")
                             accion_valida = False
                             continue
-                        print("Habilidades disponibles:")
+                        self.mostrar("Habilidades disponibles:")
                         for i, habilidad in enumerate(self.jugador.habilidades):
-                            print(f"{i+1}. {habilidad}")
+                            self.mostrar(f"{i+1}. {habilidad}")
                         try:
-                            eleccion = int(input("Elige una habilidad (0 para cancelar): "))
+                            eleccion = int((yield "Elige una habilidad (0 para cancelar): "))
                         except ValueError:
-                            print("Entrada inválida. Introduce un número.")
+                            self.mostrar("Entrada inválida. Introduce un número.")
                             accion_valida = False
                             continue
                         if eleccion == 0:
@@ -715,77 +3326,79 @@ class Juego:
                         if 1 <= eleccion <= len(self.jugador.habilidades):
                             hab_sel = self.jugador.habilidades[eleccion - 1]
                             # Si la habilidad necesita objetivo, pedirlo aquí
-                            if hab_sel == 'Rayo de Energía Pura':
+                            if hab_sel in HABILIDADES and HABILIDADES[hab_sel].objetivo == OBJETIVO_UNO:
                                 if not enemigos_vivos:
-                                    print("No hay enemigos vivos para esa habilidad.")
+                                    self.mostrar("No hay enemigos vivos para esa habilidad.")
                                     accion_valida = False
                                     continue
-                                print("Elige un enemigo para apuntar con el rayo:")
+                                self.mostrar("Elige un enemigo para apuntar con el rayo:")
                                 for i, e in enumerate(enemigos_vivos):
-                                    print(f"{i+1}. {e.nombre} - {e.vida} HP")
+                                    self.mostrar(f"{i+1}. {e.nombre} - {e.vida} HP")
                                 try:
-                                    idx = int(input("Número de enemigo (0 para cancelar): "))
+                                    idx = int((yield "Número de enemigo (0 para cancelar): "))
                                 except ValueError:
-                                    print("Entrada inválida. Introduce un número.")
+                                    self.mostrar("Entrada inválida. Introduce un número.")
                                     accion_valida = False
                                     continue
                                 if idx == 0:
                                     accion_valida = False
                                     continue
                                 if not (1 <= idx <= len(enemigos_vivos)):
-                                    print("Selección inválida.")
+                                    self.mostrar("Selección inválida.")
                                     accion_valida = False
                                     continue
-                                resultado = self.jugador.usar_habilidad(hab_sel, enemigos, target_index=idx-1)
-                                print(resultado)
+                                eventos.emitir(self._accion_jugador(medir, inicio_decision, 'habilidad', self.jugador.usar_habilidad,
+                                                                    hab_sel, enemigos, target_index=idx-1))
                             else:
-                                resultado = self.jugador.usar_habilidad(hab_sel, enemigos)
-                                print(resultado)
+                                eventos.emitir(self._accion_jugador(medir, inicio_decision, 'habilidad', self.jugador.usar_habilidad,
+                                                                    hab_sel, enemigos))
                         else:
-                            print("Selección inválida.")
+                            self.mostrar("Selección inválida.")
                             accion_valida = False
                     elif accion == "D":
-                        print("Te preparas para defenderte. Tu defensa se duplicará para el siguiente ataque.")
+                        if medir:
+                            perfil.registrar('decision', time.perf_counter() - inicio_decision)
+                        if eventos:
+                            eventos.emitir(Evento(TipoEvento.BUFF, 'defensa', self.jugador.nombre))
                         defendiendo = True
                     elif accion == "O":
-                        if not self.jugador.inventario or all(v == 0 for v in self.jugador.inventario.values()):
-                            print("No tienes objetos disponibles.")
+                        if not self.jugador.inventario.hay_consumibles():
+                            self.mostrar("No tienes objetos disponibles.")
                             accion_valida = False
                             continue
-                        items_disponibles = [item for item, count in self.jugador.inventario.items() if count > 0]
-                        print("Objetos disponibles:")
-                        for i, item in enumerate(items_disponibles):
-                            print(f"{i+1}. {item} ({self.jugador.inventario[item]})")
+                        items_disponibles = self.jugador.inventario.disponibles()
+                        self.mostrar("Objetos disponibles:")
+                        for i, (item, cantidad) in enumerate(items_disponibles):
+                            self.mostrar(f"{i+1}. {item} ({cantidad})")
                         try:
-                            eleccion = int(input("Elige un objeto (0 para cancelar): "))
+                            eleccion = int((yield "Elige un objeto (0 para cancelar): "))
                         except ValueError:
-                            print("Entrada inválida. Introduce un número.")
+                            self.mostrar("Entrada inválida. Introduce un número.")
                             accion_valida = False
                             continue
                         if eleccion == 0:
                             accion_valida = False
                             continue
                         if 1 <= eleccion <= len(items_disponibles):
-                            objeto_elegido = items_disponibles[eleccion - 1]
-                            resultado = self.jugador.usar_objeto(objeto_elegido)
-                            print(resultado)
+                            objeto_elegido = items_disponibles[eleccion - 1][0]
+                            eventos.emitir(self._accion_jugador(medir, inicio_decision, 'objeto', self.jugador.usar_objeto, objeto_elegido))
                         else:
-                            print("Selección inválida.")
+                            self.mostrar("Selección inválida.")
                             accion_valida = False
                             continue
                     elif accion == "A":
                         enemigos_vivos_ataque = [e for e in enemigos if e.vida > 0]
                         if not enemigos_vivos_ataque:
-                            print("No hay enemigos vivos para atacar.")
+                            self.mostrar("No hay enemigos vivos para atacar.")
                             accion_valida = False
                             continue
-                        print("Elige enemigo a atacar:")
+                        self.mostrar("Elige enemigo a atacar:")
                         for i, e in enumerate(enemigos_vivos_ataque):
-                            print(f"{i+1}. {e.nombre} - {e.vida} HP")
+                            self.mostrar(f"{i+1}. {e.nombre} - {e.vida} HP")
                         try:
-                            idx = int(input("Número de enemigo (0 para cancelar): "))
+                            idx = int((yield "Número de enemigo (0 para cancelar): "))
                         except ValueError:
-                            print("Entrada inválida. Introduce un número.")
+                            self.mostrar("Entrada inválida. Introduce un número.")
                             accion_valida = False
                             continue
                         if idx == 0:
@@ -793,163 +3406,2383 @@ class Juego:
                             continue
                         if 1 <= idx <= len(enemigos_vivos_ataque):
                             enemigo = enemigos_vivos_ataque[idx - 1]
-                            # chequeo de fallo del héroe
-                            if random.random() < HERO_MISS_CHANCE:
-                                print("¡Fallaste tu ataque!")
-                            else:
-                                # calcular daño con arma y crítico
-                                arma = self.jugador.equipo.get('arma')
-                                bonus_arma = arma.get('ataque', 0) if arma and isinstance(arma, dict) else 0
-                                danio = max(0, (self.jugador.ataque + bonus_arma) - enemigo.defensa // 2)
-                                if random.random() < CRIT_CHANCE:
-                                    danio = int(danio * CRIT_MULT)
-                                    print("¡Golpe crítico!")
-                                enemigo.vida -= danio
-                                print(f"¡Atacaste a {enemigo.nombre} por {danio} de daño!")
-                                if enemigo.vida <= 0:
-                                    print(f"¡{enemigo.nombre} ha sido derrotado!")
+                            eventos.emitir(self._accion_jugador(medir, inicio_decision, 'ataque', self.atacar_enemigo, enemigo))
                         else:
-                            print("Selección inválida.")
+                            self.mostrar("Selección inválida.")
                             accion_valida = False
             
             # --- Turno de los enemigos ---
             enemigos = [e for e in enemigos if e.vida > 0] # Actualizar lista de enemigos vivos
-            if any(e.vida > 0 for e in enemigos):
-                print("\n" + "-"*10 + " TURNO ENEMIGO " + "-"*10)
-                
-            defensa_actual_jugador = self.jugador.defensa * 2 if defendiendo else self.jugador.defensa
-            
-            for enemigo in enemigos:
-                if enemigo.vida > 0 and self.jugador.vida > 0:
-                    pre_stun_e = 'stun' in enemigo.estados
-                    msgs = enemigo.procesar_estados()
-                    for m in msgs:
-                        print(m)
-                    if pre_stun_e:
-                        print(f"{enemigo.nombre} está aturdido y pierde su turno.")
-                        continue
-                    resultado = enemigo.accion(self.jugador, defensa_actual_jugador)
-                    print(resultado)
-                    
-            # Actualizar duraciones de buffs del jugador (se decrementan después del turno enemigo)
-            msg_buff = self.jugador.actualizar_buffs()
-            if msg_buff:
-                print(msg_buff)
-                    
+            if eventos and any(e.vida > 0 for e in enemigos):
+                eventos.emitir(Evento(TipoEvento.TURNO, 'turno_enemigo'))
+
+            self.turno_enemigos(enemigos, defendiendo, perfil=perfil if medir else None)
+            if medir:
+                perfil.registrar('turno', time.perf_counter() - inicio_turno)
+
             # Comprobar si el jugador fue derrotado
             if self.jugador.vida <= 0:
-                print("\n¡Has sido derrotado!")
+                if eventos:
+                    eventos.emitir(Evento(TipoEvento.BATALLA, 'derrota', self.jugador.nombre))
+                FabricaEnemigos.reciclar(enemigos_iniciales)
+                self.combate = None
+                self.jugador.rng = self.rng
+                return False
+
+        self.jugador.rng = self.rng
+        
+        # --- Fin de la batalla ---
+        if self.jugador.vida > 0:
+            # Posible dropeo tras la batalla (su tiempo incluye la respuesta si pregunta)
+            inicio = time.perf_counter()
+            try:
+                yield from self.flujo_dropeo(enemigos_iniciales, self.combate)
+            except Exception:
+                pass
+            if perfil is not None:
+                perfil.registrar('dropeo', time.perf_counter() - inicio)
+            xp_ganado = sum(e.nivel * 15 for e in enemigos_iniciales)
+            FabricaEnemigos.reciclar(enemigos_iniciales)
+            self.combate = None
+            self.jugador.xp += xp_ganado
+            if eventos:
+                eventos.emitir(Evento(TipoEvento.BATALLA, 'victoria', self.jugador.nombre, None, xp_ganado))
+            
+            # Verificar subida de nivel
+            while self.jugador.xp >= self.jugador.nivel * XP_POR_NIVEL_BASE:
+                self.jugador.subir_nivel(eventos)
+                nuevas = self._sincronizar_habilidades()
+                if eventos:
+                    for hab in nuevas:
+                        eventos.emitir(Evento(TipoEvento.NIVEL, 'habilidad_aprendida', self.jugador.nombre, None, None, hab))
+            self.verificar_logros()
+            return True
+        self.combate = None
+        return False
+
+    def flujo_evento_aleatorio(self):
+        eventos = self.eventos
+        nombre = self.jugador.nombre
+        evento = self.rng.choice(["tesoro", "trampa", "mercader", "nada"])
+        if evento == "tesoro":
+            recompensa = self.rng.randint(20, 50)
+            self.jugador.restaurar_vida(recompensa)
+            if eventos:
+                eventos.emitir(Evento(TipoEvento.EVENTO, 'manantial', nombre, None, recompensa))
+        elif evento == "trampa":
+            dano = self.rng.randint(10, 30)
+            self.jugador.vida -= dano
+            if eventos:
+                eventos.emitir(Evento(TipoEvento.EVENTO, 'trampa', nombre, None, dano))
+                if self.jugador.vida <= 0:
+                    eventos.emitir(Evento(TipoEvento.EVENTO, 'trampa_mortal', nombre))
+        elif evento == "mercader":
+            if eventos:
+                eventos.emitir(Evento(TipoEvento.EVENTO, 'mercader', nombre))
+            costo_pocion = self.jugador.nivel * 10
+            opcion = (yield f"¿Quieres comprar una 'Poción de Vida' por {costo_pocion} XP? (s/n): ").lower()
+            if opcion == 's':
+                if self.jugador.xp >= costo_pocion:
+                    self.jugador.xp -= costo_pocion
+                    pociones = self.jugador.inventario.agregar("Poción de Vida")
+                    if eventos:
+                        eventos.emitir(Evento(TipoEvento.EVENTO, 'compra_pocion', nombre, None, pociones))
+                elif eventos:
+                    eventos.emitir(Evento(TipoEvento.AVISO, 'sin_xp', nombre))
+        elif evento == "nada" and eventos:
+            eventos.emitir(Evento(TipoEvento.EVENTO, 'camino_tranquilo', nombre))
+    
+    def flujo_iniciar(self, bienvenida=True):
+        if bienvenida:
+            self.mostrar("Bienvenido a Chrono Tactics RPG")
+        total_niveles = 10
+        while self.nivel_actual <= total_niveles:
+            if not (yield from self.flujo_batalla()):
+                self.mostrar("\n--- FIN DEL JUEGO ---")
+                break
+
+            if self.nivel_actual == total_niveles:
+                self.autoguardar()
+                break
+
+            self.nivel_actual += 1
+            self.jugador.restaurar_vida(int(self.jugador.max_vida * 0.25)) # Recupera 25% de vida
+            self.jugador.mana = min(self.jugador.max_mana, self.jugador.mana + 20)
+            # Ya en el nivel siguiente: al cargar no se repite la batalla ganada (ni su XP)
+            self.autoguardar()
+            self.mostrar("\nDescansas y recuperas algo de vida y maná...")
+            # Permitir gastar puntos de talento entre niveles
+            while self.jugador.puntos_talento > 0:
+                self.mostrar(f"Tienes {self.jugador.puntos_talento} punto(s) de talento.")
+                self.mostrar("Habilidades pasivas disponibles:")
+                pasivas = self.jugador.habilidades_pasivas
+                keys = list(pasivas.keys())
+                for i, k in enumerate(keys):
+                    info = pasivas[k]
+                    estado = 'Aplicado' if info['aplicado'] else f"Costo {info['costo']}"
+                    self.mostrar(f"{i+1}. {k} - {info['desc']} ({estado})")
+                try:
+                    elegir = int((yield "Elige una para aplicar (0 para saltar): "))
+                except ValueError:
+                    self.mostrar("Entrada inválida.")
+                    break
+                if elegir == 0:
+                    break
+                if 1 <= elegir <= len(keys):
+                    self.mostrar(self.jugador.aplicar_pasiva(keys[elegir-1]))
+
+            if self.nivel_actual < total_niveles:
+                self.autoguardar()
+                yield from self.flujo_evento_aleatorio()
+                if self.jugador.vida <= 0:
+                    self.mostrar("\n--- FIN DEL JUEGO ---")
+                    break
+        
+        if self.jugador.vida > 0:
+            self.mostrar("\n¡Felicidades! ¡Has completado todos los niveles de Chrono Tactics!")
+            
+# --- SIMULACIÓN SIN INTERFAZ (Monte Carlo) ---
+# Las políticas son funciones de módulo para poder enviarlas a procesos hijos.
+
+def politica_ataque_basico(jugador, enemigos_vivos):
+    """Siempre ataca al primer enemigo vivo."""
+    return ("A", 0)
+
+def politica_aleatoria(jugador, enemigos_vivos):
+    """Elige uniformemente entre atacar, defender, habilidades y pociones."""
+    rng = jugador.rng
+    opciones = [("A", rng.randrange(len(enemigos_vivos))), ("D",)]
+    for hab in jugador.habilidades:
+        if HABILIDADES[hab].objetivo == OBJETIVO_UNO:
+            opciones.append(("H", hab, rng.randrange(len(enemigos_vivos))))
+        else:
+            opciones.append(("H", hab))
+    for objeto, _ in jugador.inventario.disponibles():
+        opciones.append(("O", objeto))
+    return rng.choice(opciones)
+
+def politica_codiciosa(jugador, enemigos_vivos):
+    """Cura si la vida es baja; si no, ataca al enemigo con menos vida."""
+    if jugador.vida < jugador.max_vida * 0.3 and jugador.inventario.cantidad("Poción de Vida") > 0:
+        return ("O", "Poción de Vida")
+    objetivo = min(range(len(enemigos_vivos)), key=lambda i: enemigos_vivos[i].vida)
+    return ("A", objetivo)
+
+def _simular_lote(args):
+    """
+    Trabajo de un proceso: simula las batallas [inicio, inicio + n) y retorna
+    conteos agregados. Cada batalla usa el flujo derivado de (semilla, índice),
+    así el resultado no depende de cómo se repartan los lotes.
+    """
+    inicio, n, politica, jugador_dict, max_turnos, semilla, encuentros = args
+    victorias = 0
+    turnos_hist = {}
+    vida_hist = {}
+    for indice in range(inicio, inicio + n):
+        jugador = Personaje.from_dict(jugador_dict)
+        juego = Juego(jugador=jugador, semilla=derivar_semilla(semilla, indice), consola=False)
+        if encuentros:
+            juego.encuentros = GENERADOR_ENCUENTROS
+        victoria, turnos, vida = juego.simular_batalla(politica, max_turnos)
+        if victoria:
+            victorias += 1
+            vida_hist[vida] = vida_hist.get(vida, 0) + 1
+        turnos_hist[turnos] = turnos_hist.get(turnos, 0) + 1
+    return victorias, turnos_hist, vida_hist
+
+def _resumen_histograma(hist):
+    total = sum(hist.values())
+    if not total:
+        return {'media': 0.0, 'min': 0, 'max': 0, 'histograma': {}}
+    media = sum(k * v for k, v in hist.items()) / total
+    return {'media': media, 'min': min(hist), 'max': max(hist), 'histograma': dict(sorted(hist.items()))}
+
+def simular_batallas(n, politica=politica_ataque_basico, jugador=None, procesos=None,
+                     tam_lote=2000, max_turnos=500, semilla=None, encuentros=False):
+    """
+    Simula `n` batallas independientes repartidas en un pool de procesos.
+    `jugador` es el Personaje de partida (se copia por batalla); por defecto
+    un héroe nuevo de nivel 1. Retorna tasas de victoria y distribuciones
+    de turnos por batalla y vida restante (en victorias). Con la misma
+    `semilla` el resultado es idéntico sea cual sea el número de procesos.
+    Con `encuentros` los enemigos salen de GENERADOR_ENCUENTROS.
+    """
+    import multiprocessing
+
+    jugador_dict = (jugador or Personaje("Simulado")).to_dict()
+    procesos = procesos or os.cpu_count() or 1
+    if semilla is None:
+        semilla = FlujoAleatorio().semilla
+    lotes = [(inicio, min(tam_lote, n - inicio), politica, jugador_dict, max_turnos, semilla, encuentros)
+             for inicio in range(0, n, tam_lote)]
+
+    inicio = time.perf_counter()
+    victorias = 0
+    turnos_hist = {}
+    vida_hist = {}
+    if procesos == 1:
+        resultados = map(_simular_lote, lotes)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(procesos)
+        resultados = pool.imap_unordered(_simular_lote, lotes)
+    try:
+        for v, th, vh in resultados:
+            victorias += v
+            for k, c in th.items():
+                turnos_hist[k] = turnos_hist.get(k, 0) + c
+            for k, c in vh.items():
+                vida_hist[k] = vida_hist.get(k, 0) + c
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    segundos = time.perf_counter() - inicio
+
+    return {
+        'batallas': n,
+        'victorias': victorias,
+        'tasa_victoria': victorias / n if n else 0.0,
+        'turnos': _resumen_histograma(turnos_hist),
+        'vida_restante': _resumen_histograma(vida_hist),
+        'procesos': procesos,
+        'semilla': semilla,
+        'segundos': segundos,
+        'batallas_por_segundo': n / segundos if segundos > 0 else 0.0,
+    }
+
+# --- IA DE COMBATE (MCTS) ---
+# UCT sobre las reglas reales: cada iteración restaura la instantánea de la
+# raíz, resiembra el flujo de la batalla (la búsqueda no conoce las tiradas
+# futuras de la partida), baja por el árbol eligiendo acciones con UCB1,
+# termina con una partida simulada y propaga su valor. Los nodos se guardan
+# en una tabla de transposición por EstadoCombate.clave() con desalojo LRU,
+# así que las posiciones repetidas (y las de la jugada anterior) conservan
+# sus estadísticas. Con procesos > 1 cada proceso busca con su propia tabla
+# y se suman las estadísticas de la raíz.
+
+def acciones_legales(jugador, enemigos_vivos):
+    """Acciones con efecto para el jugador, en el formato de las políticas."""
+    acciones = [("A", i) for i in range(len(enemigos_vivos))]
+    acciones.append(("D",))
+    for nombre in jugador.habilidades:
+        hab = HABILIDADES.get(nombre)
+        if hab is None or jugador.mana < hab.costo:
+            continue
+        if hab.objetivo == OBJETIVO_UNO:
+            acciones.extend(("H", nombre, i) for i in range(len(enemigos_vivos)))
+        else:
+            acciones.append(("H", nombre))
+    if jugador.inventario.cantidad("Poción de Vida") > 0 and jugador.vida < jugador.max_vida:
+        acciones.append(("O", "Poción de Vida"))
+    if jugador.inventario.cantidad("Poción de Mana") > 0 and jugador.mana < jugador.max_mana:
+        acciones.append(("O", "Poción de Mana"))
+    return acciones
+
+def describir_accion(accion, enemigos_vivos):
+    tipo = accion[0]
+    if tipo == "A":
+        return f"Atacar a {enemigos_vivos[accion[1]].nombre}"
+    if tipo == "H":
+        return f"Usar {accion[1]}" + (f" sobre {enemigos_vivos[accion[2]].nombre}" if len(accion) > 2 else "")
+    if tipo == "O":
+        return f"Usar {accion[1]}"
+    return "Defender"
+
+def valorar_combate(combate):
+    """
+    Valor en [0, 1] para el jugador: una victoria vale 0.6 más su vida
+    restante; una derrota o una batalla sin terminar, según el daño hecho.
+    """
+    jugador = combate.jugador
+    total = sum(e.vida_max for e in combate.enemigos)
+    restante = sum(e.vida for e in combate.enemigos if e.vida > 0)
+    progreso = 1.0 - restante / total if total else 1.0
+    if jugador.vida <= 0:
+        return 0.3 * progreso
+    vida = jugador.vida / jugador.max_vida
+    if restante == 0:
+        return 0.6 + 0.4 * vida
+    return 0.3 * progreso + 0.3 * vida
+
+class NodoMCTS:
+    __slots__ = ('visitas', 'hijos')
+
+    def __init__(self):
+        self.visitas = 0
+        self.hijos = {}     # acción -> [visitas, suma de valores]
+
+class BuscadorMCTS:
+    """
+    Elige acciones del jugador (elegir) y, si se asigna a Juego.ia_jefe, de
+    los jefes (elegir_jefe). Cada decisión dura `tiempo` segundos o, si se da,
+    `iteraciones` simulaciones (reproducible). Las simulaciones juegan con
+    `politica_simulacion` hasta `profundidad` turnos. Tras cada decisión,
+    `estadisticas` tiene iteraciones, simulaciones por segundo y aciertos
+    en la tabla de transposición.
+    """
+    def __init__(self, tiempo=0.2, iteraciones=None, exploracion=1.0, profundidad=40,
+                 max_nodos=200_000, procesos=1, politica_simulacion=politica_codiciosa, semilla=None):
+        self.tiempo = tiempo
+        self.iteraciones = iteraciones
+        self.exploracion = exploracion
+        self.profundidad = profundidad
+        self.max_nodos = max_nodos
+        self.procesos = procesos
+        self.politica_simulacion = politica_simulacion
+        self.semilla = semilla
+        self.tabla = OrderedDict()  # clave de posición -> NodoMCTS, de menos a más reciente
+        self.desalojos = 0
+        self.estadisticas = {}
+        self.total_iteraciones = 0
+        self.total_segundos = 0.0
+        self._semillas = random.Random(semilla)
+        self._pool = None
+
+    def parametros(self):
+        return {
+            'tiempo': self.tiempo, 'iteraciones': self.iteraciones, 'exploracion': self.exploracion,
+            'profundidad': self.profundidad, 'max_nodos': self.max_nodos,
+            'politica_simulacion': self.politica_simulacion,
+        }
+
+    def _presupuesto(self):
+        if self.iteraciones:
+            return range(self.iteraciones)
+        limite = time.perf_counter() + self.tiempo
+        return iter(lambda: time.perf_counter() < limite, False)
+
+    def _nodo(self, clave):
+        """Nodo de `clave` (creándolo si falta). Retorna (nodo, ya_existía)."""
+        tabla = self.tabla
+        nodo = tabla.get(clave)
+        if nodo is not None:
+            tabla.move_to_end(clave)
+            return nodo, True
+        nodo = tabla[clave] = NodoMCTS()
+        if len(tabla) > self.max_nodos:
+            tabla.popitem(last=False)
+            self.desalojos += 1
+        return nodo, False
+
+    def _seleccionar(self, nodo, acciones):
+        hijos = nodo.hijos
+        log_n = math.log(nodo.visitas + 1)
+        mejor = None
+        mejor_valor = -1.0
+        for accion in acciones:
+            estadistica = hijos.get(accion)
+            if estadistica is None:
+                return accion
+            n, suma = estadistica
+            valor = suma / n + self.exploracion * math.sqrt(log_n / n)
+            if valor > mejor_valor:
+                mejor, mejor_valor = accion, valor
+        return mejor
+
+    @staticmethod
+    def _hasta_decision(juego, combate):
+        """Procesa los estados del jugador (y los turnos que pierda aturdido). Retorna si la batalla sigue."""
+        jugador = juego.jugador
+        while not combate.terminada():
+            pre_stun = 'stun' in jugador.estados
+            jugador.procesar_estados(silencioso=True)
+            if not pre_stun:
+                return not combate.terminada()
+            juego.simular_accion(combate, None)
+        return False
+
+    def _simular(self, juego, combate, profundidad):
+        while profundidad < self.profundidad and not combate.terminada():
+            juego.simular_turno(combate, self.politica_simulacion)
+            profundidad += 1
+
+    def _buscar(self, juego, combate, semilla):
+        """UCT desde el punto de decisión actual. Retorna (estadísticas de la raíz, iteraciones, aciertos)."""
+        jugador = juego.jugador
+        rng = combate.rng
+        tiradas = random.Random(semilla)
+        raiz_instantanea = combate.instantanea()
+        raiz, _ = self._nodo(combate.clave())
+        iteraciones = aciertos = 0
+        # Dentro de la búsqueda los jefes juegan con sus probabilidades fijas
+        ia_jefe, juego.ia_jefe = juego.ia_jefe, None
+        try:
+            for _ in self._presupuesto():
+                iteraciones += 1
+                combate.restaurar(raiz_instantanea, rng=False)
+                rng.seed(tiradas.getrandbits(64))
+                nodo = raiz
+                camino = []
+                profundidad = 0
+                while True:
+                    accion = self._seleccionar(nodo, acciones_legales(jugador, [e for e in combate.enemigos if e.vida > 0]))
+                    camino.append((nodo, accion))
+                    juego.simular_accion(combate, accion)
+                    profundidad += 1
+                    if profundidad >= self.profundidad or not self._hasta_decision(juego, combate):
+                        break
+                    nodo, existia = self._nodo(combate.clave())
+                    if not existia:
+                        break
+                    aciertos += 1
+                self._simular(juego, combate, profundidad)
+                valor = valorar_combate(combate)
+                for nodo, accion in camino:
+                    nodo.visitas += 1
+                    estadistica = nodo.hijos.get(accion)
+                    if estadistica is None:
+                        nodo.hijos[accion] = [1, valor]
+                    else:
+                        estadistica[0] += 1
+                        estadistica[1] += valor
+        finally:
+            juego.ia_jefe = ia_jefe
+            combate.restaurar(raiz_instantanea)
+        return {accion: list(e) for accion, e in raiz.hijos.items()}, iteraciones, aciertos
+
+    def elegir(self, juego, combate=None):
+        """Acción recomendada para el jugador en su punto de decisión de `combate` (por defecto juego.combate)."""
+        combate = combate or juego.combate
+        inicio = time.perf_counter()
+        semilla = self._semillas.getrandbits(64)
+        if self.procesos > 1:
+            import multiprocessing
+            if self._pool is None:
+                self._pool = multiprocessing.Pool(self.procesos)
+            datos = juego.to_dict()
+            datos['combate'] = combate.to_dict()
+            parametros = self.parametros()
+            resultados = self._pool.map(_buscar_en_proceso, [(datos, derivar_semilla(semilla, i), parametros) for i in range(self.procesos)])
+            hijos = {}
+            iteraciones = aciertos = nodos = 0
+            for h, it, ac, nd in resultados:
+                iteraciones += it
+                aciertos += ac
+                nodos += nd
+                for accion, (n, suma) in h.items():
+                    total = hijos.setdefault(accion, [0, 0.0])
+                    total[0] += n
+                    total[1] += suma
+        else:
+            hijos, iteraciones, aciertos = self._buscar(juego, combate, semilla)
+            nodos = len(self.tabla)
+        segundos = time.perf_counter() - inicio
+        accion = max(hijos, key=lambda a: hijos[a][0])
+        n, suma = hijos[accion]
+        self.total_iteraciones += iteraciones
+        self.total_segundos += segundos
+        self.estadisticas = {
+            'iteraciones': iteraciones,
+            'segundos': segundos,
+            'simulaciones_por_segundo': iteraciones / segundos if segundos > 0 else 0.0,
+            'aciertos_tabla': aciertos,
+            'nodos': nodos,
+            'desalojos': self.desalojos,
+            'valor': suma / n,
+        }
+        return accion
+
+    def elegir_jefe(self, juego, enemigos, indice, defendiendo):
+        """
+        Acción del jefe enemigos[indice] en su fase actual: expectimax de un
+        nivel (muestreo de cada opción) contra un jugador que sigue
+        `politica_simulacion`. Retorna la opción de Enemigo.ACCIONES_JEFE.
+        """
+        jefe = enemigos[indice]
+        jugador = juego.jugador
+        opciones = Enemigo.ACCIONES_JEFE[jefe.fase_jefe()]
+        combate = EstadoCombate(list(enemigos), jugador.rng, jugador)
+        rng = combate.rng
+        defensa = jugador.defensa * 2 if defendiendo else jugador.defensa
+        tiradas = random.Random(self._semillas.getrandbits(64))
+        totales = {opcion: [0, 0.0] for opcion in opciones}
+        raiz = combate.instantanea()
+        ia_jefe, juego.ia_jefe = juego.ia_jefe, None
+        try:
+            for i, _ in enumerate(self._presupuesto()):
+                opcion = opciones[i % len(opciones)]
+                combate.restaurar(raiz, rng=False)
+                rng.seed(tiradas.getrandbits(64))
+                jefe.accion_jefe(opcion, jugador, defensa)
+                # Resto del turno enemigo y partidas simuladas desde el turno siguiente
+                juego.turno_enemigos(enemigos[indice + 1:], defendiendo, silencioso=True)
+                self._simular(juego, combate, 1)
+                totales[opcion][0] += 1
+                totales[opcion][1] += 1.0 - valorar_combate(combate)
+        finally:
+            juego.ia_jefe = ia_jefe
+            combate.restaurar(raiz)
+        return max(opciones, key=lambda o: totales[o][1] / max(1, totales[o][0]))
+
+    def cerrar(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+_BUSCADOR_PROCESO = None
+
+def _buscar_en_proceso(args):
+    """Trabajo de un proceso: busca desde la partida serializada con la tabla propia del proceso."""
+    global _BUSCADOR_PROCESO
+    datos, semilla, parametros = args
+    if _BUSCADOR_PROCESO is None:
+        _BUSCADOR_PROCESO = BuscadorMCTS(**parametros)
+    juego = Juego.from_dict(datos, consola=False)
+    juego.archivo_guardado = None
+    # Como en flujo_batalla: el héroe tira con el flujo de la batalla, que _buscar resiembra
+    juego.jugador.rng = juego.combate.rng
+    return _BUSCADOR_PROCESO._buscar(juego, juego.combate, semilla) + (len(_BUSCADOR_PROCESO.tabla),)
+
+def heroe_de_nivel(nivel, nombre="Simulado"):
+    """Personaje subido hasta `nivel` con las mejoras aleatorias fijadas por el nivel."""
+    jugador = Personaje(nombre, rng=random.Random(nivel))
+    while jugador.nivel < nivel:
+        jugador.xp = jugador.nivel * XP_POR_NIVEL_BASE
+        jugador.subir_nivel()
+    return jugador
+
+def comparar_politicas(n=100, nivel=3, semilla=0, politicas=None):
+    """
+    Juega las mismas `n` batallas (semillas derivadas de `semilla`) con cada
+    política y retorna tasa de victoria, vida restante y turnos medios. Los
+    BuscadorMCTS añaden sus simulaciones por segundo.
+    """
+    if politicas is None:
+        politicas = {
+            'aleatoria': politica_aleatoria,
+            'codiciosa': politica_codiciosa,
+            'mcts': BuscadorMCTS(iteraciones=300, semilla=semilla),
+        }
+    base = heroe_de_nivel(nivel).to_dict()
+    resultados = {}
+    for nombre, politica in politicas.items():
+        victorias = vida = turnos = 0
+        inicio = time.perf_counter()
+        for indice in range(n):
+            juego = Juego(Personaje.from_dict(base), semilla=derivar_semilla(semilla, indice), consola=False)
+            v, t, r = juego.simular_batalla(politica)
+            victorias += v
+            vida += r
+            turnos += t
+        resultado = {
+            'tasa_victoria': victorias / n if n else 0.0,
+            'vida_media': vida / n if n else 0.0,
+            'turnos_medios': turnos / n if n else 0.0,
+            'segundos': time.perf_counter() - inicio,
+        }
+        if isinstance(politica, BuscadorMCTS):
+            resultado['simulaciones_por_segundo'] = politica.total_iteraciones / politica.total_segundos if politica.total_segundos else 0.0
+            resultado['nodos'] = len(politica.tabla)
+            resultado['desalojos'] = politica.desalojos
+        resultados[nombre] = resultado
+    return resultados
+
+# --- PROBABILIDAD EXACTA DE VICTORIA ---
+# En combate toda tirada es una comparación `rng.random() < p`. Con
+# TiradasEnumeradas en lugar del rng, cada comparación se convierte en una
+# bifurcación (p, 1 - p) y un turno de simular_turno se repite una vez por
+# rama: las reglas son las reales, no una copia. La recursión memoriza la
+# distribución de resultados por posición canónica (EstadoCombate.clave()) y
+# resuelve los turnos que no cambian nada (todos fallan) dividiendo por
+# 1 - p(bucle). Cada posición guarda (P(victoria), E[vida final]). Si aparece otro ciclo, la política usa el rng de otra forma o
+# la posición genera demasiados estados, se estima por muestreo.
+
+class NoEnumerable(Exception):
+    """La batalla no se puede resolver de forma exacta (ciclo, política aleatoria, demasiados estados)."""
+
+class _Tirada:
+    __slots__ = ('tiradas',)
+
+    def __init__(self, tiradas):
+        self.tiradas = tiradas
+
+    def __lt__(self, p):
+        return self.tiradas._decidir(p)
+
+    def __gt__(self, p):
+        return not self.tiradas._decidir(p)
+
+class TiradasEnumeradas:
+    """
+    Sustituto del rng que recorre todas las ramas de un turno: random()
+    retorna una tirada simbólica cuya comparación con p sigue `camino` y
+    anota la probabilidad de la rama. Cualquier otro uso del rng no es enumerable.
+    """
+    def __init__(self):
+        self.camino = []    # resultado de cada comparación del turno en curso
+        self.probs = []
+        self.pos = 0
+        # Cada tirada se compara una sola vez nada más pedirla: basta un objeto
+        self._tirada = _Tirada(self)
+
+    def random(self):
+        return self._tirada
+
+    def _decidir(self, p):
+        i = self.pos
+        self.pos = i + 1
+        if i < len(self.camino):
+            resultado = self.camino[i]
+            self.probs[i] = p if resultado else 1.0 - p
+        else:
+            resultado = True
+            self.camino.append(True)
+            self.probs.append(p)
+        return resultado
+
+    def siguiente(self):
+        """Prepara la rama siguiente (odómetro binario). Retorna False si no quedan."""
+        del self.camino[self.pos:]
+        del self.probs[self.pos:]
+        camino = self.camino
+        while camino and not camino[-1]:
+            camino.pop()
+            self.probs.pop()
+        if not camino:
+            return False
+        camino[-1] = False
+        self.pos = 0
+        return True
+
+    def __getattr__(self, nombre):
+        raise NoEnumerable(f"la batalla usa rng.{nombre}")
+
+class CalculadoraVictoria:
+    """
+    Resultado exacto de una batalla bajo una política determinista:
+    probabilidad de victoria y vida final esperada del jugador. La caché
+    ((política, posición) -> resultado) se comparte entre consultas y tiene
+    como mucho `max_cache` entradas (LRU); una consulta que supere
+    `max_estados` posiciones nuevas se estima con `muestras` batallas.
+    """
+    def __init__(self, max_estados=50_000, max_cache=500_000, muestras=2000):
+        self.max_estados = max_estados
+        self.max_cache = max_cache
+        self.muestras = muestras
+        self.cache = OrderedDict()
+
+    def calcular(self, juego, politica=politica_codiciosa, combate=None):
+        """
+        Resultado de `combate` (por defecto juego.combate) desde el inicio
+        del próximo turno, como en simular_batalla. Retorna un dict con
+        'victoria', 'derrota', 'vida_esperada' (0 en derrota), 'exacto' y el coste.
+        """
+        combate = combate or juego.combate
+        inicio = time.perf_counter()
+        try:
+            (victoria, vida), estados = self._exacta(juego, politica, combate)
+            resultado = {'exacto': True, 'estados': estados}
+        except (NoEnumerable, RecursionError) as e:
+            (victoria, vida), n = self._muestreo(juego, politica, combate)
+            resultado = {'exacto': False, 'motivo': str(e) or type(e).__name__, 'muestras': n}
+        resultado.update({
+            'victoria': victoria,
+            'derrota': 1.0 - victoria,
+            'vida_esperada': vida,
+            'segundos': time.perf_counter() - inicio,
+        })
+        return resultado
+
+    def _exacta(self, juego, politica, combate):
+        jugador = juego.jugador
+        enemigos = combate.enemigos
+        rngs = (combate.rng, jugador.rng, [e.rng for e in enemigos])
+        tiradas = TiradasEnumeradas()
+        combate.rng = jugador.rng = tiradas
+        for e in enemigos:
+            e.rng = tiradas
+        origen = (jugador.instantanea_combate(), tuple(e.instantanea_combate() for e in enemigos))
+        pila = set()
+        nuevos = [0]
+
+        def restaurar(instantanea):
+            jugador.restaurar_combate(instantanea[0])
+            for enemigo, t in zip(enemigos, instantanea[1]):
+                enemigo.restaurar_combate(t)
+
+        def transiciones(instantanea):
+            """Posiciones tras un turno: clave -> [probabilidad, instantánea (None si terminó)]."""
+            sucesores = {}
+            camino, probs = tiradas.camino, tiradas.probs
+            camino.clear()
+            probs.clear()
+            tiradas.pos = 0
+            while True:
+                restaurar(instantanea)
+                juego.simular_turno(combate, politica)
+                p = 1.0
+                for q in probs[:tiradas.pos]:
+                    p *= q
+                if p > 0.0:
+                    clave = ('fin', max(0, jugador.vida)) if combate.terminada() else combate.clave()
+                    entrada = sucesores.get(clave)
+                    if entrada is not None:
+                        entrada[0] += p
+                    elif clave[0] == 'fin':
+                        sucesores[clave] = [p, None]
+                    else:
+                        sucesores[clave] = [p, (jugador.instantanea_combate(), tuple(e.instantanea_combate() for e in enemigos))]
+                if not tiradas.siguiente():
+                    return sucesores
+
+        cache = self.cache
+
+        def resolver(clave, instantanea):
+            """(P(victoria), E[vida final]) desde la posición `clave`."""
+            entrada = (politica, clave)
+            valor = cache.get(entrada)
+            if valor is not None:
+                cache.move_to_end(entrada)
+                return valor
+            if clave in pila:
+                raise NoEnumerable("ciclo de posiciones")
+            nuevos[0] += 1
+            if nuevos[0] > self.max_estados:
+                raise NoEnumerable("demasiados estados")
+            pila.add(clave)
+            victoria = vida = bucle = 0.0
+            for siguiente, (p, datos) in transiciones(instantanea).items():
+                if datos is None:
+                    if siguiente[1] > 0:
+                        victoria += p
+                        vida += p * siguiente[1]
+                elif siguiente == clave:
+                    bucle += p
+                else:
+                    v, h = resolver(siguiente, datos)
+                    victoria += p * v
+                    vida += p * h
+            pila.discard(clave)
+            if bucle:
+                if bucle >= 1.0 - 1e-12:
+                    raise NoEnumerable("la batalla no termina")
+                victoria /= 1.0 - bucle
+                vida /= 1.0 - bucle
+            cache[entrada] = valor = (victoria, vida)
+            if len(cache) > self.max_cache:
+                cache.popitem(last=False)
+            return valor
+
+        try:
+            if combate.terminada():
+                vida = max(0, jugador.vida)
+                return (1.0 if vida > 0 else 0.0, float(vida)), 0
+            return resolver(combate.clave(), origen), nuevos[0]
+        finally:
+            restaurar(origen)
+            combate.rng, jugador.rng, rngs_enemigos = rngs
+            for e, rng in zip(enemigos, rngs_enemigos):
+                e.rng = rng
+
+    def _muestreo(self, juego, politica, combate, max_turnos=500):
+        origen = combate.instantanea()
+        victorias = vida = 0
+        try:
+            for i in range(self.muestras):
+                combate.restaurar(origen, rng=False)
+                combate.rng.seed(derivar_semilla(combate.rng.semilla, 'muestra', i))
+                turnos = 0
+                while turnos < max_turnos and not combate.terminada():
+                    turnos += 1
+                    juego.simular_turno(combate, politica)
+                if juego.jugador.vida > 0 and combate.terminada():
+                    victorias += 1
+                    vida += juego.jugador.vida
+        finally:
+            combate.restaurar(origen)
+        n = self.muestras
+        return (victorias / n, vida / n), n
+
+# --- BARRIDO DE PARÁMETROS DE BALANCE ---
+# Un punto es un dict {constante: valor} sobre PARAMETROS_BALANCE. Cada punto
+# se evalúa con las mismas campañas (semillas derivadas de `semilla`) y sus
+# constantes sustituidas en el proceso que lo simula, así las diferencias
+# entre puntos no se deben a la suerte. Los resultados se guardan en SQLite
+# por hash de (punto, configuración, versión del código): repetir o reanudar
+# un barrido solo simula los puntos que faltan.
+
+PARAMETROS_BALANCE = (
+    'CRIT_CHANCE', 'CRIT_MULT', 'HERO_MISS_CHANCE', 'ENEMY_MISS_CHANCE', 'XP_POR_NIVEL_BASE',
+    'CANTIDAD_CURACION_POCION_VIDA', 'CANTIDAD_CURACION_POCION_MANA', 'PESOS_ENEMIGO', 'PROB_JEFE',
+)
+ARCHIVO_BARRIDO = "barrido_balance.db"
+_VERSION_CODIGO = None
+
+def version_codigo():
+    """Hash de este archivo: los resultados de otra versión del código no se reutilizan."""
+    global _VERSION_CODIGO
+    if _VERSION_CODIGO is None:
+        with open(os.path.abspath(__file__), 'rb') as f:
+            _VERSION_CODIGO = hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+    return _VERSION_CODIGO
+
+def validar_parametros(punto):
+    desconocidos = set(punto) - set(PARAMETROS_BALANCE)
+    if desconocidos:
+        raise ValueError(f"Parámetros de balance desconocidos: {', '.join(sorted(desconocidos))}")
+
+def aplicar_parametros(punto):
+    """Sustituye en el módulo las constantes de `punto`. Retorna sus valores anteriores."""
+    validar_parametros(punto)
+    modulo = globals()
+    anteriores = {nombre: modulo[nombre] for nombre in punto}
+    modulo.update(punto)
+    return anteriores
+
+def rejilla_parametros(espacio):
+    """Todos los puntos del producto cartesiano de {constante: [valores]}."""
+    nombres = sorted(espacio)
+    return [dict(zip(nombres, valores)) for valores in itertools.product(*(espacio[n] for n in nombres))]
+
+def muestreo_parametros(espacio, n, semilla=0):
+    """
+    `n` puntos al azar. Cada constante toma uno de sus valores si se da una
+    lista, o uno uniforme en {'min': a, 'max': b} (entero si ambos lo son).
+    """
+    rng = FlujoAleatorio(semilla)
+    puntos = []
+    for _ in range(n):
+        punto = {}
+        for nombre in sorted(espacio):
+            valores = espacio[nombre]
+            if isinstance(valores, dict):
+                bajo, alto = valores['min'], valores['max']
+                if isinstance(bajo, int) and isinstance(alto, int):
+                    punto[nombre] = rng.randint(bajo, alto)
+                else:
+                    punto[nombre] = round(rng.uniform(bajo, alto), 4)
+            else:
+                punto[nombre] = rng.choice(valores)
+        puntos.append(punto)
+    return puntos
+
+def clave_punto(punto, campanas, batallas, politica, semilla):
+    datos = json.dumps({
+        'punto': punto, 'campanas': campanas, 'batallas': batallas,
+        'politica': politica.__name__, 'semilla': semilla, 'version': version_codigo(),
+    }, sort_keys=True)
+    return hashlib.blake2b(datos.encode(), digest_size=16).hexdigest()
+
+def _evaluar_punto(args):
+    """Trabajo de un proceso: juega las campañas de un punto con sus constantes."""
+    clave, punto, campanas, batallas, politica, jugador_dict, semilla = args
+    anteriores = aplicar_parametros(punto)
+    inicio = time.perf_counter()
+    try:
+        ganadas = completas = niveles = 0
+        for indice in range(campanas):
+            juego = Juego(Personaje.from_dict(jugador_dict), semilla=derivar_semilla(semilla, indice), consola=False)
+            g, nivel = juego.simular_campana(politica, batallas)
+            ganadas += g
+            completas += g == batallas
+            niveles += nivel
+    finally:
+        aplicar_parametros(anteriores)
+    # Cada campaña incompleta termina en exactamente una derrota
+    jugadas = ganadas + campanas - completas
+    return clave, {
+        'tasa_completa': completas / campanas if campanas else 0.0,
+        'batallas_ganadas': ganadas / campanas if campanas else 0.0,
+        'tasa_victoria': ganadas / jugadas if jugadas else 0.0,
+        'nivel_final': niveles / campanas if campanas else 0.0,
+        'segundos': time.perf_counter() - inicio,
+    }
+
+class CacheBarrido:
+    """Resultados de puntos ya simulados en una base SQLite, por clave de punto."""
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS puntos (
+            clave TEXT PRIMARY KEY,
+            parametros TEXT NOT NULL,
+            resultado TEXT NOT NULL,
+            creado REAL NOT NULL
+        );
+    """
+
+    def __init__(self, ruta=ARCHIVO_BARRIDO):
+        self.ruta = ruta
+        self.conexion = sqlite3.connect(ruta, isolation_level=None)
+        if ruta != ":memory:":
+            self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.executescript(self.ESQUEMA)
+
+    def __len__(self):
+        return self.conexion.execute("SELECT COUNT(*) FROM puntos").fetchone()[0]
+
+    def obtener(self, claves):
+        """{clave: resultado} de las `claves` que ya están guardadas."""
+        claves = list(claves)
+        encontrados = {}
+        for i in range(0, len(claves), 500):
+            grupo = claves[i:i + 500]
+            filas = self.conexion.execute(
+                f"SELECT clave, resultado FROM puntos WHERE clave IN ({','.join('?' * len(grupo))})", grupo)
+            encontrados.update((clave, json.loads(resultado)) for clave, resultado in filas)
+        return encontrados
+
+    def guardar(self, clave, punto, resultado):
+        # Sin transacción explícita: cada punto queda en disco al terminar
+        self.conexion.execute(
+            "INSERT OR REPLACE INTO puntos (clave, parametros, resultado, creado) VALUES (?, ?, ?, ?)",
+            (clave, json.dumps(punto, sort_keys=True), json.dumps(resultado), time.time()))
+
+    def cerrar(self):
+        self.conexion.close()
+
+def barrido_parametros(puntos, campanas=200, batallas=10, politica=politica_codiciosa, procesos=None,
+                       semilla=0, ruta=ARCHIVO_BARRIDO, progreso=None):
+    """
+    Evalúa cada punto con `campanas` campañas de hasta `batallas` batallas
+    (Juego.simular_campana) repartidas en un pool de procesos, un punto por
+    tarea. Retorna [(punto, resultado)] en el orden de `puntos`. Los puntos
+    ya guardados en `ruta` no se simulan y los nuevos se guardan al terminar,
+    así un barrido interrumpido se reanuda donde quedó. `progreso(hechos,
+    pendientes)` se llama tras cada punto nuevo.
+    """
+    import multiprocessing
+
+    for punto in puntos:
+        validar_parametros(punto)
+    jugador_dict = Personaje("Simulado").to_dict()
+    claves = [clave_punto(punto, campanas, batallas, politica, semilla) for punto in puntos]
+    cache = CacheBarrido(ruta)
+    pool = None
+    try:
+        resultados = cache.obtener(claves)
+        pendientes = {clave: punto for clave, punto in zip(claves, puntos) if clave not in resultados}
+        tareas = [(clave, punto, campanas, batallas, politica, jugador_dict, semilla)
+                  for clave, punto in pendientes.items()]
+        procesos = max(1, min(procesos or os.cpu_count() or 1, len(tareas)))
+        if procesos == 1:
+            evaluados = map(_evaluar_punto, tareas)
+        else:
+            pool = multiprocessing.Pool(procesos)
+            evaluados = pool.imap_unordered(_evaluar_punto, tareas)
+        for hechos, (clave, resultado) in enumerate(evaluados, 1):
+            cache.guardar(clave, pendientes[clave], resultado)
+            resultados[clave] = resultado
+            if progreso:
+                progreso(hechos, len(tareas))
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        cache.cerrar()
+    return [(punto, resultados[clave]) for punto, clave in zip(puntos, claves)]
+
+# --- MOTOR VECTORIZADO (NumPy, estructura de arreglos) ---
+# Simula N batallas en paralelo: cada estadística es un arreglo (N,) para el
+# héroe o (N, 4) para los enemigos, y cada turno se avanza con operaciones por
+# lotes. Reproduce las reglas de Enemigo.__init__, Enemigo.accion/_accion_jefe
+# y Juego.atacar_enemigo para la política de ataque básico (sin habilidades).
+
+MAX_ENEMIGOS_BATALLA = 4
+
+def _indice_tipo(nombre):
+    return TIPOS_ENEMIGO.index(nombre) if nombre in TIPOS_ENEMIGO else -1
+
+def _generar_enemigos_vectorizado(rng, n, nivel_jugador, defensa_heroe, ataque_heroe):
+    """
+    Genera los enemigos de `n` batallas con las mismas fórmulas que
+    Enemigo.__init__ y precalcula todos sus resultados posibles contra el héroe.
+    Cada arreglo tiene forma (MAX_ENEMIGOS_BATALLA, n) para que cada posición
+    de enemigo sea contigua en memoria.
+    """
+    forma = (MAX_ENEMIGOS_BATALLA, n)
+    cantidad = rng.integers(2, 5, n)
+    presente = np.arange(MAX_ENEMIGOS_BATALLA)[:, None] < cantidad
+
+    nivel = np.maximum(1, nivel_jugador + rng.integers(-1, 3, forma, dtype=np.int32))
+    vida_max = 50 + nivel * 10
+    ataque = 8 + nivel * 2
+    defensa = 5 + nivel
+    velocidad = 3 + nivel
+
+    # random.choices elige el primer peso acumulado mayor que la tirada; con
+    # pesos enteros basta una tirada entera en [0, total)
+    acumulados = np.cumsum(PESOS_ENEMIGO)
+    tirada = rng.integers(0, acumulados[-1], forma, dtype=np.int32)
+    tipo = np.zeros(forma, dtype=np.int8)
+    for limite in acumulados[:-1]:
+        tipo += tirada >= limite
+
+    def escalar(valores, mascara, factor):
+        return np.where(mascara, (valores * factor).astype(np.int32), valores)
+
+    for indice, nombre in enumerate(TIPOS_ENEMIGO):
+        arquetipo = ARQUETIPOS_ENEMIGO[nombre]
+        es_tipo = tipo == indice
+        vida_max = escalar(vida_max, es_tipo, arquetipo.vida)
+        ataque = escalar(ataque, es_tipo, arquetipo.ataque)
+        defensa = escalar(defensa, es_tipo, arquetipo.defensa)
+        velocidad = escalar(velocidad, es_tipo, arquetipo.velocidad)
+
+    jefe = rng.random(forma) < PROB_JEFE
+    vida_max = escalar(vida_max, jefe, ARQUETIPO_JEFE.vida)
+    ataque = escalar(ataque, jefe, ARQUETIPO_JEFE.ataque)
+    defensa = escalar(defensa, jefe, ARQUETIPO_JEFE.defensa)
+    velocidad = np.where(jefe, np.maximum(1, (velocidad * ARQUETIPO_JEFE.velocidad).astype(np.int32)), velocidad)
+
+    # Los comportamientos de Mago y Sanador van por nombre (Enemigo.accion)
+    mago = (tipo == _indice_tipo('Mago')) & ~jefe
+    sanador = (tipo == _indice_tipo('Sanador')) & ~jefe
+    # Enemigo.accion con una sola tirada u: atacar() acierta si u >= umbral_golpe;
+    # el Mago lanza hechizo (60%) y acierta si 0.6*fallo <= u < 0.6, o ataca si
+    # u >= 0.6 + 0.4*fallo. El Jefe se resuelve aparte (umbral imposible).
+    umbral_golpe = np.where(mago, 0.6 + 0.4 * ENEMY_MISS_CHANCE, ENEMY_MISS_CHANCE)
+    umbral_golpe = np.where(jefe, 2.0, umbral_golpe).astype(np.float32)
+    hechizo_desde = np.where(mago, 0.6 * ENEMY_MISS_CHANCE, 2.0).astype(np.float32)
+    hechizo_hasta = np.where(mago, 0.6, 2.0).astype(np.float32)
+
+    danio_heroe = np.maximum(0, ataque_heroe - defensa // 2)
+    return {
+        'vida': np.where(presente, vida_max, 0),
+        'vida_max': vida_max,
+        'golpe': np.maximum(0, ataque - defensa_heroe // 2),
+        'hechizo': np.maximum(0, ataque * 2 - defensa_heroe),
+        'furia': np.maximum(0, ataque * 3 - defensa_heroe),
+        'cura_sanador': np.where(sanador, (defensa * 1.5).astype(np.int32), 0),
+        'cura_jefe': (vida_max * 0.08).astype(np.int32),
+        'burn_jefe': 5 + nivel,
+        'danio_heroe': danio_heroe,
+        'danio_critico': (danio_heroe * CRIT_MULT).astype(np.int32),
+        'jefe': jefe, 'sanador': sanador, 'umbral_golpe': umbral_golpe,
+        'hechizo_desde': hechizo_desde, 'hechizo_hasta': hechizo_hasta,
+    }
+
+def simular_batallas_vectorizado(n, jugador=None, objetivo="primero", semilla=None,
+                                 max_turnos=500, tam_bloque=65536):
+    """
+    Simula `n` batallas en bloque con NumPy. El héroe usa siempre el ataque
+    básico sobre el primer enemigo vivo (`objetivo="primero"`, equivalente a
+    politica_ataque_basico) o sobre el de menor vida (`"menor_vida"`).
+    Retorna el mismo resumen que `simular_batallas`.
+
+    Con esta política la defensa del héroe no cambia durante la batalla, así que
+    los daños y curas posibles de cada enemigo se precalculan al generarlo y
+    cada turno solo sortea una tirada por actor. Se mantienen `tam_bloque`
+    batallas activas a la vez (caben en caché); las que terminan se reemplazan
+    por batallas nuevas hasta completar `n`.
+    """
+    if not HAS_NUMPY:
+        raise RuntimeError("NumPy no está instalado; usa simular_batallas().")
+
+    inicio = time.perf_counter()
+    jugador = jugador or Personaje("Simulado")
+    rng = np.random.default_rng(semilla)
+    arma = jugador.equipo.get('arma')
+    bonus_arma = arma.get('ataque', 0) if arma and isinstance(arma, dict) else 0
+    ataque_heroe = jugador.ataque + bonus_arma
+    defensa_heroe = jugador.defensa
+    quemadura = jugador.estados.get('burn', {})
+    umbral_critico = HERO_MISS_CHANCE + (1 - HERO_MISS_CHANCE) * CRIT_CHANCE
+    tope = np.iinfo(np.int32).max
+
+    victorias = np.zeros(n, dtype=bool)
+    turnos_final = np.full(n, max_turnos, dtype=np.int64)
+    vida_final = np.zeros(n, dtype=np.int64)
+
+    # Estado de las batallas activas: enemigos (MAX_ENEMIGOS_BATALLA, m) y héroe (m,)
+    e = {}
+    heroe = {}
+    generadas = 0
+    turno = 0
+
+    def incorporar(k):
+        nuevos = _generar_enemigos_vectorizado(rng, k, jugador.nivel, defensa_heroe, ataque_heroe)
+        filas = {
+            'id': np.arange(generadas, generadas + k),
+            'inicio': np.full(k, turno, dtype=np.int64),
+            'vida': np.full(k, jugador.vida, dtype=np.int32),
+            # Temporizador de quemadura del héroe (único estado que aplican los enemigos)
+            'burn_dmg': np.full(k, quemadura.get('dmg', 0), dtype=np.int32),
+            'burn_turnos': np.full(k, quemadura.get('turnos', 0), dtype=np.int32),
+            'activa': np.ones(k, dtype=bool),
+        }
+        for destino, origen, eje in ((e, nuevos, 1), (heroe, filas, 0)):
+            for clave, valor in origen.items():
+                destino[clave] = np.concatenate((destino[clave], valor), axis=eje) if clave in destino else valor
+
+    incorporar(min(n, tam_bloque))
+    generadas = heroe['id'].size
+
+    while heroe['id'].size:
+        turno += 1
+        m = heroe['id'].size
+        vida_e = e['vida']
+        vida = heroe['vida']
+        burn_dmg = heroe['burn_dmg']
+        burn_turnos = heroe['burn_turnos']
+
+        # Estados del héroe al inicio de su turno
+        quema = burn_turnos > 0
+        vida -= burn_dmg * quema
+        burn_turnos -= quema
+
+        # Turno del héroe: ataque básico. Se recorre cada posición en lugar de
+        # indexar con (blanco, filas): las filas contiguas son mucho más baratas.
+        u = rng.random(m, dtype=np.float32)
+        acierta = u >= HERO_MISS_CHANCE
+        critico = u < umbral_critico
+        if objetivo == "menor_vida":
+            blanco = np.zeros(m, dtype=np.int8)
+            menor = np.full(m, tope, dtype=np.int32)
+            for j in range(MAX_ENEMIGOS_BATALLA):
+                mejor = (vida_e[j] > 0) & (vida_e[j] < menor)
+                blanco[mejor] = j
+                np.copyto(menor, vida_e[j], where=mejor)
+            for j in range(MAX_ENEMIGOS_BATALLA):
+                vida_e[j] -= np.where(critico, e['danio_critico'][j], e['danio_heroe'][j]) * (acierta & (blanco == j))
+        else:
+            pendiente = acierta
+            for j in range(MAX_ENEMIGOS_BATALLA):
+                vivo = vida_e[j] > 0
+                vida_e[j] -= np.where(critico, e['danio_critico'][j], e['danio_heroe'][j]) * (pendiente & vivo)
+                pendiente = pendiente & ~vivo
+
+        # Turno de los enemigos, en orden de la lista
+        for j in range(MAX_ENEMIGOS_BATALLA):
+            vj = vida_e[j]
+            actua = (vj > 0) & (vida > 0)
+            u = rng.random(m, dtype=np.float32)
+            herido = vj < e['vida_max'][j]
+            # El Sanador herido se cura en lugar de atacar
+            cura = actua & herido & e['sanador'][j]
+            golpea = actua & (u >= e['umbral_golpe'][j]) & ~cura
+            hechiza = actua & (u >= e['hechizo_desde'][j]) & (u < e['hechizo_hasta'][j])
+            danio = e['golpe'][j] * golpea + e['hechizo'][j] * hechiza
+            vj += e['cura_sanador'][j] * cura
+
+            sel = np.flatnonzero(actua & e['jefe'][j])
+            if sel.size:
+                uj = u[sel]
+                vs = vj[sel]
+                vida_max_j = e['vida_max'][j][sel]
+                ratio = vs / np.maximum(1, vida_max_j)
+                fase1 = ratio > 0.66
+                fase2 = ~fase1 & (ratio > 0.33)
+                fase3 = ~fase1 & ~fase2
+                # fase 1: 30% hechizo, si no atacar(); ambos pueden fallar
+                d = e['hechizo'][j][sel] * (fase1 & (uj >= 0.3 * ENEMY_MISS_CHANCE) & (uj < 0.3))
+                d += e['golpe'][j][sel] * (fase1 & (uj >= 0.3 + 0.7 * ENEMY_MISS_CHANCE))
+                # fase 2: 50% quemadura, si no golpe de rabia
+                quema_nueva = fase2 & (uj < 0.5)
+                d += e['hechizo'][j][sel] * (fase2 & (uj >= 0.5))
+                # fase 3: 40% regeneración, si no golpe final
+                regenera = fase3 & (uj < 0.4)
+                d += e['furia'][j][sel] * (fase3 & (uj >= 0.4))
+                danio[sel] += d
+                vj[sel] = np.minimum(vida_max_j, vs + e['cura_jefe'][j][sel] * regenera)
+                objetivo_burn = sel[quema_nueva]
+                sin_burn = objetivo_burn[burn_turnos[objetivo_burn] <= 0]
+                burn_dmg[sin_burn] = e['burn_jefe'][j][sin_burn]
+                burn_turnos[objetivo_burn] = np.maximum(burn_turnos[objetivo_burn], 3)
+
+            np.minimum(vj, e['vida_max'][j], out=vj)
+            vida -= danio
+
+        # Batallas terminadas: registrar resultado y reemplazarlas por nuevas
+        quedan = vida_e[0] > 0
+        for j in range(1, MAX_ENEMIGOS_BATALLA):
+            quedan |= vida_e[j] > 0
+        pierde = vida <= 0
+        turnos_batalla = turno - heroe['inicio']
+        termina = (~quedan | pierde | (turnos_batalla >= max_turnos)) & heroe['activa']
+        if termina.any():
+            fin = heroe['id'][termina]
+            victorias[fin] = ~quedan[termina] & ~pierde[termina]
+            turnos_final[fin] = turnos_batalla[termina]
+            vida_final[fin] = np.maximum(0, vida[termina])
+            heroe['activa'] &= ~termina
+            activas = int(heroe['activa'].sum())
+            # Compactar y rellenar solo cuando se acumulan bastantes terminadas:
+            # mientras tanto las terminadas siguen en los arreglos sin registrarse
+            if activas == 0 or m - activas >= m // 4:
+                sigue = np.flatnonzero(heroe['activa'])
+                for clave in e:
+                    e[clave] = e[clave].take(sigue, axis=1)
+                for clave in heroe:
+                    heroe[clave] = heroe[clave].take(sigue)
+                if generadas < n:
+                    nuevas = min(n - generadas, tam_bloque - activas)
+                    if nuevas > 0:
+                        incorporar(nuevas)
+                        generadas += nuevas
+    segundos = time.perf_counter() - inicio
+
+    turnos_hist = dict(zip(*[a.tolist() for a in np.unique(turnos_final, return_counts=True)]))
+    vida_hist = dict(zip(*[a.tolist() for a in np.unique(vida_final[victorias], return_counts=True)]))
+    total_victorias = int(victorias.sum())
+    return {
+        'batallas': n,
+        'victorias': total_victorias,
+        'tasa_victoria': total_victorias / n if n else 0.0,
+        'turnos': _resumen_histograma(turnos_hist),
+        'vida_restante': _resumen_histograma(vida_hist),
+        'procesos': 1,
+        'segundos': segundos,
+        'batallas_por_segundo': n / segundos if segundos > 0 else 0.0,
+    }
+
+def comparar_motores(n=20000, jugador=None):
+    """
+    Compara el motor de objetos con el vectorizado bajo politica_ataque_basico.
+    Retorna ambas tasas de victoria, el estadístico z de la diferencia y la
+    aceleración obtenida.
+    """
+    objetos = simular_batallas(n, politica_ataque_basico, jugador=jugador, procesos=1)
+    vectorizado = simular_batallas_vectorizado(n, jugador=jugador)
+    p1, p2 = objetos['tasa_victoria'], vectorizado['tasa_victoria']
+    p = (objetos['victorias'] + vectorizado['victorias']) / (2 * n)
+    error = (2 * p * (1 - p) / n) ** 0.5
+    return {
+        'tasa_objetos': p1,
+        'tasa_vectorizado': p2,
+        'z': (p1 - p2) / error if error else 0.0,
+        'turnos_medios': (objetos['turnos']['media'], vectorizado['turnos']['media']),
+        'aceleracion': objetos['segundos'] / vectorizado['segundos'] if vectorizado['segundos'] else float('inf'),
+    }
+
+# --- SERVIDOR DE PARTIDAS (asyncio) ---
+# Protocolo por líneas: el servidor envía objetos JSON {"texto", "pregunta"}
+# (o {"texto", "fin": true} al terminar) y el cliente responde cada pregunta
+# con una línea de texto. Cada conexión es una partida independiente
+# conducida por Juego.flujo_iniciar(), así un proceso atiende miles a la vez.
+
+def _mensaje(texto, pregunta=None):
+    datos = {'texto': texto, 'pregunta': pregunta} if pregunta is not None else {'texto': texto, 'fin': True}
+    return json.dumps(datos, ensure_ascii=False).encode('utf-8') + b"\n"
+
+class SesionRemota:
+    """Partida de un cliente remoto: acumula su salida entre pregunta y pregunta."""
+    __slots__ = ('juego', 'flujo', 'salida', 'iniciada', 'pregunta', 'actividad', 'bytes', 'medida', 'compactada')
+
+    def __init__(self, nombre=None, semilla=None, destino=None, autoguardado=None, datos=None):
+        """
+        Partida nueva para `nombre`, o reanudada desde un Juego.to_dict()
+        (`datos`). Se guarda en destino_de_jugador(destino, nombre).
+        """
+        self.salida = []
+        if datos is None:
+            self.juego = Juego(Personaje(nombre), semilla=semilla, salida=self.salida.append)
+        else:
+            self.juego = Juego.from_dict(datos, salida=self.salida.append)
+        self.juego.archivo_guardado = destino_de_jugador(destino, self.juego.jugador.nombre)
+        self.juego.autoguardado = autoguardado
+        self.flujo = self.juego.flujo_iniciar(bienvenida=datos is None)
+        self.iniciada = False
+        self.pregunta = None
+        self.actividad = time.monotonic()
+        self.bytes = 0
+        self.medida = None      # `actividad` cuando se midió `bytes`
+        self.compactada = None  # `actividad` cuando se compactó
+
+    def paso(self, respuesta=None):
+        """Avanza hasta la siguiente pregunta. Retorna (texto, pregunta); pregunta es None al terminar."""
+        try:
+            if self.iniciada:
+                pregunta = self.flujo.send(respuesta)
+            else:
+                self.iniciada = True
+                pregunta = next(self.flujo)
+        except StopIteration:
+            pregunta = None
+        texto = "\n".join(self.salida)
+        self.salida.clear()
+        self.pregunta = pregunta
+        self.actividad = time.monotonic()
+        return texto, pregunta
+
+    def memoria(self):
+        """Juego.memoria() más la salida pendiente de enviar."""
+        memoria = self.juego.memoria()
+        memoria['salida'] = tamano_estructural(self.salida)
+        memoria['total'] += memoria['salida']
+        self.bytes, self.medida = memoria['total'], self.actividad
+        return memoria
+
+    def tamano(self):
+        """Bytes de la sesión; solo se vuelve a medir si avanzó desde la última medida."""
+        if self.medida != self.actividad:
+            self.memoria()
+        return self.bytes
+
+    def compactar(self):
+        """Juego.compactar(), salvo que la sesión no haya avanzado desde la última vez."""
+        if self.compactada != self.actividad:
+            self.tamano()
+            self.bytes -= self.juego.compactar()
+            self.compactada = self.actividad
+
+class ServidorJuego:
+    """
+    Servidor asyncio (TCP o socket Unix) con una SesionRemota por conexión.
+    Una sesión que no responde en `timeout` segundos se cierra. Con
+    `destino` ("sqlite:<ruta>", o un archivo del que cada jugador tiene su
+    copia, ver destino_de_jugador) las partidas se autoguardan a través de
+    un único escritor en segundo plano. Con `perfil` (un
+    Perfilador) todas las partidas del proceso miden sus turnos en él y, si
+    hay `ruta_perfil`, se exporta en formato Prometheus cada
+    `intervalo_perfil` segundos y al detenerse. Con `presupuesto_memoria`
+    (bytes) se vigila la memoria de las sesiones cada `intervalo_memoria`
+    segundos (ver aplicar_presupuesto). Con `contenido` (un
+    PaqueteContenido) sus paquetes se recargan si cambian, comprobándolo
+    cada `intervalo_contenido` segundos. Los avisos del servidor (recargas
+    de contenido) van a `salida`.
+    """
+    def __init__(self, destino=None, timeout=300.0, semilla=None, perfil=None, ruta_perfil=None, intervalo_perfil=15.0,
+                 presupuesto_memoria=None, inactividad_minima=30.0, intervalo_memoria=10.0,
+                 contenido=None, intervalo_contenido=5.0, salida=print):
+        self.destino = destino
+        self.timeout = timeout
+        self.semilla = semilla
+        self.perfil = perfil
+        self.ruta_perfil = ruta_perfil
+        self.intervalo_perfil = intervalo_perfil
+        self.presupuesto_memoria = presupuesto_memoria
+        self.inactividad_minima = inactividad_minima
+        self.intervalo_memoria = intervalo_memoria
+        self.desalojadas = {}       # sesión -> guardado binario de la partida desalojada
+        self.desalojos = 0
+        self.contenido = contenido
+        self.intervalo_contenido = intervalo_contenido
+        self.salida = salida
+        self.autoguardado = None
+        self.sesiones = {}
+        self.sesiones_activas = 0
+        self.sesiones_totales = 0
+        self.servidor = None
+
+    # Operaciones sobre sesiones (el anfitrión multiproceso las redefine)
+    async def abrir_sesion(self, indice, nombre):
+        if self.destino and self.autoguardado is None:
+            self.autoguardado = AutoGuardado()
+        semilla = derivar_semilla(self.semilla, indice) if self.semilla is not None else None
+        sesion = self.sesiones[indice] = SesionRemota(nombre, semilla, self.destino, self.autoguardado)
+        sesion.juego.perfil = self.perfil
+        return sesion.paso()
+
+    async def paso_sesion(self, indice, respuesta):
+        if indice in self.desalojadas:
+            self._recuperar(indice)
+        return self.sesiones[indice].paso(respuesta)
+
+    def cerrar_sesion(self, indice):
+        self.sesiones.pop(indice, None)
+        self.desalojadas.pop(indice, None)
+
+    # Memoria de las sesiones
+    def memoria_sesiones(self):
+        """Resumen de la memoria: bytes en vivo (estimados) y de las partidas desalojadas."""
+        en_vivo = sum(sesion.tamano() for sesion in self.sesiones.values())
+        return {
+            'sesiones': len(self.sesiones),
+            'bytes': en_vivo,
+            'desalojadas': len(self.desalojadas),
+            'bytes_desalojadas': sum(map(len, self.desalojadas.values())),
+            'desalojos': self.desalojos,
+            'presupuesto': self.presupuesto_memoria,
+        }
+
+    def mayores_sesiones(self, n=10):
+        """Las `n` sesiones que más memoria ocupan, con el desglose por componente."""
+        medidas = [(sesion.memoria(), indice, sesion) for indice, sesion in self.sesiones.items()]
+        medidas.sort(key=lambda m: m[0]['total'], reverse=True)
+        return [
+            {'sesion': indice, 'nombre': sesion.juego.jugador.nombre, 'bytes': memoria['total'],
+             'inactiva': time.monotonic() - sesion.actividad, 'componentes': memoria}
+            for memoria, indice, sesion in medidas[:n]
+        ]
+
+    def aplicar_presupuesto(self):
+        """
+        Si las sesiones superan `presupuesto_memoria`, primero las compacta y,
+        si no basta, desaloja las que llevan más tiempo inactivas (al menos
+        `inactividad_minima` segundos) esperando la acción del turno: su
+        partida pasa a un guardado binario y se reanuda con la siguiente
+        respuesta del jugador. Solo se miden de nuevo las sesiones que han
+        avanzado desde la comprobación anterior. Retorna memoria_sesiones().
+        """
+        if self.presupuesto_memoria is None:
+            return self.memoria_sesiones()
+        total = sum(sesion.tamano() for sesion in self.sesiones.values())
+        if total > self.presupuesto_memoria:
+            for sesion in self.sesiones.values():
+                sesion.compactar()
+            total = sum(sesion.bytes for sesion in self.sesiones.values())
+        if total > self.presupuesto_memoria:
+            limite = time.monotonic() - self.inactividad_minima
+            candidatas = sorted(
+                (sesion.actividad, indice) for indice, sesion in self.sesiones.items()
+                if sesion.pregunta == Juego.PREGUNTA_ACCION and sesion.actividad <= limite)
+            for _, indice in candidatas:
+                if total <= self.presupuesto_memoria:
+                    break
+                total -= self.sesiones[indice].bytes
+                self._desalojar(indice)
+        return self.memoria_sesiones()
+
+    def _desalojar(self, indice):
+        sesion = self.sesiones.pop(indice)
+        self.desalojadas[indice] = serializar_guardado(sesion.juego.to_dict())
+        self.desalojos += 1
+
+    def _recuperar(self, indice):
+        datos = GuardadoBinario(self.desalojadas.pop(indice)).to_dict()
+        sesion = self.sesiones[indice] = SesionRemota(destino=self.destino, autoguardado=self.autoguardado, datos=datos)
+        sesion.juego.perfil = self.perfil
+        # Vuelve a la misma pregunta de acción; el cliente ya vio esa salida
+        sesion.paso()
+
+    async def _leer(self, lector):
+        try:
+            if hasattr(asyncio, 'timeout'):
+                # Python 3.11+: sin la tarea extra que crea wait_for en cada lectura
+                async with asyncio.timeout(self.timeout):
+                    linea = await lector.readline()
+            else:
+                linea = await asyncio.wait_for(lector.readline(), self.timeout)
+        except asyncio.TimeoutError:
+            return None
+        return linea.decode('utf-8', 'replace').rstrip("\r\n") if linea else None
+
+    async def atender(self, lector, escritor):
+        self.sesiones_totales += 1
+        self.sesiones_activas += 1
+        indice = self.sesiones_totales
+        try:
+            escritor.write(_mensaje("", "Nombre de tu héroe: "))
+            nombre = await self._leer(lector)
+            if nombre is None:
+                return
+            texto, pregunta = await self.abrir_sesion(indice, nombre or "Héroe")
+            while pregunta is not None:
+                escritor.write(_mensaje(texto, pregunta))
+                await escritor.drain()
+                respuesta = await self._leer(lector)
+                if respuesta is None:
+                    return
+                texto, pregunta = await self.paso_sesion(indice, respuesta)
+            escritor.write(_mensaje(texto))
+            await escritor.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.cerrar_sesion(indice)
+            self.sesiones_activas -= 1
+            escritor.close()
+
+    async def iniciar(self, host="127.0.0.1", puerto=8765, unix=None):
+        if unix:
+            self.servidor = await asyncio.start_unix_server(self.atender, path=unix, backlog=4096)
+        else:
+            self.servidor = await asyncio.start_server(self.atender, host, puerto, backlog=4096)
+        return self.servidor
+
+    async def _exportar_perfil(self):
+        while True:
+            await asyncio.sleep(self.intervalo_perfil)
+            self.perfil.exportar(self.ruta_perfil)
+
+    async def _vigilar_memoria(self):
+        while True:
+            await asyncio.sleep(self.intervalo_memoria)
+            self.aplicar_presupuesto()
+
+    async def _recargar_contenido(self):
+        while True:
+            await asyncio.sleep(self.intervalo_contenido)
+            try:
+                if self.contenido.recargar():
+                    self.salida(f"Contenido recargado ({self.contenido.huella}).")
+            except (OSError, ValueError) as e:
+                # Paquete a medio escribir o inválido: sigue el contenido anterior
+                self.salida(f"No se pudo recargar el contenido: {e}")
+
+    async def servir(self, host="127.0.0.1", puerto=8765, unix=None):
+        await self.iniciar(host, puerto, unix)
+        tareas = []
+        if self.perfil is not None and self.ruta_perfil:
+            tareas.append(asyncio.create_task(self._exportar_perfil()))
+        if self.presupuesto_memoria is not None:
+            tareas.append(asyncio.create_task(self._vigilar_memoria()))
+        if self.contenido is not None:
+            tareas.append(asyncio.create_task(self._recargar_contenido()))
+        try:
+            async with self.servidor:
+                await self.servidor.serve_forever()
+        finally:
+            for tarea in tareas:
+                tarea.cancel()
+            self.detener()
+
+    def detener(self):
+        if self.autoguardado is not None:
+            self.autoguardado.cerrar()
+        if self.perfil is not None and self.ruta_perfil:
+            self.perfil.exportar(self.ruta_perfil)
+
+# --- ANFITRIÓN MULTIPROCESO ---
+# El frente (asyncio) atiende las conexiones y reparte las sesiones entre
+# procesos trabajadores: el fragmento inicial es id de sesión % procesos y la
+# tabla `dueno` mantiene la afinidad. Con cada respuesta el trabajador envía
+# el punto de control Juego.to_dict() de la sesión; si un trabajador muere se
+# relanza y sus sesiones se reanudan desde ese punto (solo se pierde el turno
+# en vuelo). El mismo camino (to_dict/from_dict) sirve para mover sesiones.
+
+def _trabajador_sesiones(conexion, destino, contenido=None, intervalo_contenido=5.0):
+    """
+    Proceso trabajador: ejecuta las sesiones de su fragmento según las
+    órdenes del frente. `contenido` son (rutas, caché) de los paquetes del
+    frente: se cargan al arrancar y se recargan, si cambian, entre órdenes.
+    Los avisos se envían al frente como (None, texto).
+    """
+    import queue
+    sesiones = {}
+    autoguardado = AutoGuardado() if destino else None
+    paquete = None
+    if contenido is not None:
+        paquete = PaqueteContenido(*contenido)
+        try:
+            paquete.cargar()
+        except (OSError, ValueError) as e:
+            # Sigue con el contenido heredado del frente: fallar aquí haría relanzarlo sin fin
+            conexion.send((None, f"No se pudo cargar el contenido: {e}"))
+        revision = time.monotonic()
+    # Un hilo vacía el pipe de órdenes: el frente nunca se bloquea en send()
+    # mientras este proceso espera a que el frente lea sus respuestas
+    ordenes = queue.SimpleQueue()
+    def recibir():
+        try:
+            while True:
+                ordenes.put(conexion.recv())
+        except (EOFError, OSError):
+            ordenes.put(None)
+    threading.Thread(target=recibir, daemon=True).start()
+    while True:
+        orden = ordenes.get()
+        if orden is None:
+            break
+        tipo, indice, dato = orden
+        if paquete is not None and time.monotonic() - revision >= intervalo_contenido:
+            revision = time.monotonic()
+            try:
+                paquete.recargar()
+            except (OSError, ValueError) as e:
+                conexion.send((None, f"No se pudo recargar el contenido: {e}"))
+        if tipo == 'cerrar':
+            sesiones.pop(indice, None)
+            continue
+        if tipo == 'exportar':
+            sesion = sesiones.pop(indice, None)
+            conexion.send((indice, sesion.juego.to_dict() if sesion else None))
+            continue
+        try:
+            if tipo == 'abrir':
+                nombre, semilla = dato
+                sesion = sesiones[indice] = SesionRemota(nombre, semilla, destino, autoguardado)
+                texto, pregunta = sesion.paso()
+            elif tipo == 'importar':
+                sesion = sesiones[indice] = SesionRemota(destino=destino, autoguardado=autoguardado, datos=dato)
+                texto, pregunta = sesion.paso()
+            else:
+                sesion = sesiones[indice]
+                texto, pregunta = sesion.paso(dato)
+        except Exception as e:
+            # Un error de una sesión la termina sin tumbar al trabajador
+            sesiones.pop(indice, None)
+            conexion.send((indice, (f"Error interno: {e}", None, None)))
+            continue
+        if pregunta is None:
+            sesiones.pop(indice, None)
+            conexion.send((indice, (texto, None, None)))
+        else:
+            conexion.send((indice, (texto, pregunta, sesion.juego.to_dict())))
+    if autoguardado is not None:
+        autoguardado.cerrar()
+
+class AnfitrionMultiproceso(ServidorJuego):
+    """
+    ServidorJuego cuyas sesiones se ejecutan en `procesos` trabajadores.
+    Mismo protocolo; `rebalancear()` iguala la carga moviendo sesiones que
+    esperan en la acción del turno, y `detener()` apaga a los trabajadores.
+    Cada trabajador carga y recarga los paquetes de `contenido`. El perfil
+    de turnos y el presupuesto de memoria miden las sesiones del proceso
+    que las ejecuta, así que aquí no se admiten (ValueError). Los avisos de
+    los trabajadores llegan por su pipe y el frente los pasa a `salida`.
+    """
+    def __init__(self, procesos=None, destino=None, timeout=300.0, semilla=None,
+                 contenido=None, intervalo_contenido=5.0, perfil=None, presupuesto_memoria=None, salida=print):
+        if perfil is not None or presupuesto_memoria is not None:
+            raise ValueError("El perfil y el presupuesto de memoria solo funcionan con el servidor de un proceso.")
+        super().__init__(destino, timeout, semilla, contenido=contenido, intervalo_contenido=intervalo_contenido,
+                         salida=salida)
+        self.procesos = procesos or os.cpu_count() or 1
+        self.trabajadores = [None] * self.procesos   # (proceso, conexión) por fragmento
+        self.dueno = {}             # sesión -> fragmento
+        self.puntos_control = {}    # sesión -> último Juego.to_dict()
+        self.aperturas = {}         # sesión -> (nombre, semilla) hasta su primer punto de control
+        self.ultima_pregunta = {}
+        self.reinicios = 0
+        self._esperando = {}        # sesión -> Future de la respuesta en vuelo
+        self._descartes = {}        # sesión -> respuestas de reanudaciones que nadie espera
+        self._bloqueos = {}         # sesión -> asyncio.Lock (un paso o traslado a la vez)
+
+    async def iniciar(self, host="127.0.0.1", puerto=8765, unix=None):
+        for n in range(self.procesos):
+            self._lanzar(n)
+        return await super().iniciar(host, puerto, unix)
+
+    def _lanzar(self, n):
+        import multiprocessing
+        frente, trabajador = multiprocessing.Pipe()
+        contenido = (self.contenido.rutas, self.contenido.cache) if self.contenido is not None else None
+        proceso = multiprocessing.Process(target=_trabajador_sesiones, daemon=True,
+                                          args=(trabajador, self.destino, contenido, self.intervalo_contenido))
+        proceso.start()
+        trabajador.close()
+        self.trabajadores[n] = (proceso, frente)
+        asyncio.get_running_loop().add_reader(frente.fileno(), self._recibir, n)
+
+    def _recibir(self, n):
+        frente = self.trabajadores[n][1]
+        try:
+            while frente.poll():
+                indice, resultado = frente.recv()
+                if indice is None:
+                    self.salida(resultado)
+                    continue
+                descartes = self._descartes.get(indice)
+                if descartes:
+                    # El pipe conserva el orden: esta es la de la reanudación, no la del paso siguiente
+                    if descartes == 1:
+                        del self._descartes[indice]
+                    else:
+                        self._descartes[indice] = descartes - 1
+                    continue
+                futuro = self._esperando.pop(indice, None)
+                if futuro is not None and not futuro.done():
+                    futuro.set_result(resultado)
+        except (EOFError, OSError):
+            self._relanzar(n)
+
+    def _relanzar(self, n):
+        """El trabajador `n` ha muerto: lanza otro y reanuda allí sus sesiones."""
+        proceso, frente = self.trabajadores[n]
+        asyncio.get_running_loop().remove_reader(frente.fileno())
+        frente.close()
+        proceso.join(timeout=1)
+        self.reinicios += 1
+        self._lanzar(n)
+        frente = self.trabajadores[n][1]
+        for indice, dueno in self.dueno.items():
+            if dueno != n:
+                continue
+            if indice in self.puntos_control:
+                frente.send(('importar', indice, self.puntos_control[indice]))
+            else:
+                frente.send(('abrir', indice, self.aperturas[indice]))
+            if indice not in self._esperando:
+                # Nadie espera esta respuesta: se descarta al llegar, aunque antes se pida el paso siguiente
+                self._descartes[indice] = self._descartes.get(indice, 0) + 1
+
+    async def _pedir(self, indice, orden):
+        futuro = asyncio.get_running_loop().create_future()
+        self._esperando[indice] = futuro
+        self.trabajadores[self.dueno[indice]][1].send(orden)
+        return await futuro
+
+    async def _avanzar(self, indice, orden):
+        async with self._bloqueos[indice]:
+            texto, pregunta, punto = await self._pedir(indice, orden)
+        if punto is not None:
+            self.puntos_control[indice] = punto
+            self.aperturas.pop(indice, None)
+        self.ultima_pregunta[indice] = pregunta
+        return texto, pregunta
+
+    async def abrir_sesion(self, indice, nombre):
+        semilla = derivar_semilla(self.semilla, indice) if self.semilla is not None else None
+        self.dueno[indice] = indice % self.procesos
+        self.aperturas[indice] = (nombre, semilla)
+        self._bloqueos[indice] = asyncio.Lock()
+        return await self._avanzar(indice, ('abrir', indice, (nombre, semilla)))
+
+    async def paso_sesion(self, indice, respuesta):
+        return await self._avanzar(indice, ('responder', indice, respuesta))
+
+    def cerrar_sesion(self, indice):
+        n = self.dueno.pop(indice, None)
+        for tabla in (self.puntos_control, self.aperturas, self.ultima_pregunta, self._bloqueos, self._esperando,
+                      self._descartes):
+            tabla.pop(indice, None)
+        if n is not None:
+            try:
+                self.trabajadores[n][1].send(('cerrar', indice, None))
+            except OSError:
+                pass
+
+    async def mover(self, indice, destino):
+        """Traslada la sesión `indice` al fragmento `destino` vía to_dict/from_dict."""
+        async with self._bloqueos[indice]:
+            origen = self.dueno.get(indice)
+            if origen is None or origen == destino:
                 return False
-        
-        # --- Fin de la batalla ---
-        if self.jugador.vida > 0:
-            # Posible dropeo tras la batalla
+            datos = await self._pedir(indice, ('exportar', indice, None))
+            if datos is None:
+                return False
+            self.dueno[indice] = destino
+            # La sesión reanudada vuelve a la misma pregunta de acción: su salida se descarta
+            _, _, punto = await self._pedir(indice, ('importar', indice, datos))
+            if punto is not None:
+                self.puntos_control[indice] = punto
+        return True
+
+    async def rebalancear(self):
+        """Mueve sesiones en espera de acción desde los fragmentos más cargados. Retorna cuántas movió."""
+        carga = [0] * self.procesos
+        for n in self.dueno.values():
+            carga[n] += 1
+        movidas = 0
+        for indice, n in list(self.dueno.items()):
+            menor = min(range(self.procesos), key=carga.__getitem__)
+            if carga[n] - carga[menor] <= 1:
+                continue
+            if self.ultima_pregunta.get(indice) != Juego.PREGUNTA_ACCION or self._bloqueos[indice].locked():
+                continue
+            if await self.mover(indice, menor):
+                carga[n] -= 1
+                carga[menor] += 1
+                movidas += 1
+        return movidas
+
+    def detener(self):
+        trabajadores = [t for t in self.trabajadores if t is not None]
+        try:
+            bucle = asyncio.get_running_loop()
+        except RuntimeError:
+            bucle = None
+        for proceso, frente in trabajadores:
+            # Sin lector: el cierre del pipe al salir no es un trabajador caído que relanzar
+            if bucle is not None:
+                bucle.remove_reader(frente.fileno())
             try:
-                self.generar_dropeo(enemigos_iniciales)
-            except Exception:
+                frente.send(None)
+            except OSError:
                 pass
-            xp_ganado = sum(e.nivel * 15 for e in enemigos_iniciales)
-            self.jugador.xp += xp_ganado
-            print(f"\n¡VICTORIA! Ganas {xp_ganado} XP.")
-            
-            # Verificar subida de nivel
-            while self.jugador.xp >= self.jugador.nivel * XP_POR_NIVEL_BASE:
-                self.jugador.subir_nivel()
-                nuevas = self._sincronizar_habilidades()
-                for hab in nuevas:
-                    print(f"¡Has aprendido una nueva habilidad: {hab}!")
-            self.verificar_logros()
-            return True
-        return False
+        for proceso, _ in trabajadores:
+            proceso.join(timeout=5)
+        super().detener()
 
-    def evento_aleatorio(self):
-        evento = random.choice(["tesoro", "trampa", "mercader", "nada"])
-        if evento == "tesoro":
-            recompensa = random.randint(20, 50)
-            self.jugador.restaurar_vida(recompensa)
-            print(f"¡Encuentras un manantial y recuperas {recompensa} puntos de vida!")
-        elif evento == "trampa":
-            dano = random.randint(10, 30)
-            self.jugador.vida -= dano
-            print(f"¡Caes en una trampa y pierdes {dano} puntos de vida!")
-            if self.jugador.vida <= 0:
-                print("La trampa ha sido mortal...")
-        elif evento == "mercader":
-            print("Te encuentras con un mercader ambulante.")
-            costo_pocion = self.jugador.nivel * 10
-            opcion = input(f"¿Quieres comprar una 'Poción de Vida' por {costo_pocion} XP? (s/n): ").lower()
-            if opcion == 's':
-                if self.jugador.xp >= costo_pocion:
-                    self.jugador.xp -= costo_pocion
-                    self.jugador.inventario["Poción de Vida"] = self.jugador.inventario.get("Poción de Vida", 0) + 1
-                    print(f"Compras una Poción de Vida. Tienes {self.jugador.inventario['Poción de Vida']}.")
-                else:
-                    print("No tienes suficiente XP.")
-        elif evento == "nada":
-            print("El camino está tranquilo. Continúas tu viaje.")
-    
-    def iniciar(self):
-        print("Bienvenido a Chrono Tactics RPG")
-        total_niveles = 10
-        while self.nivel_actual <= total_niveles:
-            if not self.batalla():
-                print("\n--- FIN DEL JUEGO ---")
+# --- PRUEBA DE CARGA ---
+def _respuesta_automatica(pregunta, rng):
+    """Jugador automático para la prueba de carga: ataca siempre y avanza en los menús."""
+    if pregunta.startswith("\nAcción"):
+        return "A"
+    if pregunta.startswith(("Número de enemigo", "Elige una para aplicar")):
+        return "1"
+    if "(s/n)" in pregunta:
+        return rng.choice("sn")
+    return "0"
+
+async def _cliente_carga(indice, host, puerto, unix, max_turnos, pausa, latencias):
+    rng = random.Random(indice)
+    if unix:
+        lector, escritor = await asyncio.open_unix_connection(unix)
+    else:
+        lector, escritor = await asyncio.open_connection(host, puerto)
+    try:
+        mensaje = json.loads(await lector.readline())
+        escritor.write(f"Bot{indice}\n".encode())
+        turnos = 0
+        while True:
+            inicio = time.perf_counter()
+            linea = await lector.readline()
+            if not linea:
                 break
-            
-            if self.nivel_actual == total_niveles:
+            if turnos:
+                latencias.append(time.perf_counter() - inicio)
+            mensaje = json.loads(linea)
+            if mensaje.get('fin') or turnos >= max_turnos:
                 break
+            turnos += 1
+            if pausa:
+                # Tiempo de reflexión del jugador (no cuenta en la latencia)
+                await asyncio.sleep(rng.uniform(0, 2 * pausa))
+            escritor.write((_respuesta_automatica(mensaje['pregunta'], rng) + "\n").encode())
+    finally:
+        escritor.close()
 
-            self.nivel_actual += 1
-            self.jugador.restaurar_vida(int(self.jugador.max_vida * 0.25)) # Recupera 25% de vida
-            self.jugador.mana = min(self.jugador.max_mana, self.jugador.mana + 20)
-            print("\nDescansas y recuperas algo de vida y maná...")
-            # Permitir gastar puntos de talento entre niveles
-            while self.jugador.puntos_talento > 0:
-                print(f"Tienes {self.jugador.puntos_talento} punto(s) de talento.")
-                print("Habilidades pasivas disponibles:")
-                keys = list(self.jugador.habilidades_pasivas.keys())
-                for i, k in enumerate(keys):
-                    info = self.jugador.habilidades_pasivas[k]
-                    estado = 'Aplicado' if info['aplicado'] else f"Costo {info['costo']}"
-                    print(f"{i+1}. {k} - {info['desc']} ({estado})")
-                try:
-                    elegir = int(input("Elige una para aplicar (0 para saltar): "))
-                except ValueError:
-                    print("Entrada inválida.")
-                    break
-                if elegir == 0:
-                    break
-                if 1 <= elegir <= len(keys):
-                    clave = keys[elegir-1]
-                    info = self.jugador.habilidades_pasivas[clave]
-                    if info['aplicado']:
-                        print("Ya has aplicado esta pasiva.")
-                        continue
-                    if self.jugador.puntos_talento >= info['costo']:
-                        self.jugador.puntos_talento -= info['costo']
-                        info['aplicado'] = True
-                        # aplicar efecto simple
-                        if clave == 'Furia':
-                            self.jugador.ataque += 2
-                        elif clave == 'Coraza':
-                            self.jugador.defensa_base += 2
-                            self.jugador.defensa += 2
-                        print(f"Has desbloqueado {clave}.")
-                    else:
-                        print("No tienes suficientes puntos.")
+async def prueba_carga(sesiones, host="127.0.0.1", puerto=8765, unix=None, max_turnos=50, pausa=0.0):
+    """
+    Abre `sesiones` conexiones concurrentes contra un ServidorJuego y juega
+    hasta `max_turnos` respuestas en cada una, esperando de media `pausa`
+    segundos antes de responder (0: sin pausa, carga máxima). Retorna la
+    latencia por respuesta (envío -> siguiente pregunta) en milisegundos.
+    """
+    latencias = []
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(
+        *(_cliente_carga(i, host, puerto, unix, max_turnos, pausa, latencias) for i in range(sesiones)),
+        return_exceptions=True)
+    segundos = time.perf_counter() - inicio
+    latencias.sort()
+    def percentil(p):
+        return latencias[min(len(latencias) - 1, int(p * len(latencias)))] * 1000 if latencias else 0.0
+    return {
+        'sesiones': sesiones,
+        'errores': sum(1 for r in resultados if isinstance(r, BaseException)),
+        'respuestas': len(latencias),
+        'p50_ms': percentil(0.50),
+        'p99_ms': percentil(0.99),
+        'respuestas_por_segundo': len(latencias) / segundos if segundos else 0.0,
+        'segundos': segundos,
+    }
+
+# --- REPETICIÓN DE PARTIDAS ---
+# Un registro es {nombre, semilla, respuestas, huella, eventos, fin}: con la
+# misma semilla y las mismas respuestas a cada pregunta de flujo_iniciar la
+# partida es idéntica, y la huella de sus eventos lo comprueba. Las
+# repeticiones no hacen E/S (sin consola ni guardado) y se reparten entre
+# procesos como simular_batallas.
+
+VERSION_REGISTRO = 1
+
+def _descartar(texto):
+    pass
+
+def _jugar_registro(nombre, semilla, responder, salida=_descartar):
+    """
+    Juega una partida contestando cada pregunta con responder(pregunta), que
+    retorna la respuesta o None para cortar ahí. Retorna el registro.
+    """
+    juego = Juego(Personaje(nombre), semilla=semilla, consola=salida is not _descartar, salida=salida)
+    juego.archivo_guardado = None
+    huella = juego.eventos.suscribir(HuellaEventos())
+    respuestas = []
+    flujo = juego.flujo_iniciar()
+    fin = "completa"
+    try:
+        pregunta = next(flujo)
+        while True:
+            respuesta = responder(pregunta)
+            if respuesta is None:
+                fin = "cortada"
+                flujo.close()
+                break
+            respuestas.append(respuesta)
+            pregunta = flujo.send(respuesta)
+    except StopIteration:
+        pass
+    except Exception as e:
+        # Un fallo del juego también forma parte de lo que se repite
+        fin = f"error: {type(e).__name__}: {e}"
+    return {
+        'version': VERSION_REGISTRO,
+        'nombre': nombre,
+        'semilla': juego.semilla,
+        'respuestas': respuestas,
+        'eventos': huella.eventos,
+        'huella': huella.hexdigest(),
+        'fin': fin,
+    }
+
+def grabar_partida(nombre="Héroe", semilla=None, entrada=input, salida=print):
+    """Partida interactiva que se graba; termina con EOF o Ctrl+C. Retorna el registro."""
+    def responder(pregunta):
+        try:
+            return entrada(pregunta)
+        except (EOFError, KeyboardInterrupt):
+            return None
+    return _jugar_registro(nombre, semilla, responder, salida)
+
+def reproducir_partida(registro):
+    """
+    Repite `registro` sin E/S. Retorna el registro obtenido con 'coincide'
+    (misma huella, mismos eventos y mismo final que el original).
+    """
+    respuestas = iter(registro['respuestas'])
+    obtenido = _jugar_registro(registro['nombre'], registro['semilla'], lambda pregunta: next(respuestas, None))
+    obtenido['coincide'] = all(obtenido[k] == registro[k] for k in ('huella', 'eventos', 'fin'))
+    return obtenido
+
+def _reproducir_lote(args):
+    inicio, registros = args
+    discrepancias = []
+    respuestas = eventos = 0
+    for indice, registro in enumerate(registros, inicio):
+        obtenido = reproducir_partida(registro)
+        respuestas += len(obtenido['respuestas'])
+        eventos += obtenido['eventos']
+        if not obtenido['coincide']:
+            discrepancias.append(indice)
+    return discrepancias, respuestas, eventos
+
+def reproducir_lote(registros, procesos=None, tam_lote=50):
+    """
+    Repite todos los `registros` repartidos en un pool de procesos. Retorna
+    los índices que no coinciden y el rendimiento (partidas y respuestas por segundo).
+    """
+    import multiprocessing
+
+    registros = list(registros)
+    procesos = procesos or os.cpu_count() or 1
+    lotes = [(inicio, registros[inicio:inicio + tam_lote]) for inicio in range(0, len(registros), tam_lote)]
+
+    inicio = time.perf_counter()
+    discrepancias = []
+    respuestas = eventos = 0
+    if procesos == 1:
+        resultados = map(_reproducir_lote, lotes)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(procesos)
+        resultados = pool.imap_unordered(_reproducir_lote, lotes)
+    try:
+        for d, r, e in resultados:
+            discrepancias.extend(d)
+            respuestas += r
+            eventos += e
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    segundos = time.perf_counter() - inicio
+
+    return {
+        'partidas': len(registros),
+        'coincidencias': len(registros) - len(discrepancias),
+        'discrepancias': sorted(discrepancias),
+        'respuestas': respuestas,
+        'eventos': eventos,
+        'procesos': procesos,
+        'segundos': segundos,
+        'partidas_por_segundo': len(registros) / segundos if segundos > 0 else 0.0,
+        'respuestas_por_segundo': respuestas / segundos if segundos > 0 else 0.0,
+    }
+
+# Respuestas del jugador aleatorio: acciones, objetivos, habilidades y menús s/n
+_RESPUESTAS_ALEATORIAS = ("A", "A", "A", "H", "D", "O", "G", "1", "1", "2", "3", "s", "n", "0")
+
+def generar_registros(n, semilla=0, max_respuestas=300):
+    """Graba `n` partidas de un jugador aleatorio (semillas derivadas de `semilla`) para el banco de regresión."""
+    registros = []
+    for indice in range(n):
+        rng = random.Random(derivar_semilla(semilla, "jugador", indice))
+        restantes = [max_respuestas]
+        def responder(pregunta):
+            restantes[0] -= 1
+            return rng.choice(_RESPUESTAS_ALEATORIAS) if restantes[0] >= 0 else None
+        registros.append(_jugar_registro(f"Bot{indice}", derivar_semilla(semilla, indice), responder))
+    return registros
+
+def leer_registros(ruta):
+    with open(ruta, encoding='utf-8') as f:
+        return [json.loads(linea) for linea in f if linea.strip()]
+
+def escribir_registros(ruta, registros, modo="w"):
+    with open(ruta, modo, encoding='utf-8') as f:
+        for registro in registros:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+# --- BANCO DE RENDIMIENTO ---
+# Microbenchmarks de las rutas calientes y de campañas completas sin interfaz.
+# Cada medida se calibra para durar al menos `tiempo_minimo`, se repite y se
+# queda con el mínimo (el menos afectado por el ruido), con el recolector de
+# basura parado como en timeit. Si la operación necesita reiniciar estado, se
+# reinicia cada `cada` llamadas y ese coste se mide aparte y se descuenta. El
+# resultado es un dict serializable a JSON con los metadatos de la ejecución,
+# comparable con una línea base guardada. En máquinas compartidas un mismo
+# bucle puede variar un 20-60 % entre segundos: cada ejecución estima ese
+# ruido con un bucle fijo y la comparación no marca cambios menores que él.
+
+VERSION_BENCHMARK = 1
+UNIDADES_MAYOR_MEJOR = ('/s',)
+
+def _bucle_referencia():
+    """Microsegundos del mejor de 5 recorridos de un bucle fijo."""
+    mejor = float('inf')
+    for _ in range(5):
+        inicio = time.perf_counter()
+        total = 0
+        for i in range(50_000):
+            total += i
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1e6
+
+def _cronometrar(operacion, reiniciar=None, cada=1, repeticiones=5, tiempo_minimo=0.05):
+    """
+    Microsegundos por llamada a `operacion()`. Si se da `reiniciar`, se llama
+    antes de cada grupo de `cada` operaciones y su coste no se cuenta.
+    """
+    import gc
+
+    def medir(funcion, veces):
+        n = 1
+        while True:
+            inicio = time.perf_counter()
+            for _ in range(n):
+                funcion()
+            if time.perf_counter() - inicio >= tiempo_minimo:
+                break
+            n *= 2
+        mejor = float('inf')
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            for _ in range(n):
+                funcion()
+            mejor = min(mejor, time.perf_counter() - inicio)
+        return mejor / (n * veces) * 1e6
+
+    recolector = gc.isenabled()
+    gc.disable()
+    try:
+        if reiniciar is None:
+            return medir(operacion, 1)
+
+        def grupo():
+            reiniciar()
+            for _ in range(cada):
+                operacion()
+        return max(0.0, medir(grupo, cada) - medir(reiniciar, cada))
+    finally:
+        if recolector:
+            gc.enable()
+
+def _ruido_maquina(grupos=10):
+    """Variación relativa (máximo / mínimo - 1) del bucle de referencia entre `grupos` mediciones."""
+    tiempos = []
+    for _ in range(grupos):
+        tiempos.append(_bucle_referencia())
+        time.sleep(0.05)
+    return max(tiempos) / min(tiempos) - 1.0
+
+def _combate_de_banco(nivel, n_enemigos, consola=False, vida=None):
+    """
+    Juego, EstadoCombate y función que lo devuelve a su instantánea inicial.
+    Con `vida`, héroe y enemigos la tienen (nadie muere durante un grupo de
+    operaciones) y el héroe tiene ese maná.
+    """
+    juego = Juego(heroe_de_nivel(nivel, "Banco"), semilla=nivel, consola=consola, salida=lambda *a: None)
+    juego.archivo_guardado = None
+    rng = juego.rng
+    enemigos = [FabricaEnemigos.crear_enemigo(nivel, juego.jugador.elemento, rng) for _ in range(n_enemigos)]
+    if vida:
+        for combatiente in enemigos + [juego.jugador]:
+            combatiente.vida = vida
+        juego.jugador.mana = vida
+    combate = juego.combate = EstadoCombate(enemigos, rng, juego.jugador)
+    origen = combate.instantanea()
+    return juego, combate, lambda: combate.restaurar(origen, rng=False)
+
+def ejecutar_benchmark(repeticiones=5, tiempo_minimo=0.05, campanas=200, semilla=0):
+    """
+    Mide habilidades, turno enemigo, estados, subidas de nivel, generación de
+    enemigos, guardado/carga y campañas. Retorna {'metadatos': {...},
+    'resultados': {nombre: {'valor': x, 'unidad': u}}}; en las unidades de
+    UNIDADES_MAYOR_MEJOR más es mejor, en el resto (us, ms, bytes) menos.
+    """
+    import platform
+    import tempfile
+    import contextlib
+
+    inicio_total = time.perf_counter()
+    ruido = _ruido_maquina()
+    resultados = {}
+
+    def medida(nombre, valor, unidad="us"):
+        resultados[nombre] = {'valor': valor, 'unidad': unidad}
+
+    def cronometrar(operacion, reiniciar=None, cada=1):
+        return _cronometrar(operacion, reiniciar, cada, repeticiones, tiempo_minimo)
+
+    # Habilidades: un lanzamiento sobre 3 enemigos (se reinicia cada 50 para no apilar buffs)
+    juego, combate, reiniciar = _combate_de_banco(8, 3, vida=10 ** 9)
+    jugador = juego.jugador
+    for nombre, hab in HABILIDADES.items():
+        objetivo = 0 if hab.objetivo == OBJETIVO_UNO else None
+        medida(f"habilidad.{nombre}",
+               cronometrar(lambda n=nombre, o=objetivo: jugador.usar_habilidad(n, combate.enemigos, o), reiniciar, 50))
+
+    # Turno enemigo con 4 enemigos, sin eventos y con la consola formateando los mensajes
+    for modo, consola in (('silencioso', False), ('consola', True)):
+        juego, combate, reiniciar = _combate_de_banco(8, 4, consola, vida=10 ** 9)
+        medida(f"turno_enemigos.{modo}",
+               cronometrar(lambda j=juego, c=combate: j.turno_enemigos(c.enemigos), reiniciar, 50))
+
+    # Estados: un turno de procesar_estados con 3 y con 50 estados activos (duran 1000 turnos)
+    for n_estados in (3, 50):
+        juego, combate, _ = _combate_de_banco(8, 1, vida=10 ** 9)
+        enemigo = combate.enemigos[0]
+        enemigo.aplicar_estado('stun', {'stun': True, 'turnos': 1000})
+        for i in range(1, n_estados):
+            enemigo.aplicar_estado(f"estado_{i}", {'dmg': 1, 'turnos': 1000})
+        origen = combate.instantanea()
+        reiniciar = lambda c=combate, o=origen: c.restaurar(o, rng=False)
+        medida(f"procesar_estados.{n_estados}", cronometrar(lambda e=enemigo: e.procesar_estados(True), reiniciar, 500))
+        medida(f"procesar_estados.{n_estados}_eventos",
+               cronometrar(lambda e=enemigo: e.procesar_estados(False), reiniciar, 500))
+
+    # Subida de nivel: cadena de 100 niveles con toda la XP de golpe, por nivel
+    xp_cadena = sum(n * XP_POR_NIVEL_BASE for n in range(1, 101))
+    heroe = {}
+
+    def crear_heroe():
+        heroe['p'] = Personaje("Banco", rng=random.Random(0))
+        heroe['p'].xp = xp_cadena
+    medida("subir_nivel.por_nivel", cronometrar(lambda: heroe['p'].subir_nivel(), crear_heroe) / 100)
+
+    # Generación de enemigos
+    rng = FlujoAleatorio(semilla)
+    reciclar = FabricaEnemigos.reciclar
+    medida("enemigos.fabrica", 1e6 / cronometrar(
+        lambda: reciclar((FabricaEnemigos.crear_enemigo(5, Elemento.TIEMPO, rng),))), "enemigos/s")
+    medida("enemigos.alias", 1e6 / cronometrar(
+        lambda: reciclar((GENERADOR_ENCUENTROS.crear(5, Elemento.TIEMPO, rng),))), "enemigos/s")
+    if HAS_NUMPY:
+        generador = np.random.default_rng(semilla)
+        medida("enemigos.lote_np", 1e6 * 100_000 / cronometrar(
+            lambda: GENERADOR_ENCUENTROS.lote_np(100_000, 5, Elemento.TIEMPO, generador)), "enemigos/s")
+
+    # Botín de una batalla de 3 enemigos (tablas del contenido activo), en vivo y en lote
+    enemigos = GENERADOR_ENCUENTROS.oleada(5, Elemento.TIEMPO, rng)[:3]
+    medida("botin.batalla", 1e6 / cronometrar(lambda: BOTIN.botin(enemigos, rng)), "batallas/s")
+    medida("botin.lote", 1e6 * 10_000 / cronometrar(lambda: BOTIN.lote_batallas(10_000, enemigos, rng)), "batallas/s")
+    if HAS_NUMPY:
+        medida("botin.lote_np", 1e6 * 100_000 / cronometrar(
+            lambda: BOTIN.lote_batallas(100_000, enemigos, generador=generador)), "batallas/s")
+
+    # Guardado y carga de una partida a media batalla
+    juego, combate, _ = _combate_de_banco(8, 3)
+    juego.logros = ["Maestro del Tiempo"]
+    with tempfile.TemporaryDirectory() as carpeta, open(os.devnull, "w") as nulo:
+        for formato in ("binario", "json"):
+            juego.archivo_guardado = os.path.join(carpeta, f"banco.{formato}")
+            medida(f"guardado.{formato}.guardar", cronometrar(lambda f=formato: juego.guardar_progreso(f)) / 1000, "ms")
+            with contextlib.redirect_stdout(nulo):
+                medida(f"guardado.{formato}.cargar",
+                       cronometrar(lambda r=juego.archivo_guardado: Juego.cargar_progreso(r)) / 1000, "ms")
+            medida(f"guardado.{formato}.tamano", os.path.getsize(juego.archivo_guardado), "bytes")
+
+    # Campañas de 10 batallas sin interfaz (política codiciosa, héroe nuevo)
+    base = Personaje("Simulado").to_dict()
+    batallas = 0
+    inicio = time.perf_counter()
+    for indice in range(campanas):
+        juego = Juego(Personaje.from_dict(base), semilla=derivar_semilla(semilla, indice), consola=False)
+        ganadas, _ = juego.simular_campana(politica_codiciosa)
+        batallas += ganadas + (ganadas < 10)
+    segundos = time.perf_counter() - inicio
+    medida("campana.campanas", campanas / segundos, "campañas/s")
+    medida("campana.batallas", batallas / segundos, "batallas/s")
+
+    return {
+        'metadatos': {
+            'version_benchmark': VERSION_BENCHMARK,
+            'version_codigo': version_codigo(),
+            'fecha': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'python': f"{platform.python_implementation()} {platform.python_version()}",
+            'sistema': platform.platform(),
+            'procesador': platform.processor() or platform.machine(),
+            'cpus': os.cpu_count(),
+            'numpy': np.__version__ if HAS_NUMPY else None,
+            'repeticiones': repeticiones,
+            'tiempo_minimo': tiempo_minimo,
+            'campanas': campanas,
+            'ruido': max(ruido, _ruido_maquina()),
+            'segundos': time.perf_counter() - inicio_total,
+        },
+        'resultados': resultados,
+    }
+
+def comparar_benchmark(actual, base, umbral=0.15):
+    """
+    Compara dos resultados de ejecutar_benchmark. Retorna el cambio relativo
+    de cada métrica común (positivo es peor: +0.2 = 20 % más lento o más
+    grande) y las métricas que empeoran o mejoran más de `umbral`, o del
+    ruido medido en cualquiera de las dos ejecuciones si es mayor.
+    """
+    umbral = max(umbral, actual['metadatos'].get('ruido', 0.0), base['metadatos'].get('ruido', 0.0))
+
+    def coste(medida):
+        """Valor en el que menos es mejor."""
+        if any(medida['unidad'].endswith(u) for u in UNIDADES_MAYOR_MEJOR):
+            return 1.0 / medida['valor']
+        return medida['valor']
+
+    cambios = {}
+    for nombre, medida in actual['resultados'].items():
+        anterior = base['resultados'].get(nombre)
+        if not anterior or anterior['unidad'] != medida['unidad'] or not anterior['valor'] or not medida['valor']:
+            continue
+        cambios[nombre] = coste(medida) / coste(anterior) - 1.0
+    return {
+        'cambios': cambios,
+        'regresiones': sorted(n for n, c in cambios.items() if c > umbral),
+        'mejoras': sorted(n for n, c in cambios.items() if c < -umbral),
+        'umbral': umbral,
+    }
+
+# --contenido PAQUETE.json[,OTRO.json] delante de cualquier otra opción: juega con esos paquetes
+paquete_cli = None
+if __name__ == "__main__" and len(sys.argv) > 2 and sys.argv[1] == "--contenido":
+    paquete_cli = PaqueteContenido(sys.argv[2].split(","))
+    paquete_cli.cargar()
+    del sys.argv[1:3]
+
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] in ("--compilar-contenido", "--exportar-contenido"):
+    # --compilar-contenido PAQUETE.json [...]   /   --exportar-contenido RUTA.json (el contenido por defecto)
+    if sys.argv[1] == "--exportar-contenido":
+        escribir_atomico(sys.argv[2], serializar_guardado(CONTENIDO_BASE, "json"))
+    else:
+        paquete = PaqueteContenido(sys.argv[2:])
+        compilado = paquete.cargar()
+        print(json.dumps({
+            'huella': paquete.huella,
+            'desde_cache': paquete.desde_cache,
+            'ms': paquete.segundos * 1000,
+            'tipos_enemigo': len(compilado['tipos']),
+            'habilidades': len(compilado['costos']),
+            'tablas_botin': len(compilado['botin']['tablas']),
+        }, indent=2))
+    sys.exit(0)
+
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] == "--simular":
+    n_batallas = int(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[2].isdigit() else 10000
+    if "--vectorizado" in sys.argv:
+        resumen = simular_batallas_vectorizado(n_batallas)
+    else:
+        resumen = simular_batallas(n_batallas)
+    print(json.dumps({k: v for k, v in resumen.items() if k not in ('turnos', 'vida_restante')}, indent=2))
+    print(f"Turnos medios: {resumen['turnos']['media']:.2f} | Vida restante media: {resumen['vida_restante']['media']:.2f}")
+    sys.exit(0)
+
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+    # --benchmark [salida.json] [base.json] [umbral]: sale con 1 si alguna métrica empeora más que el umbral
+    resultado = ejecutar_benchmark()
+    with open(sys.argv[2] if len(sys.argv) > 2 else "benchmark.json", "w", encoding='utf-8') as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    comparacion = None
+    if len(sys.argv) > 3:
+        with open(sys.argv[3], encoding='utf-8') as f:
+            comparacion = comparar_benchmark(resultado, json.load(f), float(sys.argv[4]) if len(sys.argv) > 4 else 0.15)
+    for nombre, medida in resultado['resultados'].items():
+        linea = f"{nombre:<42} {medida['valor']:>14,.2f} {medida['unidad']}"
+        if comparacion and nombre in comparacion['cambios']:
+            cambio = comparacion['cambios'][nombre]
+            linea += f"  {cambio:+.1%}" + ("  REGRESIÓN" if nombre in comparacion['regresiones'] else "")
+        print(linea)
+    print(f"{resultado['metadatos']['segundos']:.1f} s, ruido de la máquina {resultado['metadatos']['ruido']:.0%}"
+          + (f", umbral {comparacion['umbral']:.0%}" if comparacion else ""))
+    sys.exit(1 if comparacion and comparacion['regresiones'] else 0)
+
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] == "--ia":
+    # --ia [batallas] [nivel]: compara el MCTS con las políticas aleatoria y codiciosa
+    n_batallas = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    nivel = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    print(json.dumps(comparar_politicas(n_batallas, nivel), indent=2))
+    sys.exit(0)
+
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] == "--barrido":
+    # --barrido ESPACIO.json [campañas] [procesos]. ESPACIO es una rejilla {constante: [valores]}
+    # o {"aleatorio": N, "semilla": S, "espacio": {constante: [valores] | {"min": a, "max": b}}}
+    with open(sys.argv[2], encoding='utf-8') as f:
+        espacio = json.load(f)
+    if 'aleatorio' in espacio:
+        puntos = muestreo_parametros(espacio['espacio'], espacio['aleatorio'], espacio.get('semilla', 0))
+    else:
+        puntos = rejilla_parametros(espacio)
+    campanas = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    procesos = int(sys.argv[4]) if len(sys.argv) > 4 else None
+    resultados = barrido_parametros(puntos, campanas, procesos=procesos,
+                                    progreso=lambda h, t: print(f"\r{h}/{t} puntos nuevos", end="", flush=True))
+    print()
+    for punto, r in sorted(resultados, key=lambda x: (-x[1]['tasa_completa'], -x[1]['batallas_ganadas'])):
+        print(f"{r['tasa_completa']:.3f} completas | {r['batallas_ganadas']:.2f} ganadas | "
+              f"{r['tasa_victoria']:.3f} por batalla | nivel {r['nivel_final']:.2f} | {json.dumps(punto)}")
+    sys.exit(0)
+
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] == "--verificar-encuentros":
+    # --verificar-encuentros [enemigos] [nivel]: chi-cuadrado de FabricaEnemigos y GeneradorEncuentros
+    resultado = verificar_generador(int(sys.argv[2]) if len(sys.argv) > 2 else 200_000,
+                                    int(sys.argv[3]) if len(sys.argv) > 3 else 3)
+    print(json.dumps(resultado, indent=2))
+    sys.exit(0 if min(resultado['actual']['p_valor'], resultado['alias']['p_valor']) > 0.001 else 1)
+
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] == "--exacto":
+    # --exacto [nivel] [semilla]: probabilidad exacta de victoria (política codiciosa) de una batalla
+    nivel = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    juego = Juego(heroe_de_nivel(nivel), semilla=int(sys.argv[3]) if len(sys.argv) > 3 else 0, consola=False)
+    rng = juego.rng
+    enemigos = [FabricaEnemigos.crear_enemigo(nivel, juego.jugador.elemento, rng) for _ in range(rng.randint(2, 4))]
+    print(", ".join(f"{e.nombre} ({e.vida} HP)" for e in enemigos))
+    print(json.dumps(CalculadoraVictoria().calcular(juego, combate=EstadoCombate(enemigos, rng, juego.jugador)), indent=2))
+    sys.exit(0)
+
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] in ("--servidor", "--prueba-carga"):
+    # --servidor [puerto | ruta de socket Unix] [procesos] [perfil.prom [muestreo]] [--memoria BYTES[K|M|G]]
+    # --prueba-carga N [puerto | ruta] [pausa]
+    if sys.argv[1] == "--servidor":
+        presupuesto = None
+        if "--memoria" in sys.argv[2:]:
+            i = sys.argv.index("--memoria")
+            valor = sys.argv[i + 1].upper() if len(sys.argv) > i + 1 else ""
+            escala = 1024 ** ("KMG".index(valor[-1]) + 1) if valor[-1:] in ("K", "M", "G") else 1
+            try:
+                presupuesto = int(float(valor.rstrip("KMG")) * escala)
+            except ValueError:
+                sys.exit("--memoria necesita un tamaño en bytes (se admiten K, M y G).")
+            del sys.argv[i:i + 2]
+        destino = sys.argv[2] if len(sys.argv) > 2 else "8765"
+        unix = None if destino.isdigit() else destino
+        procesos = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+        if procesos:
+            # El perfilado y el presupuesto de memoria viven en el proceso de las sesiones
+            if len(sys.argv) > 4 or presupuesto is not None:
+                sys.exit("El perfil de turnos y --memoria solo funcionan sin procesos trabajadores.")
+            servidor = AnfitrionMultiproceso(procesos, semilla=0, contenido=paquete_cli)
+        elif len(sys.argv) > 4:
+            perfil = Perfilador(int(sys.argv[5]) if len(sys.argv) > 5 else 1)
+            servidor = ServidorJuego(semilla=0, perfil=perfil, ruta_perfil=sys.argv[4], contenido=paquete_cli,
+                                     presupuesto_memoria=presupuesto)
+        else:
+            servidor = ServidorJuego(semilla=0, contenido=paquete_cli, presupuesto_memoria=presupuesto)
+        asyncio.run(servidor.servir(puerto=int(destino) if destino.isdigit() else 8765, unix=unix))
+    else:
+        n_sesiones = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+        destino = sys.argv[3] if len(sys.argv) > 3 else "8765"
+        unix = None if destino.isdigit() else destino
+        pausa = float(sys.argv[4]) if len(sys.argv) > 4 else 0.0
+        resumen = asyncio.run(prueba_carga(n_sesiones, puerto=int(destino) if destino.isdigit() else 8765, unix=unix, pausa=pausa))
+        print(json.dumps(resumen, indent=2))
+    sys.exit(0)
+
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] in ("--grabar", "--reproducir", "--generar-registros"):
+    # --grabar ARCHIVO [nombre] [semilla]   /   --reproducir ARCHIVO [procesos]   /   --generar-registros N ARCHIVO [semilla]
+    if sys.argv[1] == "--grabar":
+        nombre = sys.argv[3] if len(sys.argv) > 3 else input("Nombre de tu héroe: ")
+        semilla = int(sys.argv[4]) if len(sys.argv) > 4 else None
+        registro = grabar_partida(nombre, semilla)
+        escribir_registros(sys.argv[2], [registro], modo="a")
+        print(f"\nPartida grabada: {len(registro['respuestas'])} respuestas, {registro['eventos']} eventos.")
+    elif sys.argv[1] == "--reproducir":
+        procesos = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        resumen = reproducir_lote(leer_registros(sys.argv[2]), procesos)
+        print(json.dumps(resumen, indent=2))
+        sys.exit(1 if resumen['discrepancias'] else 0)
+    else:
+        semilla = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+        escribir_registros(sys.argv[3], generar_registros(int(sys.argv[2]), semilla))
+    sys.exit(0)
 
-            if self.nivel_actual < total_niveles:
-                self.evento_aleatorio()
-                if self.jugador.vida <= 0:
-                    print("\n--- FIN DEL JUEGO ---")
-                    break
-        
-        if self.jugador.vida > 0:
-            print("\n¡Felicidades! ¡Has completado todos los niveles de Chrono Tactics!")
-            
 if __name__ == "__main__":
     juego = None
-    archivo_guardado = "progreso_guardado.pkl"
+    archivo_guardado = ARCHIVO_GUARDADO
+    # Partidas antiguas: JSON en progreso_guardado.pkl
+    if not os.path.exists(archivo_guardado) and os.path.exists("progreso_guardado.pkl"):
+        archivo_guardado = "progreso_guardado.pkl"
     if os.path.exists(archivo_guardado):
         opcion = input("Se encontró una partida guardada. ¿Deseas cargarla? (s/n): ").lower()
         if opcion == 's':
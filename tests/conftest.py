@@ -0,0 +1,16 @@
+"""
+El juego es un único script con espacios en el nombre: se carga por ruta y
+se registra como el módulo `estrategia` para que las pruebas lo importen
+(y los procesos hijos lo encuentren al deserializar funciones).
+"""
+import importlib.util
+import sys
+from pathlib import Path
+
+_RUTA = Path(__file__).resolve().parent.parent / "Estrategia por turnos.py"
+
+if "estrategia" not in sys.modules:
+    _spec = importlib.util.spec_from_file_location("estrategia", _RUTA)
+    _modulo = importlib.util.module_from_spec(_spec)
+    sys.modules["estrategia"] = _modulo
+    _spec.loader.exec_module(_modulo)
@@ -0,0 +1,75 @@
+"""Flujos aleatorios reproducibles (FlujoAleatorio y derivar_semilla)."""
+import pickle
+import random
+
+import estrategia
+
+
+def _tiradas(rng, n=20):
+    return [rng.random() for _ in range(n)]
+
+
+def test_misma_semilla_misma_secuencia():
+    assert _tiradas(estrategia.FlujoAleatorio(42)) == _tiradas(estrategia.FlujoAleatorio(42))
+    assert _tiradas(estrategia.FlujoAleatorio(42)) != _tiradas(estrategia.FlujoAleatorio(43))
+
+
+def test_sin_semilla_elige_una_y_la_conserva():
+    rng = estrategia.FlujoAleatorio()
+    assert isinstance(rng.semilla, int)
+    assert _tiradas(estrategia.FlujoAleatorio(rng.semilla)) == _tiradas(rng)
+
+
+def test_derivar_depende_solo_de_semilla_y_claves():
+    padre = estrategia.FlujoAleatorio(7)
+    hijo = padre.derivar('batalla', 3)
+    _tiradas(padre, 100)
+    # Consumir el padre no cambia a los hijos que se deriven después
+    assert _tiradas(padre.derivar('batalla', 3)) == _tiradas(hijo)
+    assert hijo.semilla == estrategia.derivar_semilla(7, 'batalla', 3)
+    assert padre.derivar('batalla', 4).semilla != hijo.semilla
+
+
+def test_dividir_da_flujos_distintos():
+    flujos = estrategia.FlujoAleatorio(1).dividir(4)
+    assert [f.semilla for f in flujos] == [estrategia.derivar_semilla(1, i) for i in range(4)]
+    assert len({tuple(_tiradas(f, 5)) for f in flujos}) == 4
+
+
+def test_independiente_del_modulo_random():
+    a, b = estrategia.FlujoAleatorio(9), estrategia.FlujoAleatorio(9)
+    primeras = _tiradas(a, 5)
+    random.seed(0)
+    random.random()
+    assert _tiradas(b, 5) == primeras
+
+
+def test_serializar_conserva_semilla_y_estado():
+    rng = estrategia.FlujoAleatorio(11)
+    _tiradas(rng, 3)
+    copia = pickle.loads(pickle.dumps(rng))
+    assert copia.semilla == 11
+    assert _tiradas(copia) == _tiradas(rng)
+
+
+def test_oleada_de_un_nivel_no_depende_de_lo_jugado_antes():
+    def oleada(juego, nivel):
+        enemigos = juego.generar_oleada(juego.rng.derivar('batalla', nivel))
+        return [e.to_dict() for e in enemigos]
+
+    juego = estrategia.Juego(estrategia.heroe_de_nivel(3), semilla=5, consola=False)
+    esperado = oleada(juego, 3)
+    otro = estrategia.Juego(estrategia.heroe_de_nivel(3), semilla=5, consola=False)
+    otro.simular_campana(estrategia.politica_codiciosa, batallas=1)
+    otro.jugador = estrategia.heroe_de_nivel(3)
+    assert oleada(otro, 3) == esperado
+
+
+def test_campanas_con_la_misma_semilla_son_identicas():
+    def campana():
+        random.random()
+        juego = estrategia.Juego(estrategia.heroe_de_nivel(1), semilla=21, consola=False)
+        resultado = juego.simular_campana(estrategia.politica_codiciosa, batallas=5)
+        return resultado, juego.jugador.to_dict()
+
+    assert campana() == campana()
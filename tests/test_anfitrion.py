@@ -0,0 +1,98 @@
+"""Anfitrión multiproceso: reparto de sesiones, traslados y trabajadores caídos."""
+import asyncio
+import json
+import os
+import signal
+
+import pytest
+
+import estrategia
+
+
+def responder(pregunta):
+    if "Número de enemigo" in pregunta:
+        return "1"
+    if "Acción" in pregunta:
+        return "A"
+    return "0" if "Elige" in pregunta else "n"
+
+
+async def cliente(puerto, nombre, interrupcion=None, en_paso=3, limite=3000):
+    """Juega una partida; tras `en_paso` respuestas espera a `interrupcion()`."""
+    lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+    textos = []
+    try:
+        for paso in range(limite):
+            mensaje = json.loads(await lector.readline())
+            textos.append(mensaje['texto'])
+            if mensaje.get('fin'):
+                return textos
+            if paso == 0:
+                respuesta = nombre
+            else:
+                respuesta = responder(mensaje['pregunta'])
+                if interrupcion is not None and paso == en_paso:
+                    await interrupcion()
+            escritor.write((respuesta + "\n").encode('utf-8'))
+            await escritor.drain()
+    finally:
+        escritor.close()
+    raise AssertionError("la partida no terminó")
+
+
+def servir(servidor, *clientes):
+    async def principal():
+        await servidor.iniciar(puerto=0)
+        puerto = servidor.servidor.sockets[0].getsockname()[1]
+        try:
+            return await asyncio.gather(*(c(puerto) for c in clientes))
+        finally:
+            servidor.servidor.close()
+            await servidor.servidor.wait_closed()
+            servidor.detener()
+    return asyncio.run(principal())
+
+
+NOMBRES = ("Aria", "Bruno", "Cora")
+
+
+@pytest.fixture(scope="module")
+def referencia():
+    """Transcripciones de las mismas partidas en el servidor de un proceso."""
+    return servir(estrategia.ServidorJuego(semilla=3), *(lambda p, n=n: cliente(p, n) for n in NOMBRES))
+
+
+def test_mismas_partidas_que_en_un_proceso(referencia):
+    anfitrion = estrategia.AnfitrionMultiproceso(2, semilla=3)
+    assert servir(anfitrion, *(lambda p, n=n: cliente(p, n) for n in NOMBRES)) == referencia
+    assert anfitrion.dueno == {} and anfitrion.reinicios == 0
+
+
+def test_trabajador_caido_se_relanza_y_reanuda(referencia):
+    anfitrion = estrategia.AnfitrionMultiproceso(2, semilla=3)
+
+    async def matar_trabajador():
+        proceso, _ = anfitrion.trabajadores[anfitrion.dueno[1]]
+        os.kill(proceso.pid, signal.SIGKILL)
+        for _ in range(500):
+            if anfitrion.reinicios:
+                break
+            await asyncio.sleep(0.01)
+
+    resultado = servir(anfitrion, lambda p: cliente(p, "Aria", matar_trabajador))
+    assert anfitrion.reinicios == 1
+    assert resultado == referencia[:1]
+
+
+def test_sesion_trasladada_sigue_igual(referencia):
+    anfitrion = estrategia.AnfitrionMultiproceso(2, semilla=3)
+    movida = []
+
+    async def mover():
+        origen = anfitrion.dueno[1]
+        movida.append(await anfitrion.mover(1, 1 - origen))
+        movida.append(anfitrion.dueno[1] != origen)
+
+    resultado = servir(anfitrion, lambda p: cliente(p, "Aria", mover))
+    assert movida == [True, True]
+    assert resultado == referencia[:1]
@@ -0,0 +1,131 @@
+"""Autoguardado en segundo plano."""
+import subprocess
+import sys
+import threading
+
+import estrategia
+
+
+def _datos(nombre="Aria", xp=0):
+    jugador = estrategia.Personaje(nombre)
+    jugador.xp = xp
+    return estrategia.Juego(jugador, semilla=0, consola=False).to_dict()
+
+
+def _leer(ruta):
+    return estrategia.leer_guardado(str(ruta))
+
+
+def test_rafaga_se_escribe_una_sola_vez(tmp_path, monkeypatch):
+    ruta = str(tmp_path / "partida.sav")
+    escribiendo, seguir = threading.Event(), threading.Event()
+    escribir = estrategia.escribir_guardado
+
+    def escribir_lento(destino, datos, formato="binario"):
+        escribiendo.set()
+        seguir.wait(5)
+        escribir(destino, datos, formato)
+
+    monkeypatch.setattr(estrategia, 'escribir_guardado', escribir_lento)
+    autoguardado = estrategia.AutoGuardado()
+    try:
+        autoguardado.solicitar(ruta, _datos(xp=1))
+        assert escribiendo.wait(5)
+        # Mientras se escribe la primera, las siguientes se sustituyen entre sí
+        for xp in range(2, 7):
+            autoguardado.solicitar(ruta, _datos(xp=xp))
+        seguir.set()
+        autoguardado.esperar()
+        assert autoguardado.escrituras == 2
+        assert _leer(ruta)['jugador']['xp'] == 6
+    finally:
+        seguir.set()
+        autoguardado.cerrar()
+
+
+def test_partidas_distintas_no_se_pisan(tmp_path):
+    autoguardado = estrategia.AutoGuardado()
+    ruta_a, ruta_b = str(tmp_path / "a.sav"), str(tmp_path / "b.sav")
+    autoguardado.solicitar(ruta_a, _datos("Aria", 1))
+    autoguardado.solicitar(ruta_b, _datos("Bruno", 2))
+    autoguardado.cerrar()
+    assert _leer(ruta_a)['jugador']['nombre'] == "Aria"
+    assert _leer(ruta_b)['jugador']['xp'] == 2
+
+
+def test_cerrar_escribe_lo_pendiente(tmp_path):
+    ruta = str(tmp_path / "partida.sav")
+    autoguardado = estrategia.AutoGuardado()
+    autoguardado.solicitar(ruta, _datos(xp=9))
+    autoguardado.cerrar()
+    assert _leer(ruta)['jugador']['xp'] == 9
+
+
+def test_se_escribe_al_salir_del_interprete(tmp_path):
+    ruta = tmp_path / "partida.sav"
+    programa = f"""
+import importlib.util, sys
+spec = importlib.util.spec_from_file_location("estrategia", {estrategia.__file__!r})
+m = importlib.util.module_from_spec(spec); sys.modules["estrategia"] = m; spec.loader.exec_module(m)
+jugador = m.Personaje("Aria"); jugador.xp = 77
+juego = m.Juego(jugador, semilla=0, consola=False)
+juego.archivo_guardado = {str(ruta)!r}
+assert juego.autoguardar()
+"""
+    subprocess.run([sys.executable, "-c", programa], check=True, timeout=60)
+    assert _leer(ruta)['jugador']['xp'] == 77
+
+
+def test_error_de_escritura_se_avisa_una_vez(tmp_path):
+    textos = []
+    juego = estrategia.Juego(estrategia.Personaje("Aria"), semilla=0, consola=False, salida=textos.append)
+    juego.archivo_guardado = str(tmp_path / "no_existe" / "partida.sav")
+    juego.autoguardado = estrategia.AutoGuardado()
+    try:
+        juego.autoguardar()
+        juego.autoguardado.esperar()
+        assert juego.avisar_error_guardado()
+        assert textos and textos[-1].startswith("Error al guardar el progreso")
+        assert not juego.avisar_error_guardado()
+    finally:
+        juego.autoguardado.cerrar()
+
+
+def test_las_partidas_comparten_un_escritor(tmp_path):
+    juegos = [estrategia.Juego(estrategia.Personaje(n), semilla=0, consola=False) for n in ("Aria", "Bruno")]
+    for juego in juegos:
+        juego.archivo_guardado = str(tmp_path / f"{juego.jugador.nombre}.sav")
+        assert juego.autoguardar()
+    assert juegos[0].autoguardado is juegos[1].autoguardado is estrategia.autoguardado_compartido()
+    juegos[0].autoguardado.esperar()
+    assert _leer(tmp_path / "Bruno.sav")['jugador']['nombre'] == "Bruno"
+
+
+def test_sin_destino_no_se_guarda():
+    juego = estrategia.Juego(estrategia.Personaje("Aria"), semilla=0, consola=False)
+    juego.archivo_guardado = None
+    assert not juego.autoguardar()
+    assert juego.autoguardado is None
+
+
+def test_guardado_tras_una_victoria_apunta_al_nivel_siguiente(tmp_path):
+    juego = estrategia.Juego(estrategia.heroe_de_nivel(8, "Aria"), semilla=3, consola=False)
+    juego.archivo_guardado = str(tmp_path / "partida.sav")
+    flujo = juego.flujo_iniciar(bienvenida=False)
+    pregunta = next(flujo)
+    # Se juega hasta la primera pregunta tras ganar el nivel 1 (talentos,
+    # evento aleatorio o la batalla siguiente): ahí la partida puede cerrarse
+    while juego.nivel_actual == 1:
+        if "Número de enemigo" in pregunta:
+            respuesta = "1"
+        elif "Acción" in pregunta:
+            respuesta = "A"
+        else:
+            respuesta = "n"
+        pregunta = flujo.send(respuesta)
+    juego.autoguardado.esperar()
+
+    cargado = estrategia.Juego.cargar_progreso(juego.archivo_guardado, salida=lambda texto: None)
+    assert cargado.nivel_actual == 2
+    assert cargado.combate is None
+    assert cargado.jugador.xp == juego.jugador.xp
@@ -0,0 +1,77 @@
+"""Barrido de parámetros de balance y su caché SQLite."""
+import pytest
+
+import estrategia
+
+
+def _sin_tiempos(resultados):
+    return [(punto, {k: v for k, v in r.items() if k != 'segundos'}) for punto, r in resultados]
+
+
+def test_aplicar_parametros_y_restaurar():
+    original = estrategia.CRIT_CHANCE
+    anteriores = estrategia.aplicar_parametros({'CRIT_CHANCE': 0.5})
+    try:
+        assert estrategia.CRIT_CHANCE == 0.5
+    finally:
+        estrategia.aplicar_parametros(anteriores)
+    assert estrategia.CRIT_CHANCE == original
+    with pytest.raises(ValueError, match="NO_EXISTE"):
+        estrategia.aplicar_parametros({'NO_EXISTE': 1})
+
+
+def test_rejilla_y_muestreo():
+    rejilla = estrategia.rejilla_parametros({'PROB_JEFE': [0.0, 0.1], 'CRIT_MULT': [1.5, 2.0, 3.0]})
+    assert len(rejilla) == 6
+    assert {'CRIT_MULT': 3.0, 'PROB_JEFE': 0.1} in rejilla
+
+    espacio = {'XP_POR_NIVEL_BASE': {'min': 50, 'max': 150}, 'CRIT_CHANCE': {'min': 0.0, 'max': 0.5},
+               'PROB_JEFE': [0.0, 0.2]}
+    puntos = estrategia.muestreo_parametros(espacio, 20, semilla=4)
+    assert puntos == estrategia.muestreo_parametros(espacio, 20, semilla=4)
+    for punto in puntos:
+        assert isinstance(punto['XP_POR_NIVEL_BASE'], int) and 50 <= punto['XP_POR_NIVEL_BASE'] <= 150
+        assert 0.0 <= punto['CRIT_CHANCE'] <= 0.5
+        assert punto['PROB_JEFE'] in (0.0, 0.2)
+
+
+def test_barrido_reanuda_desde_la_cache(tmp_path):
+    ruta = str(tmp_path / "barrido.db")
+    puntos = [{'ENEMY_MISS_CHANCE': 0.95}, {'ENEMY_MISS_CHANCE': 0.1}]
+    avances = []
+    primero = estrategia.barrido_parametros(puntos, campanas=4, batallas=3, procesos=1, ruta=ruta,
+                                            progreso=lambda hechos, total: avances.append((hechos, total)))
+    assert avances == [(1, 2), (2, 2)]
+    assert [p for p, _ in primero] == puntos
+    # Enemigos que casi nunca aciertan se notan en las victorias
+    assert primero[0][1]['tasa_victoria'] > primero[1][1]['tasa_victoria']
+    assert estrategia.ENEMY_MISS_CHANCE not in (0.95, 0.1)
+
+    # Repetido con un punto nuevo: solo se simula ese
+    avances.clear()
+    nuevo = {'ENEMY_MISS_CHANCE': 0.5}
+    segundo = estrategia.barrido_parametros([puntos[1], nuevo, puntos[0]], campanas=4, batallas=3, procesos=1,
+                                            ruta=ruta, progreso=lambda hechos, total: avances.append((hechos, total)))
+    assert avances == [(1, 1)]
+    assert segundo[0] == primero[1] and segundo[2] == primero[0]
+    cache = estrategia.CacheBarrido(ruta)
+    try:
+        assert len(cache) == 3
+    finally:
+        cache.cerrar()
+
+
+def test_barrido_en_varios_procesos_da_lo_mismo(tmp_path):
+    puntos = estrategia.rejilla_parametros({'PROB_JEFE': [0.0, 0.3], 'CRIT_MULT': [1.5, 2.5]})
+    uno = estrategia.barrido_parametros(puntos, campanas=3, batallas=3, procesos=1, ruta=str(tmp_path / "a.db"))
+    dos = estrategia.barrido_parametros(puntos, campanas=3, batallas=3, procesos=2, ruta=str(tmp_path / "b.db"))
+    assert _sin_tiempos(uno) == _sin_tiempos(dos)
+
+
+def test_otra_configuracion_no_reutiliza_resultados():
+    punto = {'PROB_JEFE': 0.1}
+    clave = estrategia.clave_punto(punto, 10, 5, estrategia.politica_codiciosa, 0)
+    assert clave == estrategia.clave_punto(dict(punto), 10, 5, estrategia.politica_codiciosa, 0)
+    assert clave != estrategia.clave_punto(punto, 11, 5, estrategia.politica_codiciosa, 0)
+    assert clave != estrategia.clave_punto(punto, 10, 5, estrategia.politica_aleatoria, 0)
+    assert clave != estrategia.clave_punto(punto, 10, 5, estrategia.politica_codiciosa, 1)
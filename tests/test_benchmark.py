@@ -0,0 +1,50 @@
+"""Benchmark de las rutas calientes y su comparación con una línea base."""
+import json
+
+import estrategia
+
+
+def _resultado(ruido=0.0, **medidas):
+    return {
+        'metadatos': {'ruido': ruido},
+        'resultados': {nombre: {'valor': valor, 'unidad': unidad} for nombre, (valor, unidad) in medidas.items()},
+    }
+
+
+def test_comparar_sentido_de_cada_unidad():
+    base = _resultado(turno=(10.0, "us"), enemigos=(1000.0, "enemigos/s"), tamano=(500, "bytes"))
+    actual = _resultado(turno=(13.0, "us"), enemigos=(2000.0, "enemigos/s"), tamano=(510, "bytes"))
+    comparacion = estrategia.comparar_benchmark(actual, base, umbral=0.15)
+    assert abs(comparacion['cambios']['turno'] - 0.3) < 1e-9
+    # El doble de enemigos por segundo es la mitad de coste
+    assert abs(comparacion['cambios']['enemigos'] + 0.5) < 1e-9
+    assert comparacion['regresiones'] == ["turno"]
+    assert comparacion['mejoras'] == ["enemigos"]
+
+
+def test_el_ruido_sube_el_umbral():
+    base = _resultado(turno=(10.0, "us"))
+    actual = _resultado(ruido=0.4, turno=(13.0, "us"))
+    comparacion = estrategia.comparar_benchmark(actual, base, umbral=0.15)
+    assert comparacion['umbral'] == 0.4
+    assert comparacion['regresiones'] == []
+
+
+def test_solo_se_comparan_metricas_comunes():
+    base = _resultado(turno=(10.0, "us"), cargar=(1.0, "ms"), vacio=(0.0, "us"))
+    actual = _resultado(turno=(10.0, "us"), cargar=(1000.0, "us"), nueva=(5.0, "us"), vacio=(3.0, "us"))
+    assert estrategia.comparar_benchmark(actual, base)['cambios'] == {'turno': 0.0}
+
+
+def test_ejecutar_benchmark():
+    resultado = estrategia.ejecutar_benchmark(repeticiones=1, tiempo_minimo=0.001, campanas=2)
+    metadatos = resultado['metadatos']
+    assert metadatos['version_benchmark'] == estrategia.VERSION_BENCHMARK
+    assert metadatos['campanas'] == 2 and metadatos['ruido'] >= 0.0
+    medidas = resultado['resultados']
+    assert {"turno_enemigos.silencioso", "guardado.binario.tamano", "campana.batallas"} <= set(medidas)
+    assert all(m['valor'] >= 0 for m in medidas.values())
+    # Se guarda como JSON y se compara consigo mismo sin cambios
+    copia = json.loads(json.dumps(resultado))
+    comparacion = estrategia.comparar_benchmark(resultado, copia)
+    assert comparacion['regresiones'] == comparacion['mejoras'] == []
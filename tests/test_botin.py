@@ -0,0 +1,130 @@
+"""Motor de botín: tablas compiladas, reglas, lotes y objetos esperados."""
+import math
+import random
+from types import SimpleNamespace
+
+import pytest
+
+import estrategia
+
+
+def _dropeo_antiguo(rng):
+    posible = rng.random()
+    if posible < 0.25:
+        return [('pocion', rng.choice(["Poción de Vida", "Poción de Mana"]))]
+    if posible < 0.5:
+        return [('arma', {'nombre': 'Daga Serrada', 'ataque': 3})]
+    if posible < 0.75:
+        return [('armadura', {'nombre': 'Grebas Oxidadas', 'defensa': 2})]
+    return []
+
+
+ESPADA = {'nombre': 'Espada Larga', 'ataque': 6}
+CORONA = {'nombre': 'Corona del Jefe', 'defensa': 5}
+
+PAQUETE = {'botin': {
+    'tablas': {
+        'avanzada': {'entradas': [
+            {'peso': 3, 'tipo': 'arma', 'objeto': ESPADA},
+            {'peso': 1, 'tipo': 'tabla', 'tabla': 'dropeos'},
+        ], 'tiradas': 2},
+        'jefe': {'garantizados': [{'tipo': 'armadura', 'objeto': CORONA}], 'entradas': []},
+    },
+    'reglas': [
+        {'tabla': 'avanzada', 'nivel_min': 5},
+        {'tabla': 'jefe', 'enemigo': 'Jefe'},
+    ],
+}}
+
+
+def _motor(paquete=PAQUETE):
+    estrategia.validar_paquete(paquete)
+    return estrategia.MotorBotin(estrategia.compilar_contenido(estrategia.combinar_contenido([paquete]))['botin'])
+
+
+def _enemigo(tipo, nivel):
+    return SimpleNamespace(tipo=tipo, nivel=nivel)
+
+
+def test_reproduce_el_reparto_antiguo():
+    assert estrategia.BOTIN.tablas['dropeos'][0] == (0.25, 0.5, 0.75, 1.0)
+    for semilla in range(500):
+        antiguo, nuevo = random.Random(semilla), random.Random(semilla)
+        assert estrategia.BOTIN.tirar('dropeos', nuevo) == _dropeo_antiguo(antiguo)
+        assert nuevo.random() == antiguo.random()
+    assert estrategia.BOTIN.esperado('dropeos') == pytest.approx({
+        ('pocion', 'Poción de Vida'): 0.125,
+        ('pocion', 'Poción de Mana'): 0.125,
+        ('arma', 'Daga Serrada'): 0.25,
+        ('armadura', 'Grebas Oxidadas'): 0.25,
+    })
+
+
+def test_reglas_eligen_las_tablas():
+    motor = _motor()
+    assert motor.tablas_batalla([_enemigo('Guerrero', 2), _enemigo('Mago', 4)]) == ['dropeos']
+    # El nivel de la batalla es el de su enemigo de más nivel; el jefe añade su tabla
+    assert motor.tablas_batalla([_enemigo('Guerrero', 2), _enemigo('Jefe', 5)]) == ['avanzada', 'jefe']
+    botin = motor.botin([_enemigo('Jefe', 1)], random.Random(0))
+    assert ('armadura', CORONA) in botin
+
+
+def test_esperado_con_tiradas_tablas_anidadas_y_garantizados():
+    motor = _motor()
+    esperado = motor.esperado_batalla([_enemigo('Jefe', 6)])
+    # 2 tiradas en 'avanzada': 3/4 espada y 1/4 una tirada en 'dropeos'
+    assert esperado == pytest.approx({
+        ('arma', 'Espada Larga'): 1.5,
+        ('pocion', 'Poción de Vida'): 0.0625,
+        ('pocion', 'Poción de Mana'): 0.0625,
+        ('arma', 'Daga Serrada'): 0.125,
+        ('armadura', 'Grebas Oxidadas'): 0.125,
+        ('armadura', 'Corona del Jefe'): 1.0,
+    })
+
+
+def test_lote_coincide_con_lo_esperado():
+    motor = _motor()
+    enemigos = [_enemigo('Jefe', 6)]
+    n = 20_000
+    conteo = motor.lote_batallas(n, enemigos, rng=estrategia.FlujoAleatorio(0))
+    for clave, media in motor.esperado_batalla(enemigos).items():
+        if media >= 1.0 and clave[0] == 'armadura':
+            assert conteo[clave] == n
+        else:
+            # Tiradas independientes: a lo sumo 2 por batalla
+            assert abs(conteo[clave] - n * media) < 4 * math.sqrt(2 * n * media)
+    assert motor.lote('jefe', 10, rng=random.Random(0)) == {('armadura', 'Corona del Jefe'): 10}
+
+
+@pytest.mark.skipif(not estrategia.HAS_NUMPY, reason="requiere NumPy")
+def test_lote_con_numpy():
+    import numpy as np
+    n = 50_000
+    conteo = estrategia.BOTIN.lote('dropeos', n, generador=np.random.default_rng(0))
+    for clave, media in estrategia.BOTIN.esperado('dropeos').items():
+        assert abs(conteo[clave] - n * media) < 4 * math.sqrt(n * media)
+
+
+def test_tablas_en_ciclo_no_se_aceptan():
+    ciclo = {'botin': {'tablas': {
+        'a': {'entradas': [{'peso': 1, 'tipo': 'tabla', 'tabla': 'b'}]},
+        'b': {'entradas': [{'peso': 1, 'tipo': 'tabla', 'tabla': 'a'}]},
+    }, 'reglas': []}}
+    with pytest.raises(ValueError, match="ciclo"):
+        _motor(ciclo)
+
+
+def test_botin_de_la_partida_sale_del_motor(monkeypatch):
+    motor = _motor({'dropeos': [{'peso': 1, 'tipo': 'arma', 'objeto': ESPADA}]})
+    monkeypatch.setattr(estrategia, "BOTIN", motor)
+    juego = estrategia.Juego(estrategia.Personaje("Aria"), semilla=0, consola=False)
+    enemigos = [estrategia.FabricaEnemigos.crear_enemigo(1, juego.jugador.elemento, juego.rng)]
+    for enemigo in enemigos:
+        enemigo.vida = 0
+    juego.combate = estrategia.EstadoCombate(enemigos, juego.rng, juego.jugador)
+    flujo = juego.flujo_dropeo(enemigos, juego.combate)
+    assert "equipar" in next(flujo)
+    with pytest.raises(StopIteration):
+        flujo.send("s")
+    assert juego.jugador.equipo['arma'] == {'tipo': 'arma', **ESPADA}
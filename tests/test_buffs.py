@@ -0,0 +1,54 @@
+"""Pila de modificadores (buffs) y la defensa agregada del personaje."""
+import estrategia
+
+
+def test_totales_y_expiracion_por_turno():
+    pila = estrategia.PilaModificadores()
+    pila.agregar('defensa', 3, 1)
+    pila.agregar('defensa', 5, 3)
+    pila.agregar('ataque', 2, 2)
+    assert (pila.total('defensa'), pila.total('ataque'), pila.total('velocidad')) == (8, 2, 0)
+    assert [b[:2] for b in pila.avanzar()] == [('defensa', 3)]
+    assert pila.total('defensa') == 5
+    assert [b[:2] for b in pila.avanzar()] == [('ataque', 2)]
+    assert pila.avanzar() == [('defensa', 5, '', 3)]
+    assert len(pila) == 0 and pila.total('defensa') == 0
+    assert pila.avanzar() == ()
+
+
+def test_expirados_del_mas_reciente_al_mas_antiguo():
+    pila = estrategia.PilaModificadores()
+    for incremento in (1, 2, 3):
+        pila.agregar('defensa', incremento, 2)
+    pila.avanzar()
+    assert [b[1] for b in pila.avanzar()] == [3, 2, 1]
+
+
+def test_ida_y_vuelta():
+    pila = estrategia.PilaModificadores()
+    pila.agregar('defensa', 4, 3, 50)
+    pila.avanzar()
+    copia = estrategia.PilaModificadores.from_list(pila.to_list())
+    assert copia.to_list() == pila.to_list() == [{'tipo': 'defensa', 'incremento': 4, 'turnos': 2, 'porcentaje': 50}]
+    restaurada = estrategia.PilaModificadores.desde_instantanea(pila.instantanea())
+    restaurada.avanzar()
+    # La instantánea es independiente del original
+    assert pila.to_list()[0]['turnos'] == 2
+
+
+def test_defensa_del_personaje_incluye_buffs():
+    jugador = estrategia.Personaje("Aria")
+    base = jugador.defensa
+    evento = jugador.aplicar_buff_defensa(50, turnos=2)
+    assert evento.clave == 'buff'
+    assert jugador.defensa == base + evento.valor
+    assert jugador.actualizar_buffs() == ()
+    fin = jugador.actualizar_buffs()
+    assert [e.clave for e in fin] == ['buff_fin']
+    assert jugador.defensa == base
+
+
+def test_buff_invalido():
+    jugador = estrategia.Personaje("Aria")
+    assert jugador.aplicar_buff_defensa(0).clave == 'buff_invalido'
+    assert len(jugador.buffs) == 0
@@ -0,0 +1,176 @@
+"""Paquetes de contenido: carga, caché del índice, recarga y avisos del servidor."""
+import asyncio
+import json
+
+import pytest
+
+import estrategia
+
+
+@pytest.fixture(autouse=True)
+def contenido_base():
+    yield
+    estrategia.activar_contenido(estrategia.compilar_contenido(estrategia.CONTENIDO_BASE), "base")
+
+
+def _escribir(ruta, datos):
+    with open(ruta, "w", encoding='utf-8') as f:
+        json.dump(datos, f)
+    return str(ruta)
+
+
+GOLEMS = {
+    'enemigos': {'tipos': [{'nombre': 'Guerrero', 'peso': 0}, {'nombre': 'Golem', 'peso': 50, 'vida': 3.0}]},
+    'habilidades': {'Explosión de Energía': {'costo': 40}},
+}
+
+
+def test_paquete_cambia_enemigos_y_habilidades(tmp_path):
+    paquete = estrategia.PaqueteContenido([_escribir(tmp_path / "golems.json", GOLEMS)], cache=str(tmp_path / "cache"))
+    paquete.cargar()
+    assert estrategia.HUELLA_CONTENIDO == paquete.huella
+    assert "Golem" in estrategia.TIPOS_ENEMIGO
+    assert estrategia.HABILIDADES['Explosión de Energía'].costo == 40
+    rng = estrategia.FlujoAleatorio(0)
+    tipos = {estrategia.Enemigo(3, estrategia.Elemento.TIEMPO, rng).tipo for _ in range(300)}
+    assert "Golem" in tipos and "Guerrero" not in tipos
+
+
+def test_segunda_carga_desde_la_cache(tmp_path):
+    rutas = [_escribir(tmp_path / "golems.json", GOLEMS)]
+    cache = str(tmp_path / "cache")
+    primera = estrategia.PaqueteContenido(rutas, cache)
+    compilado = primera.cargar()
+    assert not primera.desde_cache
+    segunda = estrategia.PaqueteContenido(rutas, cache)
+    assert segunda.cargar() == compilado
+    assert segunda.desde_cache and segunda.huella == primera.huella
+    # Un índice dañado se recompila
+    with open(tmp_path / "cache" / f"{primera.huella}.idx", "wb") as f:
+        f.write(b"basura")
+    tercera = estrategia.PaqueteContenido(rutas, cache)
+    assert tercera.cargar() == compilado and not tercera.desde_cache
+
+
+def test_recargar_solo_si_cambia(tmp_path):
+    ruta = _escribir(tmp_path / "golems.json", GOLEMS)
+    paquete = estrategia.PaqueteContenido([ruta], cache=str(tmp_path / "cache"))
+    paquete.cargar()
+    huella = paquete.huella
+    assert not paquete.recargar()
+    _escribir(ruta, dict(GOLEMS, habilidades={'Explosión de Energía': {'costo': 35}}))
+    assert paquete.recargar()
+    assert paquete.recargas == 1 and paquete.huella != huella
+    assert estrategia.HABILIDADES['Explosión de Energía'].costo == 35
+
+
+def test_paquete_invalido_deja_el_contenido_anterior(tmp_path):
+    ruta = _escribir(tmp_path / "golems.json", GOLEMS)
+    paquete = estrategia.PaqueteContenido([ruta], cache=str(tmp_path / "cache"))
+    paquete.cargar()
+    huella = estrategia.HUELLA_CONTENIDO
+    with open(ruta, "w", encoding='utf-8') as f:
+        f.write('{"enemigos": ')
+    with pytest.raises(ValueError, match="JSON inválido"):
+        paquete.recargar()
+    assert estrategia.HUELLA_CONTENIDO == huella and "Golem" in estrategia.TIPOS_ENEMIGO
+    # No se reintenta hasta que el archivo vuelva a cambiar
+    assert not paquete.recargar()
+
+
+@pytest.mark.parametrize("datos, mensaje", [
+    ({'monstruos': {}}, "secciones desconocidas"),
+    ({'enemigos': {'tipos': [{'nombre': 'Jefe', 'peso': 1}]}}, "reservado"),
+    ({'enemigos': {'tipos': [{'nombre': 'Golem'}]}}, "necesita un 'peso'"),
+    ({'enemigos': {'prob_jefe': 2}}, "prob_jefe"),
+    ({'habilidades': {'Bola de Fuego': {'costo': 1}}}, "ninguna habilidad registrada"),
+    ({'dropeos': [{'peso': 1, 'tipo': 'arma', 'objeto': {'nombre': 'Palo'}}]}, "ataque"),
+    ({'botin': {'tablas': {}, 'reglas': [{'tabla': 'nada'}]}}, "no existe"),
+])
+def test_errores_de_validacion(tmp_path, datos, mensaje):
+    ruta = _escribir(tmp_path / "malo.json", datos)
+    with pytest.raises(ValueError, match=mensaje):
+        estrategia.cargar_contenido([ruta], cache=None)
+
+
+def test_servidor_avisa_de_las_recargas(tmp_path):
+    ruta = _escribir(tmp_path / "golems.json", GOLEMS)
+    paquete = estrategia.PaqueteContenido([ruta], cache=str(tmp_path / "cache"))
+    paquete.cargar()
+    avisos = []
+    servidor = estrategia.ServidorJuego(contenido=paquete, intervalo_contenido=0.01, salida=avisos.append)
+
+    async def esperar_aviso():
+        for _ in range(500):
+            if avisos:
+                return avisos.pop()
+            await asyncio.sleep(0.01)
+        raise AssertionError("sin aviso")
+
+    async def principal():
+        tarea = asyncio.create_task(servidor.servir(puerto=0))
+        try:
+            _escribir(ruta, dict(GOLEMS, habilidades={'Explosión de Energía': {'costo': 35}}))
+            assert await esperar_aviso() == f"Contenido recargado ({paquete.huella})."
+            with open(ruta, "w", encoding='utf-8') as f:
+                f.write("{")
+            assert (await esperar_aviso()).startswith("No se pudo recargar el contenido:")
+        finally:
+            tarea.cancel()
+            await asyncio.gather(tarea, return_exceptions=True)
+
+    asyncio.run(principal())
+
+
+def _anfitrion_con_paquete(tmp_path, avisos):
+    ruta = _escribir(tmp_path / "golems.json", GOLEMS)
+    paquete = estrategia.PaqueteContenido([ruta], cache=str(tmp_path / "cache"))
+    paquete.cargar()
+    return ruta, estrategia.AnfitrionMultiproceso(1, contenido=paquete, intervalo_contenido=0, salida=avisos.append)
+
+
+def _jugar_con(anfitrion, entre_pasos):
+    """Abre una sesión, llama a `entre_pasos()` y responde una vez. Retorna los dos textos."""
+    async def principal():
+        await anfitrion.iniciar(puerto=0)
+        puerto = anfitrion.servidor.sockets[0].getsockname()[1]
+        lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+        try:
+            await lector.readline()
+            escritor.write(b"Aria\n")
+            primero = json.loads(await lector.readline())['texto']
+            entre_pasos()
+            escritor.write(b"D\n")
+            return primero, json.loads(await lector.readline())['texto']
+        finally:
+            escritor.close()
+            anfitrion.servidor.close()
+            await anfitrion.servidor.wait_closed()
+            anfitrion.detener()
+    return asyncio.run(principal())
+
+
+def test_los_trabajadores_avisan_por_el_frente(tmp_path):
+    avisos = []
+    ruta, anfitrion = _anfitrion_con_paquete(tmp_path, avisos)
+
+    def romper():
+        with open(ruta, "w", encoding='utf-8') as f:
+            f.write("{")
+
+    primero, segundo = _jugar_con(anfitrion, romper)
+    # El trabajador intenta recargar antes de la respuesta y sigue con el contenido anterior
+    assert "Nivel: 1" in primero and "TURNO ENEMIGO" in segundo
+    assert len(avisos) == 1 and avisos[0].startswith("No se pudo recargar el contenido:")
+    assert anfitrion.reinicios == 0
+
+
+def test_trabajador_arranca_con_un_paquete_roto(tmp_path):
+    avisos = []
+    ruta, anfitrion = _anfitrion_con_paquete(tmp_path, avisos)
+    with open(ruta, "w", encoding='utf-8') as f:
+        f.write("{")
+    primero, segundo = _jugar_con(anfitrion, lambda: None)
+    assert "Nivel: 1" in primero and "TURNO ENEMIGO" in segundo
+    assert avisos and avisos[0].startswith("No se pudo cargar el contenido:")
+    assert anfitrion.reinicios == 0
@@ -0,0 +1,86 @@
+"""TablaAlias y GeneradorEncuentros."""
+import math
+import random
+
+import pytest
+
+import estrategia
+
+
+def test_tabla_alias_probabilidades_exactas():
+    pesos = [5, 1, 0, 3, 1]
+    tabla = estrategia.TablaAlias("abcde", pesos)
+    for p, peso in zip(tabla.probabilidades(), pesos):
+        assert math.isclose(p, peso / sum(pesos), abs_tol=1e-12)
+
+
+def test_tabla_alias_muestra_con_esa_distribucion():
+    tabla = estrategia.TablaAlias("abc", [0.7, 0.2, 0.1])
+    n = 20_000
+    indices = tabla.indices(random.Random(0), n)
+    for i, p in enumerate(tabla.probabilidades()):
+        assert abs(indices.count(i) / n - p) < 4 * math.sqrt(p * (1 - p) / n)
+    # En lote o de uno en uno se consume el flujo igual
+    rng = random.Random(1)
+    assert tabla.indices(random.Random(1), 50) == [tabla.indice(rng) for _ in range(50)]
+
+
+def test_plantillas_son_enemigos_de_la_fabrica():
+    generador = estrategia.GeneradorEncuentros()
+    tabla = generador.tabla(3, estrategia.Elemento.TIEMPO)
+    assert math.isclose(sum(tabla.probabilidades()), 1.0)
+    plantillas = set(tabla.valores)
+    rng = estrategia.FlujoAleatorio(0)
+    for _ in range(300):
+        enemigo = estrategia.Enemigo(3, estrategia.Elemento.TIEMPO, rng)
+        assert tuple(getattr(enemigo, c) for c in estrategia.CAMPOS_PLANTILLA) in plantillas
+
+
+def test_oleada_y_enemigos_nuevos():
+    generador = estrategia.GeneradorEncuentros()
+    rng = estrategia.FlujoAleatorio(2)
+    for _ in range(20):
+        oleada = generador.oleada(4, estrategia.Elemento.ESPACIO, rng)
+        assert 2 <= len(oleada) <= 4
+        for enemigo in oleada:
+            assert enemigo.vida == enemigo.vida_max and enemigo.rng is rng
+            assert not enemigo.estados
+
+
+def test_tabla_se_rehace_si_cambia_prob_jefe(monkeypatch):
+    generador = estrategia.GeneradorEncuentros()
+    assert any(p[estrategia.CAMPOS_PLANTILLA.index('tipo')] == 'Jefe'
+               for p in generador.tabla(3, estrategia.Elemento.TIEMPO).valores)
+    monkeypatch.setattr(estrategia, "PROB_JEFE", 0.0)
+    assert all(p[estrategia.CAMPOS_PLANTILLA.index('tipo')] != 'Jefe'
+               for p in generador.tabla(3, estrategia.Elemento.TIEMPO).valores)
+
+
+def test_verificar_generador():
+    resultado = estrategia.verificar_generador(n=20_000, nivel_jugador=2, semilla=1)
+    assert resultado['plantillas'] > 1
+    for nombre in ('actual', 'alias'):
+        assert resultado[nombre]['p_valor'] > 1e-4
+
+
+@pytest.mark.skipif(not estrategia.HAS_NUMPY, reason="requiere NumPy")
+def test_lote_np_coincide_con_las_plantillas():
+    import numpy as np
+    generador = estrategia.GeneradorEncuentros()
+    columnas = generador.lote_np(1000, 3, estrategia.Elemento.TIEMPO, np.random.default_rng(0))
+    valores = generador.tabla(3, estrategia.Elemento.TIEMPO).valores
+    vida = estrategia.CAMPOS_PLANTILLA.index('vida_max')
+    assert [valores[i][vida] for i in columnas['plantilla']] == list(columnas['vida_max'])
+
+
+def test_simulacion_con_el_generador():
+    n = 2000
+    jugador = estrategia.heroe_de_nivel(3)
+    fabrica = estrategia.simular_batallas(n, jugador=jugador, procesos=1, semilla=0)
+    generador = estrategia.simular_batallas(n, jugador=jugador, procesos=1, semilla=0, encuentros=True)
+    repetido = estrategia.simular_batallas(n, jugador=jugador, procesos=2, semilla=0, encuentros=True)
+    assert (repetido['victorias'], repetido['turnos']) == (generador['victorias'], generador['turnos'])
+    # Misma distribución de enemigos: tasas de victoria compatibles
+    p = (fabrica['tasa_victoria'] + generador['tasa_victoria']) / 2
+    assert 0.0 < p < 1.0
+    assert abs(fabrica['tasa_victoria'] - generador['tasa_victoria']) < 4 * math.sqrt(2 * p * (1 - p) / n)
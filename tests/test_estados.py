@@ -0,0 +1,88 @@
+"""Motor de estados compartido por Personaje y Enemigo."""
+import estrategia
+
+
+class Blanco:
+    nombre = "Blanco"
+
+    def __init__(self, vida=100):
+        self.vida = vida
+
+
+def _procesar(motor, blanco, con_eventos=False):
+    return motor.procesar(blanco, "{objetivo}", "{objetivo} {dmg}", [] if con_eventos else None)
+
+
+def test_danio_por_turno_y_expiracion():
+    motor = estrategia.MotorEstados()
+    motor.aplicar('poison', {'dmg': 5, 'turnos': 2})
+    motor.aplicar('burn', {'dmg': 3, 'turnos': 3})
+    blanco = Blanco()
+    _procesar(motor, blanco)
+    assert blanco.vida == 92
+    assert motor.turnos_restantes('poison') == 1
+    _procesar(motor, blanco)
+    assert 'poison' not in motor and 'burn' in motor
+    _procesar(motor, blanco)
+    assert blanco.vida == 100 - 2 * 5 - 3 * 3
+    assert len(motor) == 0
+
+
+def test_reaplicar_conserva_la_mayor_duracion():
+    motor = estrategia.MotorEstados()
+    motor.aplicar('poison', {'dmg': 5, 'turnos': 3})
+    motor.aplicar('poison', {'dmg': 9, 'turnos': 1})
+    assert motor.get('poison') == {'dmg': 5, 'turnos': 3}
+    motor.aplicar('poison', {'dmg': 9, 'turnos': 6})
+    # Se alarga la duración; el daño sigue siendo el original
+    assert motor.get('poison') == {'dmg': 5, 'turnos': 6}
+    motor.compactar()
+    assert len(motor._heap) == 1
+
+
+def test_stun_no_hace_danio():
+    motor = estrategia.MotorEstados()
+    motor.aplicar('stun', {'stun': True, 'turnos': 1})
+    blanco = Blanco()
+    eventos = _procesar(motor, blanco, con_eventos=True)
+    assert blanco.vida == 100
+    assert [e.clave for e in eventos] == ['estado_turno', 'estado_fin']
+    assert 'stun' not in motor
+
+
+def test_con_y_sin_eventos_dan_el_mismo_resultado():
+    def jugar(con_eventos):
+        motor = estrategia.MotorEstados()
+        motor.aplicar('poison', {'dmg': 4, 'turnos': 4})
+        motor.aplicar('stun', {'stun': True, 'turnos': 1})
+        motor.aplicar('burn', {'dmg': 2, 'turnos': 2})
+        blanco = Blanco()
+        for _ in range(5):
+            _procesar(motor, blanco, con_eventos)
+        return blanco.vida, motor.to_dict()
+
+    assert jugar(True) == jugar(False)
+
+
+def test_ida_y_vuelta():
+    motor = estrategia.MotorEstados()
+    motor.aplicar('poison', {'dmg': 5, 'turnos': 4})
+    _procesar(motor, Blanco())
+    copia = estrategia.MotorEstados.from_dict(motor.to_dict())
+    assert copia.to_dict() == motor.to_dict() == {'poison': {'dmg': 5, 'turnos': 3}}
+    restaurado = estrategia.MotorEstados.desde_instantanea(motor.instantanea())
+    assert restaurado.to_dict() == motor.to_dict()
+
+
+def test_personaje_y_enemigo_no_comparten_estados():
+    jugador = estrategia.Personaje("Aria")
+    enemigo = estrategia.Enemigo(1, estrategia.Elemento.TIEMPO, estrategia.FlujoAleatorio(0))
+    assert jugador.estados is enemigo.estados is estrategia.SIN_ESTADOS
+    jugador.aplicar_estado('burn', {'dmg': 4, 'turnos': 2})
+    assert 'burn' in jugador.estados
+    assert not enemigo.estados and not estrategia.SIN_ESTADOS
+    vida = enemigo.vida
+    enemigo.aplicar_estado('poison', {'dmg': 3, 'turnos': 1})
+    enemigo.procesar_estados(silencioso=True)
+    assert enemigo.vida == vida - 3
+    assert 'poison' not in enemigo.estados
@@ -0,0 +1,109 @@
+"""Bus de eventos: salida por consola, partidas silenciosas y sumideros."""
+import io
+import json
+
+import estrategia
+
+
+def responder(pregunta):
+    if "Número de enemigo" in pregunta:
+        return "1"
+    if "Acción" in pregunta:
+        return "A"
+    if "equipar" in pregunta:
+        return "s"
+    return "0" if "Elige" in pregunta else "n"
+
+
+def jugar(juego, limite=3000):
+    flujo = juego.flujo_iniciar()
+    pregunta = next(flujo)
+    try:
+        for _ in range(limite):
+            pregunta = flujo.send(responder(pregunta))
+    except StopIteration:
+        return
+    raise AssertionError("la partida no terminó")
+
+
+def _partida(consola, *suscriptores):
+    textos = []
+    juego = estrategia.Juego(estrategia.heroe_de_nivel(8, "Aria"), semilla=3, consola=consola, salida=textos.append)
+    juego.archivo_guardado = None
+    for suscriptor in suscriptores:
+        juego.eventos.suscribir(suscriptor)
+    jugar(juego)
+    return juego, textos
+
+
+def test_consola_y_silencio_juegan_igual():
+    huella_consola, huella_silencio = estrategia.HuellaEventos(), estrategia.HuellaEventos()
+    con_consola, textos = _partida(True, huella_consola)
+    silencioso, textos_silencio = _partida(False, huella_silencio)
+    sin_bus, _ = _partida(False)
+    assert con_consola.to_dict() == silencioso.to_dict() == sin_bus.to_dict()
+    assert huella_consola.hexdigest() == huella_silencio.hexdigest()
+    assert silencioso.nivel_actual == 3
+    assert any("=== NIVEL 3 ===" in t for t in textos)
+    # En silencio solo quedan los menús que se muestran con `mostrar`
+    assert not any("=== NIVEL" in t for t in textos_silencio)
+    assert len(textos_silencio) < len(textos)
+
+
+def test_bus_sin_suscriptores_es_falso():
+    bus = estrategia.BusEventos()
+    assert not bus
+    recibidos = []
+    bus.suscribir(recibidos.append)
+    assert bus
+    evento = estrategia.Evento(estrategia.TipoEvento.AVISO, 'sin_objeto', "Aria")
+    bus.emitir(evento)
+    bus.desuscribir(recibidos.append)
+    assert not bus and recibidos == [evento]
+
+
+def test_renderizador_usa_las_plantillas():
+    textos = []
+    evento = estrategia.Evento(estrategia.TipoEvento.BATALLA, 'victoria', "Aria", None, 45)
+    estrategia.RenderizadorConsola(textos.append)(evento)
+    assert textos == [str(evento)] and "45" in textos[0]
+
+
+def test_dropeo_silencioso_no_construye_eventos(monkeypatch):
+    creados = []
+
+    class EventoContado(estrategia.Evento):
+        __slots__ = ()
+
+        def __new__(cls, *args, **kwargs):
+            creados.append(args[1] if len(args) > 1 else kwargs.get('clave'))
+            return super().__new__(cls, *args, **kwargs)
+
+    monkeypatch.setattr(estrategia, 'Evento', EventoContado)
+    juego = estrategia.Juego(estrategia.Personaje("Aria"), semilla=0, consola=False)
+    rng = juego.rng
+    enemigos = [estrategia.FabricaEnemigos.crear_enemigo(1, juego.jugador.elemento, rng)]
+    combate = estrategia.EstadoCombate(enemigos, rng, juego.jugador)
+    arma = {'nombre': 'Daga Serrada', 'ataque': 3}
+    combate.botin = [('pocion', "Poción de Vida"), ('arma', arma)]
+    pociones = juego.jugador.inventario.cantidad("Poción de Vida")
+    flujo = juego.flujo_dropeo(enemigos, combate)
+    assert "equipar" in next(flujo)
+    try:
+        flujo.send("s")
+    except StopIteration:
+        pass
+    assert creados == []
+    assert juego.jugador.equipo['arma'] == {'tipo': 'arma', **arma}
+    assert juego.jugador.inventario.cantidad("Poción de Vida") == pociones + 1
+
+
+def test_sumidero_jsonl_y_contador():
+    archivo = io.StringIO()
+    sumidero = estrategia.SumideroJSONL(archivo)
+    contador = estrategia.ContadorEventos()
+    juego, _ = _partida(False, sumidero, contador)
+    lineas = [json.loads(linea) for linea in archivo.getvalue().splitlines()]
+    assert len(lineas) == sum(contador.por_tipo.values()) > 0
+    assert contador.por_clave['inicio_batalla'] >= 1
+    assert all(linea['texto'] for linea in lineas)
@@ -0,0 +1,86 @@
+"""Formato de guardado binario y escritura atómica."""
+import json
+import os
+
+import pytest
+
+import estrategia
+
+
+def _normalizar(datos):
+    return json.loads(json.dumps(datos))
+
+
+def _juego_en_batalla():
+    juego = estrategia.Juego(estrategia.heroe_de_nivel(8, "Aria"), semilla=8, consola=False)
+    rng = juego.rng
+    enemigos = [estrategia.FabricaEnemigos.crear_enemigo(8, juego.jugador.elemento, rng) for _ in range(3)]
+    enemigos[0].aplicar_estado('poison', {'dmg': 4, 'turnos': 2})
+    juego.combate = estrategia.EstadoCombate(enemigos, rng, juego.jugador)
+    jugador = juego.jugador
+    jugador.inventario.guardar({'tipo': 'arma', 'nombre': 'Hacha', 'ataque': 4}, 2)
+    jugador.aplicar_buff_defensa(30)
+    jugador.aplicar_estado('burn', {'dmg': 2, 'turnos': 3})
+    juego.logros.append("Maestro del Tiempo")
+    return juego
+
+
+def test_binario_ida_y_vuelta():
+    juego = _juego_en_batalla()
+    datos = juego.to_dict()
+    binario = estrategia.GuardadoBinario(estrategia.serializar_guardado(datos)).to_dict()
+    # El binario no guarda lo derivable; al cargarlo la partida debe ser la misma
+    cargado = estrategia.Juego.from_dict(binario, consola=False)
+    assert _normalizar(cargado.to_dict()) == _normalizar(datos)
+
+
+def test_resumen_sin_decodificar_el_resto():
+    datos = bytearray(estrategia.serializar_guardado(_juego_en_batalla().to_dict()))
+    guardado = estrategia.GuardadoBinario(bytes(datos))
+    inicio, longitud = guardado.indice['juego']
+    datos[inicio:inicio + longitud] = b"x" * longitud
+    danado = estrategia.GuardadoBinario(bytes(datos))
+    assert danado.resumen() == guardado.resumen()
+    assert danado.resumen()['nombre'] == "Aria"
+    with pytest.raises(ValueError):
+        danado.to_dict()
+
+
+@pytest.mark.parametrize("datos", [b"", b"CT", b"NOPE" + bytes(8)])
+def test_cabecera_invalida(datos):
+    with pytest.raises(ValueError):
+        estrategia.GuardadoBinario(datos)
+
+
+def test_guardado_truncado():
+    datos = estrategia.serializar_guardado(_juego_en_batalla().to_dict())
+    with pytest.raises(ValueError):
+        estrategia.GuardadoBinario(datos[:-5])
+
+
+@pytest.mark.parametrize("formato", ["binario", "json"])
+def test_guardar_y_cargar_archivo(tmp_path, formato):
+    juego = _juego_en_batalla()
+    juego.archivo_guardado = str(tmp_path / "partida.sav")
+    juego.guardar_progreso(formato)
+    textos = []
+    cargado = estrategia.Juego.cargar_progreso(juego.archivo_guardado, salida=textos.append)
+    assert _normalizar(cargado.to_dict()) == _normalizar(juego.to_dict())
+    assert "Progreso cargado exitosamente." in textos
+
+
+def test_escritura_atomica_no_deja_temporales(tmp_path):
+    ruta = tmp_path / "partida.sav"
+    estrategia.escribir_atomico(str(ruta), b"primero")
+    estrategia.escribir_atomico(str(ruta), b"segundo")
+    assert ruta.read_bytes() == b"segundo"
+    assert os.listdir(tmp_path) == ["partida.sav"]
+
+
+def test_escritura_fallida_conserva_el_anterior(tmp_path):
+    ruta = tmp_path / "partida.sav"
+    estrategia.escribir_atomico(str(ruta), b"bueno")
+    with pytest.raises(TypeError):
+        estrategia.escribir_atomico(str(ruta), "no son bytes")
+    assert ruta.read_bytes() == b"bueno"
+    assert os.listdir(tmp_path) == ["partida.sav"]
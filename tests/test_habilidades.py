@@ -0,0 +1,104 @@
+"""Registro de habilidades y Personaje.usar_habilidad."""
+import estrategia
+
+TipoEvento = estrategia.TipoEvento
+
+
+class TiradaFija:
+    """rng cuyo random() siempre devuelve `valor`."""
+    def __init__(self, valor):
+        self.valor = valor
+
+    def random(self):
+        return self.valor
+
+
+def _enemigos(n=2):
+    rng = estrategia.FlujoAleatorio(0)
+    return [estrategia.Enemigo(1, estrategia.Elemento.TIEMPO, rng) for _ in range(n)]
+
+
+def _heroe(tirada=0.99):
+    jugador = estrategia.heroe_de_nivel(10, "Aria")
+    jugador.rng = TiradaFija(tirada)
+    return jugador
+
+
+def test_todas_las_habilidades_del_contenido_estan_registradas():
+    for nombre, datos in estrategia.CONTENIDO_BASE['habilidades'].items():
+        assert estrategia.HABILIDADES[nombre].costo == datos['costo']
+
+
+def test_habilidad_desconocida_no_gasta_mana():
+    jugador = _heroe()
+    mana = jugador.mana
+    evento = jugador.usar_habilidad("Bola de Nieve", _enemigos())
+    assert (evento.tipo, evento.clave) == (TipoEvento.AVISO, 'habilidad_desconocida')
+    assert jugador.mana == mana
+
+
+def test_sin_mana():
+    jugador = _heroe()
+    jugador.mana = 1
+    evento = jugador.usar_habilidad("Explosión de Energía", _enemigos())
+    assert evento.clave == 'sin_mana'
+    assert jugador.mana == 1
+
+
+def test_explosion_golpea_a_todos_los_vivos():
+    jugador = _heroe()
+    enemigos = _enemigos(3)
+    enemigos[2].vida = 0
+    vidas = [e.vida for e in enemigos]
+    mana = jugador.mana
+    evento = jugador.usar_habilidad("Explosión de Energía", enemigos)
+    assert evento.clave == 'explosion'
+    assert [e.vida for e in enemigos] == [vidas[0] - 20, vidas[1] - 20, 0]
+    assert jugador.mana == mana - estrategia.HABILIDADES["Explosión de Energía"].costo
+
+
+def test_fallo_cobra_el_mana():
+    jugador = _heroe(tirada=0.0)
+    enemigos = _enemigos()
+    vidas = [e.vida for e in enemigos]
+    mana = jugador.mana
+    evento = jugador.usar_habilidad("Explosión de Energía", enemigos)
+    assert (evento.tipo, evento.clave) == (TipoEvento.FALLO, 'fallo_habilidad')
+    assert [e.vida for e in enemigos] == vidas
+    assert jugador.mana < mana
+
+
+def test_rayo_necesita_objetivo_valido():
+    jugador = _heroe()
+    assert jugador.usar_habilidad("Rayo de Energía Pura", _enemigos()).clave == 'necesita_objetivo'
+    assert jugador.usar_habilidad("Rayo de Energía Pura", _enemigos(), target_index=5).clave == 'seleccion_invalida'
+    enemigos = _enemigos()
+    vida = enemigos[1].vida
+    evento = jugador.usar_habilidad("Rayo de Energía Pura", enemigos, target_index=1)
+    assert evento.clave == 'rayo'
+    assert enemigos[1].vida == vida - evento.valor
+
+
+def test_transmutacion_cambia_vida_por_mana():
+    jugador = _heroe()
+    jugador.mana = estrategia.HABILIDADES["Transmutación de Materia"].costo
+    vida = jugador.vida
+    evento = jugador.usar_habilidad("Transmutación de Materia", _enemigos())
+    assert evento.clave == 'transmutacion'
+    assert jugador.vida == vida - 20
+    assert jugador.mana == evento.valor > 0
+
+
+def test_registrar_habilidad_nueva(monkeypatch):
+    monkeypatch.setitem(estrategia.CONTENIDO_BASE['habilidades'], "Eco", {'costo': 7})
+    monkeypatch.setattr(estrategia, 'HABILIDADES', dict(estrategia.HABILIDADES))
+
+    @estrategia.registrar_habilidad("Eco", estrategia.OBJETIVO_PROPIO)
+    def _eco(jugador, costo, enemigos_vivos, target_index):
+        return estrategia.Evento(TipoEvento.HABILIDAD, 'eco', jugador.nombre, None, costo)
+
+    jugador = _heroe()
+    mana = jugador.mana
+    evento = jugador.usar_habilidad("Eco", _enemigos())
+    assert (evento.clave, evento.valor) == ('eco', 7)
+    assert jugador.mana == mana - 7
@@ -0,0 +1,98 @@
+"""Instantáneas de EstadoCombate: deshacer, explorar y reanudar el botín."""
+import json
+
+import estrategia
+
+
+def _batalla(semilla=0, nivel=4, n_enemigos=3):
+    juego = estrategia.Juego(estrategia.heroe_de_nivel(nivel, "Aria"), semilla=semilla, consola=False)
+    juego.archivo_guardado = None
+    rng = juego.rng
+    enemigos = [estrategia.FabricaEnemigos.crear_enemigo(nivel, juego.jugador.elemento, rng) for _ in range(n_enemigos)]
+    juego.combate = estrategia.EstadoCombate(enemigos, rng, juego.jugador)
+    juego.jugador.rng = rng
+    return juego, juego.combate
+
+
+def _estado(juego):
+    return json.dumps(juego.to_dict(), sort_keys=True)
+
+
+def test_deshacer_vuelve_al_punto_marcado():
+    juego, combate = _batalla()
+    combate.marcar()
+    antes = _estado(juego)
+    for _ in range(3):
+        juego.simular_turno(combate, estrategia.politica_aleatoria)
+    assert _estado(juego) != antes
+    assert combate.deshacer()
+    assert _estado(juego) == antes
+    assert not combate.deshacer()
+
+
+def test_deshacer_y_repetir_da_lo_mismo():
+    juego, combate = _batalla(semilla=3)
+    combate.marcar()
+    juego.simular_turno(combate, estrategia.politica_codiciosa)
+    despues = _estado(juego)
+    combate.deshacer()
+    juego.simular_turno(combate, estrategia.politica_codiciosa)
+    assert _estado(juego) == despues
+
+
+def test_explorar_no_cambia_la_batalla():
+    juego, combate = _batalla(semilla=1)
+    antes = _estado(juego)
+
+    def hasta_el_final(c):
+        turnos = 0
+        while not c.terminada() and turnos < 200:
+            turnos += 1
+            juego.simular_turno(c, estrategia.politica_codiciosa)
+        return juego.jugador.vida > 0
+
+    resultados = combate.explorar(hasta_el_final, 5)
+    assert len(resultados) == 5
+    # Misma posición y mismo flujo aleatorio: las cinco continuaciones son iguales
+    assert len(set(resultados)) == 1
+    assert _estado(juego) == antes
+
+
+def test_restaurar_sin_rng_conserva_el_flujo():
+    juego, combate = _batalla(semilla=2)
+    origen = combate.instantanea()
+    juego.simular_turno(combate, estrategia.politica_codiciosa)
+    estado_rng = combate.rng.getstate()
+    combate.restaurar(origen, rng=False)
+    assert combate.rng.getstate() == estado_rng
+    assert juego.jugador.vida == origen[1][0]
+
+
+def test_instantaneas_comparten_lo_que_no_cambia():
+    juego, combate = _batalla()
+    primera = combate.instantanea()
+    segunda = combate.instantanea()
+    assert segunda[1] is primera[1] and segunda[2] is primera[2]
+
+
+def test_guardado_en_la_pregunta_de_equipar_no_vuelve_a_tirar():
+    juego, combate = _batalla()
+    arma = {'nombre': 'Daga Serrada', 'ataque': 3}
+    armadura = {'nombre': 'Grebas Oxidadas', 'defensa': 2}
+    combate.botin = [('arma', arma), ('armadura', armadura)]
+    flujo = juego.flujo_dropeo(combate.enemigos, combate)
+    assert "equipar" in next(flujo)
+    assert "equipar" in flujo.send("s")
+    assert juego.jugador.equipo['arma'] == {'tipo': 'arma', **arma}
+
+    # Se guarda en la segunda pregunta: solo queda la armadura por entregar
+    cargado = estrategia.Juego.from_dict(json.loads(json.dumps(juego.to_dict())), consola=False)
+    assert cargado.combate.botin == [('armadura', armadura)]
+    reanudado = cargado.flujo_dropeo(cargado.combate.enemigos, cargado.combate)
+    assert "equipar" in next(reanudado)
+    try:
+        reanudado.send("n")
+    except StopIteration:
+        pass
+    assert cargado.combate.botin == []
+    assert cargado.jugador.inventario.mejor('armadura') == {'tipo': 'armadura', **armadura}
@@ -0,0 +1,96 @@
+"""Inventario: consumibles, equipo guardado por ranura y serialización."""
+import json
+
+import estrategia
+
+
+def _arma(nombre, ataque):
+    return {'tipo': 'arma', 'nombre': nombre, 'ataque': ataque}
+
+
+def test_consumibles():
+    inventario = estrategia.Inventario({"Poción de Vida": 1, "Poción de Mana": 0})
+    assert inventario.hay_consumibles()
+    assert inventario.disponibles() == [("Poción de Vida", 1)]
+    assert inventario.consumir("Poción de Vida")
+    assert not inventario.consumir("Poción de Vida") and not inventario.consumir("Elixir")
+    assert not inventario.hay_consumibles() and inventario.disponibles() == []
+    assert inventario.agregar("Poción de Mana", 2) == 2
+    # Los agotados conservan su posición en el menú
+    inventario.agregar("Poción de Vida")
+    assert inventario.disponibles() == [("Poción de Vida", 1), ("Poción de Mana", 2)]
+
+
+def test_mejor_objeto_por_ranura():
+    inventario = estrategia.Inventario()
+    assert inventario.mejor('arma') is None and inventario.cuenta('arma') == 0
+    daga, espada, hacha = _arma("Daga", 3), _arma("Espada", 7), _arma("Hacha", 5)
+    for objeto in (daga, espada, hacha, daga):
+        inventario.guardar(objeto)
+    inventario.guardar({'tipo': 'armadura', 'nombre': 'Grebas', 'defensa': 2})
+    assert inventario.mejor('arma') == espada
+    assert inventario.cuenta('arma') == 4 and inventario.cuenta('armadura') == 1
+    assert inventario.guardados('arma') == [(daga, 2), (hacha, 1), (espada, 1)]
+    assert inventario.retirar(espada)
+    assert inventario.mejor('arma') == hacha
+    assert inventario.retirar(daga) and inventario.guardados('arma') == [(daga, 1), (hacha, 1)]
+    assert not inventario.retirar(espada)
+    assert inventario.cuenta('arma') == 2
+
+
+def test_ida_y_vuelta_con_repetidos():
+    inventario = estrategia.Inventario({"Poción de Vida": 2})
+    inventario.guardar(_arma("Daga", 3), 3)
+    inventario.guardar(_arma("Espada", 7))
+    datos = json.loads(json.dumps(inventario.to_dict()))
+    assert datos['Poción de Vida'] == 2
+    assert {'tipo': 'arma', 'nombre': 'Daga', 'ataque': 3, 'cantidad': 3} in datos['Objetos']
+    copia = estrategia.Inventario.from_dict(datos)
+    assert copia.to_dict() == inventario.to_dict()
+    assert copia.mejor('arma') == _arma("Espada", 7) and copia.cuenta('arma') == 4
+
+
+def test_formato_antiguo_con_objetos_repetidos():
+    datos = {"Poción de Vida": 1, "Objetos": [_arma("Daga", 3), _arma("Daga", 3), _arma("Espada", 7)]}
+    inventario = estrategia.Inventario.from_dict(datos)
+    assert inventario.guardados('arma') == [(_arma("Daga", 3), 2), (_arma("Espada", 7), 1)]
+
+
+def test_instantanea_de_combate():
+    inventario = estrategia.Inventario({"Poción de Vida": 2})
+    inventario.guardar(_arma("Daga", 3))
+    t = inventario.instantanea()
+    inventario.consumir("Poción de Vida")
+    inventario.agregar("Poción de Mana")
+    inventario.restaurar(t)
+    assert inventario.disponibles() == [("Poción de Vida", 2)]
+    assert inventario.cuenta('arma') == 1
+
+
+def test_pociones_del_personaje():
+    jugador = estrategia.Personaje("Aria")
+    jugador.vida -= 30
+    assert jugador.usar_objeto("Poción de Vida").clave == 'pocion_vida'
+    assert jugador.inventario.cantidad("Poción de Vida") == 2
+    jugador.vida = jugador.max_vida
+    # Sin efecto no se gasta
+    assert jugador.usar_objeto("Poción de Vida").clave == 'vida_al_maximo'
+    assert jugador.inventario.cantidad("Poción de Vida") == 2
+    copia = estrategia.Personaje.from_dict(jugador.to_dict())
+    assert copia.inventario.to_dict() == jugador.inventario.to_dict()
+
+
+def test_objeto_no_equipado_se_guarda():
+    juego = estrategia.Juego(estrategia.Personaje("Aria"), semilla=0, consola=False)
+    enemigos = [estrategia.FabricaEnemigos.crear_enemigo(1, juego.jugador.elemento, juego.rng)]
+    combate = juego.combate = estrategia.EstadoCombate(enemigos, juego.rng, juego.jugador)
+    combate.botin = [('arma', {'nombre': 'Daga Serrada', 'ataque': 3}), ('arma', {'nombre': 'Daga Serrada', 'ataque': 3})]
+    flujo = juego.flujo_dropeo(enemigos, combate)
+    next(flujo)
+    flujo.send("n")
+    try:
+        flujo.send("n")
+    except StopIteration:
+        pass
+    assert juego.jugador.equipo['arma'] is None
+    assert juego.jugador.inventario.guardados('arma') == [({'tipo': 'arma', 'nombre': 'Daga Serrada', 'ataque': 3}, 2)]
@@ -0,0 +1,82 @@
+"""Búsqueda MCTS: acciones legales, reproducibilidad y jefes."""
+import json
+
+import estrategia
+
+
+def _batalla(semilla=0, nivel=4, n_enemigos=3):
+    juego = estrategia.Juego(estrategia.heroe_de_nivel(nivel, "Aria"), semilla=semilla, consola=False)
+    juego.archivo_guardado = None
+    rng = juego.rng
+    enemigos = [estrategia.FabricaEnemigos.crear_enemigo(nivel, juego.jugador.elemento, rng) for _ in range(n_enemigos)]
+    juego.combate = estrategia.EstadoCombate(enemigos, rng, juego.jugador)
+    juego.jugador.rng = rng
+    return juego, juego.combate
+
+
+def _estado(juego):
+    return json.dumps(juego.to_dict(), sort_keys=True)
+
+
+def test_elige_una_accion_legal_sin_tocar_la_batalla():
+    juego, combate = _batalla()
+    antes = _estado(juego)
+    buscador = estrategia.BuscadorMCTS(iteraciones=100, semilla=0)
+    accion = buscador.elegir(juego)
+    vivos = [e for e in combate.enemigos if e.vida > 0]
+    assert accion in estrategia.acciones_legales(juego.jugador, vivos)
+    assert _estado(juego) == antes
+    assert buscador.estadisticas['iteraciones'] == 100
+    assert 0.0 <= buscador.estadisticas['valor'] <= 1.0
+
+
+def test_con_iteraciones_es_reproducible():
+    elegidas = []
+    for _ in range(2):
+        juego, _ = _batalla(semilla=1)
+        buscador = estrategia.BuscadorMCTS(iteraciones=80, semilla=7)
+        elegidas.append(buscador.elegir(juego))
+        del buscador.estadisticas['segundos'], buscador.estadisticas['simulaciones_por_segundo']
+        elegidas.append(buscador.estadisticas)
+    assert elegidas[:2] == elegidas[2:]
+
+
+def test_tabla_limitada_desaloja_las_posiciones_antiguas():
+    juego, _ = _batalla(semilla=2)
+    buscador = estrategia.BuscadorMCTS(iteraciones=200, max_nodos=10, semilla=0)
+    buscador.elegir(juego)
+    assert len(buscador.tabla) <= 10
+    assert buscador.desalojos > 0
+
+
+def test_varios_procesos_suman_sus_busquedas():
+    juego, combate = _batalla(semilla=3)
+    antes = _estado(juego)
+    buscador = estrategia.BuscadorMCTS(iteraciones=40, procesos=2, semilla=0)
+    try:
+        accion = buscador.elegir(juego)
+    finally:
+        buscador.cerrar()
+    vivos = [e for e in combate.enemigos if e.vida > 0]
+    assert accion in estrategia.acciones_legales(juego.jugador, vivos)
+    assert buscador.estadisticas['iteraciones'] == 80
+    assert _estado(juego) == antes
+
+
+def test_juega_batallas_completas():
+    resultados = estrategia.comparar_politicas(n=2, nivel=3, politicas={
+        'mcts': estrategia.BuscadorMCTS(iteraciones=20, semilla=0),
+    })
+    assert resultados['mcts']['turnos_medios'] > 0
+    assert resultados['mcts']['simulaciones_por_segundo'] > 0
+
+
+def test_elige_la_accion_del_jefe_de_su_fase():
+    juego, combate = _batalla(semilla=4, n_enemigos=2)
+    jefe = combate.enemigos[0]
+    jefe.tipo, jefe.fase = 'Jefe', 1
+    antes = _estado(juego)
+    buscador = estrategia.BuscadorMCTS(iteraciones=30, semilla=0)
+    opcion = buscador.elegir_jefe(juego, combate.enemigos, 0, False)
+    assert opcion in estrategia.Enemigo.ACCIONES_JEFE[jefe.fase_jefe()]
+    assert _estado(juego) == antes
@@ -0,0 +1,97 @@
+"""Memoria de las sesiones: medida, compactación y desalojo por presupuesto."""
+import asyncio
+
+import pytest
+
+import estrategia
+
+
+def responder(pregunta):
+    if "Número de enemigo" in pregunta:
+        return "1"
+    if "Acción" in pregunta:
+        return "A"
+    return "0" if "Elige" in pregunta else "n"
+
+
+def jugar(servidor, indices, con_presupuesto=False, limite=3000):
+    """Juega las sesiones `indices` por turnos alternos; aplica el presupuesto tras cada ronda."""
+    async def principal():
+        textos = {i: [] for i in indices}
+        preguntas = {}
+        for i in indices:
+            texto, preguntas[i] = await servidor.abrir_sesion(i, f"Jugador{i}")
+            textos[i].append(texto)
+        for _ in range(limite):
+            if not preguntas:
+                return textos
+            if con_presupuesto:
+                servidor.aplicar_presupuesto()
+            for i, pregunta in list(preguntas.items()):
+                texto, preguntas[i] = await servidor.paso_sesion(i, responder(pregunta))
+                textos[i].append(texto)
+                if preguntas[i] is None:
+                    del preguntas[i]
+                    servidor.cerrar_sesion(i)
+        raise AssertionError("las partidas no terminaron")
+    return asyncio.run(principal())
+
+
+def test_desalojo_no_cambia_las_partidas():
+    referencia = jugar(estrategia.ServidorJuego(semilla=2), (1, 2, 3))
+    servidor = estrategia.ServidorJuego(semilla=2, presupuesto_memoria=1, inactividad_minima=0)
+    assert jugar(servidor, (1, 2, 3), con_presupuesto=True) == referencia
+    assert servidor.desalojos > 0
+    assert servidor.desalojadas == {} and servidor.sesiones == {}
+
+
+def test_solo_se_desaloja_lo_necesario():
+    async def abrir(servidor):
+        for i in (1, 2, 3):
+            await servidor.abrir_sesion(i, f"Jugador{i}")
+
+    servidor = estrategia.ServidorJuego(semilla=0, presupuesto_memoria=1, inactividad_minima=0)
+    asyncio.run(abrir(servidor))
+    por_sesion = {i: s.tamano() for i, s in servidor.sesiones.items()}
+    assert all(tamano > 0 for tamano in por_sesion.values())
+    servidor.presupuesto_memoria = sum(por_sesion.values()) - 1
+    memoria = servidor.aplicar_presupuesto()
+    # Compactar no basta con sesiones recién abiertas: sale la inactiva desde hace más tiempo
+    assert memoria['sesiones'] + memoria['desalojadas'] == 3
+    assert memoria['desalojadas'] >= 1 and 1 in servidor.desalojadas
+    assert memoria['bytes'] <= servidor.presupuesto_memoria
+    assert memoria['bytes_desalojadas'] > 0
+
+
+def test_sesiones_activas_hace_poco_no_se_desalojan():
+    async def abrir(servidor):
+        await servidor.abrir_sesion(1, "Aria")
+
+    servidor = estrategia.ServidorJuego(semilla=0, presupuesto_memoria=1, inactividad_minima=3600)
+    asyncio.run(abrir(servidor))
+    memoria = servidor.aplicar_presupuesto()
+    assert (memoria['sesiones'], memoria['desalojadas']) == (1, 0)
+    mayores = servidor.mayores_sesiones()
+    assert mayores[0]['nombre'] == "Aria" and mayores[0]['bytes'] == mayores[0]['componentes']['total']
+
+
+def test_compactar_no_cambia_la_partida():
+    sesion = estrategia.SesionRemota("Aria", semilla=1)
+    otra = estrategia.SesionRemota("Aria", semilla=1)
+    pregunta = sesion.paso()[1]
+    otra.paso()
+    for _ in range(200):
+        if pregunta is None:
+            break
+        sesion.juego.compactar()
+        respuesta = responder(pregunta)
+        texto, pregunta = sesion.paso(respuesta)
+        assert otra.paso(respuesta) == (texto, pregunta)
+    assert sesion.juego.to_dict() == otra.juego.to_dict()
+
+
+def test_el_anfitrion_no_admite_perfil_ni_presupuesto():
+    with pytest.raises(ValueError):
+        estrategia.AnfitrionMultiproceso(2, perfil=estrategia.Perfilador())
+    with pytest.raises(ValueError):
+        estrategia.AnfitrionMultiproceso(2, presupuesto_memoria=10 ** 6)
@@ -0,0 +1,107 @@
+"""Perfilador de turnos: contadores, histogramas y exportación Prometheus."""
+import asyncio
+import json
+import os
+
+import estrategia
+
+
+def responder(pregunta):
+    if "Número de enemigo" in pregunta:
+        return "1"
+    if "Acción" in pregunta:
+        return "A"
+    return "0" if "Elige" in pregunta else "n"
+
+
+def jugar(sesion, limite=3000):
+    textos = []
+    texto, pregunta = sesion.paso()
+    for _ in range(limite):
+        textos.append(texto)
+        if pregunta is None:
+            return textos
+        texto, pregunta = sesion.paso(responder(pregunta))
+    raise AssertionError("la partida no terminó")
+
+
+def test_registrar_y_percentiles():
+    perfil = estrategia.Perfilador()
+    for microsegundos in (1, 3, 3, 100, 5000):
+        perfil.registrar('ataque', microsegundos * 1e-6)
+    fase = perfil.instantanea()['fases']['ataque']
+    assert fase['n'] == 5
+    assert abs(fase['total'] - 5107e-6) < 1e-12 and fase['max'] == 5000e-6
+    # Cada percentil es el límite superior de su cubeta, acotado por el máximo
+    assert 3e-6 <= fase['p50'] <= 4e-6
+    assert fase['p99'] == 5000e-6
+    assert sum(cuenta for _, cuenta in fase['cubetas']) == 5
+
+
+def test_muestreo_de_turnos():
+    perfil = estrategia.Perfilador(muestreo=3)
+    medidos = [perfil.iniciar_turno() for _ in range(7)]
+    assert medidos == [False, False, True, False, False, True, False]
+    assert (perfil.turnos, perfil.turnos_medidos) == (7, 2)
+    perfil.reiniciar()
+    assert perfil.instantanea()['turnos'] == 0
+
+
+def test_prometheus_acumulado(tmp_path):
+    perfil = estrategia.Perfilador()
+    perfil.iniciar_turno()
+    for segundos in (1e-6, 1e-3, 10.0):
+        perfil.registrar('turno', segundos)
+    texto = perfil.prometheus(prefijo="prueba")
+    assert "prueba_turnos_total 1\n" in texto
+    cubetas = [int(l.rsplit(" ", 1)[1]) for l in texto.splitlines() if l.startswith("prueba_fase_segundos_bucket")]
+    assert cubetas == sorted(cubetas) and cubetas[-1] == 3
+    assert 'prueba_fase_segundos_bucket{fase="turno",le="+Inf"} 3' in texto
+    assert 'prueba_fase_segundos_count{fase="turno"} 3' in texto
+
+    ruta = str(tmp_path / "chrono.prom")
+    perfil.exportar(ruta)
+    assert os.listdir(tmp_path) == ["chrono.prom"]
+    with open(ruta, encoding='utf-8') as f:
+        assert f.read() == perfil.prometheus()
+
+
+def test_partida_medida_juega_igual():
+    sin_perfil = jugar(estrategia.SesionRemota("Aria", semilla=4))
+    sesion = estrategia.SesionRemota("Aria", semilla=4)
+    perfil = sesion.juego.perfil = estrategia.Perfilador()
+    assert jugar(sesion) == sin_perfil
+    instantanea = perfil.instantanea()
+    assert instantanea['turnos'] > 0 and instantanea['turnos_medidos'] == instantanea['turnos']
+    assert {'turno', 'decision', 'ataque', 'accion_enemigo'} <= set(instantanea['fases'])
+    assert instantanea['fases']['turno']['n'] == instantanea['turnos']
+    json.dumps(instantanea)
+
+
+def test_servidor_exporta_al_detenerse(tmp_path):
+    ruta = str(tmp_path / "servidor.prom")
+    perfil = estrategia.Perfilador()
+    servidor = estrategia.ServidorJuego(semilla=0, perfil=perfil, ruta_perfil=ruta)
+
+    async def principal():
+        await servidor.iniciar(puerto=0)
+        puerto = servidor.servidor.sockets[0].getsockname()[1]
+        lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+        try:
+            while True:
+                mensaje = json.loads(await lector.readline())
+                if mensaje.get('fin'):
+                    break
+                respuesta = "Aria" if "Nombre" in mensaje['pregunta'] else responder(mensaje['pregunta'])
+                escritor.write((respuesta + "\n").encode('utf-8'))
+                await escritor.drain()
+        finally:
+            escritor.close()
+            servidor.servidor.close()
+            await servidor.servidor.wait_closed()
+            servidor.detener()
+
+    asyncio.run(principal())
+    with open(ruta, encoding='utf-8') as f:
+        assert f"chrono_turnos_total {perfil.turnos}\n" in f.read()
+    assert perfil.turnos > 0
@@ -0,0 +1,55 @@
+"""Almacén de perfiles SQLite."""
+import pytest
+
+import estrategia
+
+
+def _datos(nombre, nivel=1, xp=0):
+    jugador = estrategia.heroe_de_nivel(nivel, nombre)
+    jugador.xp = xp
+    return estrategia.Juego(jugador, semilla=0, consola=False).to_dict()
+
+
+@pytest.fixture
+def almacen():
+    almacen = estrategia.AlmacenPerfiles(":memory:", retencion=2)
+    yield almacen
+    almacen.cerrar()
+
+
+def test_guardar_y_cargar(almacen):
+    almacen.guardar_datos(_datos("Aria", 3, 40))
+    assert len(almacen) == 1
+    assert almacen.cargar_datos("Aria")['jugador']['xp'] == 40
+    juego = almacen.cargar("Aria", consola=False)
+    assert (juego.jugador.nombre, juego.jugador.nivel) == ("Aria", 3)
+    assert almacen.cargar_datos("Nadie") is None
+
+
+def test_listar_por_nivel(almacen):
+    almacen.guardar_lote([_datos("Aria", 2), _datos("Bruno", 5), _datos("Cora", 7)])
+    assert {p['nombre'] for p in almacen.listar(nivel_minimo=5)} == {"Bruno", "Cora"}
+    assert len(almacen.listar(limite=2)) == 2
+
+
+def test_historial_conserva_las_ultimas_versiones(almacen):
+    for xp in range(4):
+        almacen.guardar_datos(_datos("Aria", xp=xp))
+    assert len(almacen) == 1
+    historial = almacen.historial("Aria")
+    assert len(historial) == 2
+    # La más reciente primero: las dos versiones anteriores a la actual
+    assert [almacen.cargar_instantanea(i)['jugador']['xp'] for i, _ in historial] == [2, 1]
+    assert almacen.cargar_datos("Aria")['jugador']['xp'] == 3
+
+
+def test_destino_sqlite_en_guardar_y_cargar(tmp_path):
+    destino = estrategia.PREFIJO_SQLITE + str(tmp_path / "perfiles.db")
+    juego = estrategia.Juego(estrategia.heroe_de_nivel(4, "Aria"), semilla=0, consola=False, salida=lambda t: None)
+    juego.archivo_guardado = destino
+    juego.guardar_progreso()
+    cargado = estrategia.Juego.cargar_progreso(destino, "Aria", salida=lambda t: None)
+    assert cargado.to_dict() == juego.to_dict()
+    # Los guardados siguientes vuelven al mismo almacén
+    assert cargado.archivo_guardado == destino
+    assert estrategia.Juego.cargar_progreso(destino, "Nadie", salida=lambda t: None) is None
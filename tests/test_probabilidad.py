@@ -0,0 +1,78 @@
+"""Probabilidad exacta de victoria frente a la estimación por muestreo."""
+import json
+import math
+
+import estrategia
+
+
+def _margen(p, *tamanos, sigmas=4):
+    return sigmas * math.sqrt(p * (1 - p) * sum(1 / n for n in tamanos))
+
+
+def _batalla(semilla=0, nivel=2, n_enemigos=2):
+    juego = estrategia.Juego(estrategia.heroe_de_nivel(nivel), semilla=semilla, consola=False)
+    juego.archivo_guardado = None
+    rng = juego.rng
+    enemigos = [estrategia.FabricaEnemigos.crear_enemigo(nivel, juego.jugador.elemento, rng) for _ in range(n_enemigos)]
+    juego.combate = estrategia.EstadoCombate(enemigos, rng, juego.jugador)
+    juego.jugador.rng = rng
+    return juego, juego.combate
+
+
+def _estado(juego):
+    return json.dumps(juego.to_dict(), sort_keys=True)
+
+
+def test_exacto_frente_a_monte_carlo():
+    juego, _ = _batalla()
+    antes = _estado(juego)
+    exacto = estrategia.CalculadoraVictoria().calcular(juego)
+    assert exacto['exacto'] and exacto['estados'] > 0
+    assert math.isclose(exacto['victoria'] + exacto['derrota'], 1.0)
+    assert _estado(juego) == antes
+
+    # Sin margen de estados la misma consulta se estima por muestreo
+    muestras = 2000
+    estimado = estrategia.CalculadoraVictoria(max_estados=0, muestras=muestras).calcular(juego)
+    assert not estimado['exacto'] and estimado['muestras'] == muestras
+    p = exacto['victoria']
+    assert abs(estimado['victoria'] - p) < _margen(p, muestras) + 1e-9
+    assert _estado(juego) == antes
+
+
+def test_la_cache_sirve_a_la_siguiente_consulta():
+    juego, _ = _batalla(semilla=1, n_enemigos=1)
+    calculadora = estrategia.CalculadoraVictoria()
+    primera = calculadora.calcular(juego)
+    segunda = calculadora.calcular(juego)
+    assert segunda['estados'] == 0
+    assert segunda['victoria'] == primera['victoria']
+    assert segunda['vida_esperada'] == primera['vida_esperada']
+
+
+def test_cache_limitada():
+    juego, _ = _batalla(semilla=1, n_enemigos=1)
+    exacto = estrategia.CalculadoraVictoria().calcular(juego)
+    calculadora = estrategia.CalculadoraVictoria(max_cache=50)
+    limitado = calculadora.calcular(juego)
+    assert len(calculadora.cache) <= 50
+    # Las posiciones desalojadas se vuelven a resolver con el mismo resultado
+    assert limitado['exacto'] and limitado['estados'] >= exacto['estados']
+    assert math.isclose(limitado['victoria'], exacto['victoria'])
+
+
+def test_politica_no_enumerable_se_estima():
+    juego, _ = _batalla(semilla=2)
+    resultado = estrategia.CalculadoraVictoria(muestras=50).calcular(juego, estrategia.politica_aleatoria)
+    assert not resultado['exacto']
+    assert "randrange" in resultado['motivo']
+    assert 0.0 <= resultado['victoria'] <= 1.0
+
+
+def test_batalla_terminada():
+    juego, combate = _batalla()
+    for enemigo in combate.enemigos:
+        enemigo.vida = 0
+    resultado = estrategia.CalculadoraVictoria().calcular(juego)
+    assert resultado['exacto'] and resultado['victoria'] == 1.0
+    assert resultado['vida_esperada'] == juego.jugador.vida
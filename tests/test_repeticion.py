@@ -0,0 +1,53 @@
+"""Grabación y repetición de partidas."""
+import estrategia
+
+
+def _entrada(respuestas):
+    pendientes = iter(respuestas)
+
+    def entrada(pregunta):
+        try:
+            return next(pendientes)
+        except StopIteration:
+            raise EOFError from None
+    return entrada
+
+
+def test_grabar_y_reproducir():
+    textos = []
+    registro = estrategia.grabar_partida("Aria", 9, _entrada(["A", "1"] * 2), textos.append)
+    assert registro['fin'] == "cortada"
+    assert registro['respuestas'] == ["A", "1"] * 2
+    assert textos and registro['eventos'] > 0
+    repetido = estrategia.reproducir_partida(registro)
+    assert repetido['coincide']
+    assert repetido['huella'] == registro['huella']
+
+
+def test_respuesta_cambiada_no_coincide():
+    registro = estrategia.grabar_partida("Aria", 9, _entrada(["A", "1", "A", "1", "D"]), lambda t: None)
+    alterado = dict(registro, respuestas=["A", "1", "A", "1", "A", "1"])
+    assert not estrategia.reproducir_partida(alterado)['coincide']
+
+
+def test_reproducir_lote_sin_discrepancias():
+    registros = estrategia.generar_registros(6, semilla=0, max_respuestas=100)
+    for procesos in (1, 2):
+        resultado = estrategia.reproducir_lote(registros, procesos=procesos, tam_lote=2)
+        assert resultado['discrepancias'] == []
+        assert resultado['coincidencias'] == 6
+        assert resultado['respuestas'] == sum(len(r['respuestas']) for r in registros)
+
+
+def test_reproducir_lote_senala_la_partida_alterada():
+    registros = estrategia.generar_registros(4, semilla=1, max_respuestas=60)
+    registros[2] = dict(registros[2], huella="0" * 32)
+    assert estrategia.reproducir_lote(registros, procesos=1)['discrepancias'] == [2]
+
+
+def test_registros_ida_y_vuelta(tmp_path):
+    ruta = str(tmp_path / "registros.jsonl")
+    registros = estrategia.generar_registros(3, semilla=2, max_respuestas=30)
+    estrategia.escribir_registros(ruta, registros[:2])
+    estrategia.escribir_registros(ruta, registros[2:], modo="a")
+    assert estrategia.leer_registros(ruta) == registros
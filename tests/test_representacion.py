@@ -0,0 +1,52 @@
+"""Personaje y Enemigo con __slots__ y la reserva de enemigos reutilizables."""
+import pytest
+
+import estrategia
+
+
+@pytest.fixture
+def reserva_vacia(monkeypatch):
+    monkeypatch.setattr(estrategia.FabricaEnemigos, '_reserva', [])
+    return estrategia.FabricaEnemigos._reserva
+
+
+def test_sin_diccionario_de_instancia():
+    jugador = estrategia.Personaje("Aria")
+    enemigo = estrategia.Enemigo(1, estrategia.Elemento.TIEMPO, estrategia.FlujoAleatorio(0))
+    for objeto in (jugador, enemigo):
+        assert not hasattr(objeto, '__dict__')
+        with pytest.raises(AttributeError):
+            objeto.atributo_inventado = 1
+
+
+def test_enemigo_reciclado_es_igual_a_uno_nuevo(reserva_vacia):
+    elemento = estrategia.Elemento.TIEMPO
+    usado = estrategia.FabricaEnemigos.crear_enemigo(4, elemento, estrategia.FlujoAleatorio(1))
+    usado.vida = 0
+    usado.aplicar_estado('poison', {'dmg': 3, 'turnos': 2})
+    estrategia.FabricaEnemigos.reciclar([usado])
+
+    reciclado = estrategia.FabricaEnemigos.crear_enemigo(4, elemento, estrategia.FlujoAleatorio(2))
+    nuevo = estrategia.Enemigo(4, elemento, estrategia.FlujoAleatorio(2))
+    assert reciclado is usado
+    assert reciclado.to_dict() == nuevo.to_dict()
+    assert not reciclado.estados
+    assert reserva_vacia == []
+
+
+def test_reserva_acotada(reserva_vacia):
+    rng = estrategia.FlujoAleatorio(0)
+    maximo = estrategia.FabricaEnemigos.MAX_RESERVA
+    enemigos = [estrategia.Enemigo(1, estrategia.Elemento.TIEMPO, rng) for _ in range(maximo + 10)]
+    estrategia.FabricaEnemigos.reciclar(enemigos)
+    assert len(reserva_vacia) == maximo
+
+
+def test_personaje_ida_y_vuelta():
+    jugador = estrategia.heroe_de_nivel(5, "Aria")
+    jugador.aplicar_buff_defensa(20)
+    jugador.aplicar_estado('burn', {'dmg': 4, 'turnos': 3})
+    copia = estrategia.Personaje.from_dict(jugador.to_dict())
+    assert copia.to_dict() == jugador.to_dict()
+    assert copia.defensa == jugador.defensa
+    assert copia.max_vida == jugador.max_vida
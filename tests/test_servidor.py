@@ -0,0 +1,131 @@
+"""Servidor asyncio de partidas y SesionRemota."""
+import asyncio
+import json
+import os
+
+import estrategia
+
+
+def responder(pregunta):
+    if "Nombre" in pregunta:
+        return None
+    if "Número de enemigo" in pregunta:
+        return "1"
+    if "Acción" in pregunta:
+        return "A"
+    return "0" if "Elige" in pregunta else "n"
+
+
+def jugar_sesion(sesion, pregunta=None, limite=3000):
+    """Juega `sesion` hasta el final; `pregunta` es la pendiente si ya empezó."""
+    textos = []
+    texto, pregunta = sesion.paso() if pregunta is None else sesion.paso(responder(pregunta))
+    for _ in range(limite):
+        textos.append(texto)
+        if pregunta is None:
+            return textos
+        texto, pregunta = sesion.paso(responder(pregunta))
+    raise AssertionError("la partida no terminó")
+
+
+async def cliente(puerto, nombre, guardar=False, limite=3000):
+    lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+    textos = []
+    try:
+        for _ in range(limite):
+            linea = await lector.readline()
+            if not linea:
+                return textos, False
+            mensaje = json.loads(linea)
+            if mensaje['texto']:
+                textos.append(mensaje['texto'])
+            if mensaje.get('fin'):
+                return textos, True
+            respuesta = responder(mensaje['pregunta'])
+            if guardar and respuesta == "A":
+                respuesta, guardar = "G", False
+            escritor.write(((nombre if respuesta is None else respuesta) + "\n").encode('utf-8'))
+            await escritor.drain()
+    finally:
+        escritor.close()
+    raise AssertionError("la partida no terminó")
+
+
+def servir(servidor, *corrutinas):
+    async def principal():
+        await servidor.iniciar(puerto=0)
+        puerto = servidor.servidor.sockets[0].getsockname()[1]
+        try:
+            return await asyncio.gather(*(c(puerto) for c in corrutinas))
+        finally:
+            servidor.servidor.close()
+            await servidor.servidor.wait_closed()
+            servidor.detener()
+    return asyncio.run(principal())
+
+
+def test_sesion_remota_juega_hasta_el_final():
+    textos = jugar_sesion(estrategia.SesionRemota("Aria", semilla=1))
+    assert "Bienvenido a Chrono Tactics RPG" in textos[0]
+    assert "FIN DEL JUEGO" in textos[-1] or "Felicidades" in textos[-1]
+
+
+def test_sesion_reanudada_desde_to_dict():
+    sesion = estrategia.SesionRemota("Aria", semilla=2)
+    texto, pregunta = sesion.paso()
+    texto, pregunta = sesion.paso("A")
+    assert "Número de enemigo" in pregunta
+    texto, pregunta = sesion.paso("1")
+    assert pregunta == estrategia.Juego.PREGUNTA_ACCION
+    reanudada = estrategia.SesionRemota(datos=sesion.juego.to_dict())
+    assert reanudada.paso()[1] == pregunta
+    assert jugar_sesion(reanudada, pregunta) == jugar_sesion(sesion, pregunta)
+
+
+def test_servidor_atiende_varias_partidas_a_la_vez():
+    servidor = estrategia.ServidorJuego(semilla=0)
+    resultados = servir(servidor, lambda p: cliente(p, "Aria"), lambda p: cliente(p, "Bruno"))
+    assert all(terminada for _, terminada in resultados)
+    assert servidor.sesiones == {} and servidor.sesiones_activas == 0
+    assert servidor.sesiones_totales == 2
+
+
+def test_partida_remota_igual_que_la_local():
+    servidor = estrategia.ServidorJuego(semilla=5)
+    (textos, terminada), = servir(servidor, lambda p: cliente(p, "Aria"))
+    local = jugar_sesion(estrategia.SesionRemota("Aria", semilla=estrategia.derivar_semilla(5, 1)))
+    assert terminada
+    assert textos == [t for t in local if t]
+
+
+def test_cada_jugador_tiene_su_guardado(tmp_path):
+    destino = str(tmp_path / "partidas.sav")
+    servidor = estrategia.ServidorJuego(destino=destino, semilla=0)
+    servir(servidor, lambda p: cliente(p, "Aria", guardar=True), lambda p: cliente(p, "Bruno/../x", guardar=True))
+    archivos = sorted(os.listdir(tmp_path))
+    assert len(archivos) == 2 and "partidas.Aria.sav" in archivos
+    assert all(a.startswith("partidas.") and a.endswith(".sav") for a in archivos)
+    nombre = estrategia.leer_guardado(estrategia.destino_de_jugador(destino, "Bruno/../x"))['jugador']['nombre']
+    assert nombre == "Bruno/../x"
+
+
+def test_destino_de_jugador():
+    assert estrategia.destino_de_jugador("partidas.sav", "Aria") == "partidas.Aria.sav"
+    assert estrategia.destino_de_jugador(None, "Aria") is None
+    assert estrategia.destino_de_jugador("sqlite:p.db", "Aria") == "sqlite:p.db"
+    # Nombres distintos que se limpian igual no comparten archivo
+    assert estrategia.destino_de_jugador("p.sav", "a b") != estrategia.destino_de_jugador("p.sav", "a_b")
+    assert "/" not in estrategia.destino_de_jugador("p.sav", "../x").replace("p.", "", 1)
+
+
+def test_cliente_que_no_responde_se_desconecta():
+    async def mudo(puerto):
+        lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+        await lector.readline()
+        fin = await asyncio.wait_for(lector.read(), 5)
+        escritor.close()
+        return fin
+
+    servidor = estrategia.ServidorJuego(timeout=0.2)
+    assert servir(servidor, mudo) == [b""]
+    assert servidor.sesiones_activas == 0
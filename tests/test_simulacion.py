@@ -0,0 +1,29 @@
+"""Simulación de batallas sin interfaz (Monte Carlo)."""
+import estrategia
+
+
+def test_misma_semilla_mismo_resultado_con_cualquier_numero_de_procesos():
+    heroe = estrategia.heroe_de_nivel(3)
+    uno = estrategia.simular_batallas(300, jugador=heroe, procesos=1, tam_lote=64, semilla=7)
+    dos = estrategia.simular_batallas(300, jugador=heroe, procesos=2, tam_lote=64, semilla=7)
+    for clave in ('victorias', 'turnos', 'vida_restante'):
+        assert uno[clave] == dos[clave]
+
+
+def test_resumen_cuenta_todas_las_batallas():
+    resumen = estrategia.simular_batallas(200, procesos=1, semilla=3)
+    assert resumen['batallas'] == 200
+    assert sum(resumen['turnos']['histograma'].values()) == 200
+    assert sum(resumen['vida_restante']['histograma'].values()) == resumen['victorias']
+    assert resumen['tasa_victoria'] == resumen['victorias'] / 200
+
+
+def test_simular_batalla_no_emite_eventos_ni_pide_datos():
+    textos = []
+    juego = estrategia.Juego(estrategia.heroe_de_nivel(2), semilla=1, consola=True, salida=textos.append)
+    textos.clear()
+    victoria, turnos, vida = juego.simular_batalla(estrategia.politica_codiciosa)
+    assert textos == []
+    assert turnos >= 1
+    assert vida == max(0, juego.jugador.vida)
+    assert victoria == (vida > 0)
@@ -0,0 +1,34 @@
+"""Motor vectorizado (NumPy) frente al motor de objetos."""
+import math
+
+import pytest
+
+import estrategia
+
+pytestmark = pytest.mark.skipif(not estrategia.HAS_NUMPY, reason="requiere NumPy")
+
+
+def test_coincide_con_motor_de_objetos():
+    heroe = estrategia.heroe_de_nivel(8)
+    objetos = estrategia.simular_batallas(3000, jugador=heroe, procesos=1, semilla=1)
+    vectorizado = estrategia.simular_batallas_vectorizado(20000, jugador=heroe, semilla=1)
+    p = objetos['tasa_victoria']
+    margen = 4 * math.sqrt(p * (1 - p) * (1 / 3000 + 1 / 20000))
+    assert abs(p - vectorizado['tasa_victoria']) < margen + 1e-9
+    turnos = objetos['turnos']['media']
+    assert abs(turnos - vectorizado['turnos']['media']) / turnos < 0.08
+
+
+def test_misma_semilla_mismo_resultado():
+    heroe = estrategia.heroe_de_nivel(3)
+    a = estrategia.simular_batallas_vectorizado(5000, jugador=heroe, semilla=5, tam_bloque=512)
+    b = estrategia.simular_batallas_vectorizado(5000, jugador=heroe, semilla=5, tam_bloque=512)
+    assert (a['victorias'], a['turnos'], a['vida_restante']) == (b['victorias'], b['turnos'], b['vida_restante'])
+    assert sum(a['turnos']['histograma'].values()) == 5000
+
+
+def test_objetivo_menor_vida():
+    resumen = estrategia.simular_batallas_vectorizado(2000, jugador=estrategia.heroe_de_nivel(3),
+                                                      objetivo="menor_vida", semilla=2)
+    assert resumen['batallas'] == 2000
+    assert 0.0 <= resumen['tasa_victoria'] <= 1.0